@@ -7,6 +7,7 @@ Created for Cedar Codes: Apocalypse Hackathon 2025
 Authors: Abdul Rafay & Laksh Mandhan
 """
 
+import argparse
 import os
 import sys
 from pathlib import Path
@@ -14,11 +15,72 @@ from pathlib import Path
 # Add src directory to Python path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments; running without a command launches the interface."""
+    parser = argparse.ArgumentParser(description="SurviveTrack - Post-Apocalyptic Karachi Intelligence System")
+    commands = parser.add_subparsers(dest="command")
+    
+    seed = commands.add_parser("seed-tiles", help="Download basemap tiles for offline use")
+    seed.add_argument("--min-zoom", type=int, help="Lowest zoom level to seed (default: TILE_MIN_ZOOM)")
+    seed.add_argument("--max-zoom", type=int, help="Highest zoom level to seed (default: TILE_MAX_ZOOM)")
+    seed.add_argument("--bbox", help="west,south,east,north to seed (default: Karachi)")
+    seed.add_argument("--workers", type=int, default=4, help="Parallel downloads")
+    
+    load = commands.add_parser("import", help="Stream zones, resource stock or threat sightings into the zone store")
+    load.add_argument("path", help="GeoJSON, NDJSON or CSV file")
+    load.add_argument("--kind", choices=["zones", "resources", "sightings"], default="zones", help="What the file holds")
+    load.add_argument("--format", choices=["geojson", "ndjson", "csv"], help="File format (default: from the extension)")
+    load.add_argument("--batch-size", type=int, default=5000, help="Records per transaction")
+    
+    return parser.parse_args(argv)
+
+def seed_tiles_command(args, config, logger):
+    """Fill the offline tile store for the configured zoom range."""
+    from src.mapping.tile_server import map_asset_urls
+    from src.mapping.tile_store import KARACHI_BBOX, MBTilesStore, seed_map_assets, seed_tiles
+    
+    bbox = tuple(float(v) for v in args.bbox.split(",")) if args.bbox else KARACHI_BBOX
+    store = MBTilesStore(config.TILE_STORE_PATH)
+    logger.info(f"🗺️ Seeding offline tiles into {config.TILE_STORE_PATH}")
+    seed_tiles(
+        store,
+        config.TILE_UPSTREAM_URL,
+        bbox=bbox,
+        min_zoom=args.min_zoom if args.min_zoom is not None else config.TILE_MIN_ZOOM,
+        max_zoom=args.max_zoom if args.max_zoom is not None else config.TILE_MAX_ZOOM,
+        workers=args.workers
+    )
+    logger.info(f"🗺️ Mirroring map scripts into {config.MAP_ASSETS_PATH}")
+    seed_map_assets(config.MAP_ASSETS_PATH, map_asset_urls())
+    logger.info("✅ Set TILE_SERVER_ENABLED=true to serve maps from the local tile store")
+
+def import_command(args, config, logger):
+    """Stream a data file into the zone store; a running app picks up zone changes on its next poll."""
+    from src.mapping.importer import import_file
+    from src.mapping.zone_manager import ZoneManager
+    
+    # Opening the manager seeds a new store with the default zones and resource types
+    zone_manager = ZoneManager(config)
+    zone_manager.stop_watcher()
+    try:
+        stats = import_file(
+            zone_manager.store, args.path, args.kind,
+            file_format=args.format, batch_size=args.batch_size
+        )
+    except (OSError, ValueError) as e:
+        logger.error(f"❌ Import failed: {e}")
+        sys.exit(1)
+    print(
+        f"📥 {stats['imported']:,} {args.kind} imported, {stats['rejected']:,} rejected, "
+        f"{stats['records_per_second']:,.0f} records/s"
+    )
+
 def main():
     """
     Main entry point for SurviveTrack application.
     Sets up logging, validates configuration, and launches the Gradio interface.
     """
+    args = parse_args()
     try:
         from src.ui.interface import create_survivetrack_interface
         from src.utils.config import Config
@@ -35,8 +97,21 @@ def main():
             sys.exit(1)
         
         logger.info("✅ Configuration validated successfully")
+        
+        if args.command == "seed-tiles":
+            seed_tiles_command(args, config, logger)
+            return
+        if args.command == "import":
+            import_command(args, config, logger)
+            return
+        
         logger.info(f"🤖 ARIA AI System: {'ONLINE' if config.ANTHROPIC_API_KEY else 'OFFLINE'}")
         
+        # Serve basemap tiles and map scripts from the app when they have been seeded;
+        # built before the interface so its maps point at them
+        from src.mapping.tile_server import tile_routes
+        routes = tile_routes(config)
+        
         # Create and launch the interface
         demo = create_survivetrack_interface()
         
@@ -49,7 +124,8 @@ def main():
             share=config.SHARE_GRADIO,
             server_port=config.SERVER_PORT,
             show_error=True,
-            server_name="0.0.0.0" if config.SHARE_GRADIO else "127.0.0.1"
+            server_name="0.0.0.0" if config.SHARE_GRADIO else "127.0.0.1",
+            app_kwargs={"routes": routes}
         )
         
     except KeyboardInterrupt:
@@ -3,8 +3,14 @@ ARIA (Apocalypse Response Intelligence Assistant) AI System
 Advanced AI assistant powered by Anthropic Claude for survival scenarios.
 """
 
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+import statistics
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Any
+
+from src.ai_assistant.response_cache import ResponseCache, classify_intent, make_key
 
 try:
     import anthropic
@@ -13,22 +19,48 @@ except ImportError:
     ANTHROPIC_AVAILABLE = False
     anthropic = None
 
+# Marks the end of a prompt prefix the provider may cache for a few minutes
+CACHE_POINT = {"type": "ephemeral"}
+# Price of cache reads and writes relative to fresh input tokens
+CACHE_READ_COST = 0.1
+CACHE_WRITE_COST = 1.25
+# Shortest prefix the API caches, in tokens; shorter prefixes are processed in full and their marks ignored
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_MIN_TOKENS_HAIKU = 2048
+
 class ARIAIntelligence:
     """
     ARIA (Apocalypse Response Intelligence Assistant)
     AI system integrated into the SurviveTrack military-grade survival mapping platform.
     """
     
-    def __init__(self, config):
+    def __init__(self, config, zone_manager=None):
         self.config = config
+        self.zone_manager = zone_manager
         self.logger = logging.getLogger(__name__)
         self.conversation_history: List[Dict[str, str]] = []
+        # Time to first token and total latency of recent streamed replies
+        self.latencies: Deque[Dict[str, Any]] = deque(maxlen=200)
+        # Input token usage reported by the API, split by how much came from the provider's prompt cache
+        self.prompt_usage = {
+            "calls": 0, "cached_calls": 0, "input_tokens": 0, "cache_read_tokens": 0, "cache_write_tokens": 0,
+            "cached_ms": 0.0, "uncached_ms": 0.0,
+        }
+        self.cache = ResponseCache(config.ARIA_CACHE_PATH, config.ARIA_CACHE_SIZE) if config.ARIA_CACHE_SIZE else None
         
-        # Initialize Anthropic client if available
+        # Initialize Anthropic client if available; the async client keeps one pooled keep-alive connection set
         self.client = None
+        self.async_client = None
+        self._slots: Optional[asyncio.Semaphore] = None
         if ANTHROPIC_AVAILABLE and config.is_ai_enabled():
             try:
-                self.client = anthropic.Anthropic(api_key=config.ANTHROPIC_API_KEY)
+                client_options = {
+                    "api_key": config.ANTHROPIC_API_KEY,
+                    "base_url": config.ANTHROPIC_BASE_URL,
+                    "timeout": config.ARIA_TIMEOUT_S,
+                }
+                self.client = anthropic.Anthropic(**client_options)
+                self.async_client = anthropic.AsyncAnthropic(**client_options)
                 self.logger.info("🤖 ARIA AI System initialized successfully")
             except Exception as e:
                 self.logger.error(f"Failed to initialize ARIA AI: {e}")
@@ -36,6 +68,11 @@ class ARIAIntelligence:
             self.logger.warning("🤖 ARIA AI running in offline mode")
         
         self.system_prompt = self._get_system_prompt()
+        if self.client and not self.prompt_cache_active():
+            self.logger.warning(
+                f"🤖 ARIA prompt caching inactive: the persona is about {self._estimate_tokens(self.system_prompt)} "
+                f"tokens, under the {self._min_cached_tokens()}-token minimum for {config.AI_MODEL}"
+            )
     
     def _get_system_prompt(self) -> str:
         """Get the system prompt for ARIA AI assistant - YOUR ORIGINAL PROMPT"""
@@ -71,51 +108,234 @@ class ARIAIntelligence:
         if not self.client:
             return self._get_fallback_response(user_message, zone_context)
         
+        key = self._cache_key(user_message, zone_context)
+        cached = self._cached(user_message, self._cache_get(key))
+        if cached is not None:
+            return cached
+        
         try:
-            # Build context information
-            context_info = self._build_context_info(zone_context)
-            
-            # Combine system prompt with context and user message
-            full_prompt = f"{self.system_prompt}\n\n{context_info}\n\nUser: {user_message}\n\nARIA:"
-            
-            response = self.client.messages.create(
-                model=self.config.AI_MODEL,
-                max_tokens=self.config.AI_MAX_TOKENS,
-                temperature=self.config.AI_TEMPERATURE,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": full_prompt
-                    }
-                ]
-            )
-            
-            ai_response = response.content[0].text.strip()
-            
-            # Update conversation history
-            self._update_conversation_history(user_message, ai_response)
-            
-            self.logger.info(f"ARIA responded to query: {user_message[:50]}...")
+            started = time.perf_counter()
+            response = self.client.messages.create(**self._request(user_message, zone_context))
+            ai_response = self._finish(user_message, response.content[0].text, started, response.usage)
+            self._cache_put(user_message, zone_context, key, ai_response, started)
             return ai_response
             
         except Exception as e:
             self.logger.error(f"ARIA AI error: {e}")
             return self._get_fallback_response(user_message, zone_context)
     
+    async def stream_response(self, user_message: str, zone_context: Optional[Dict] = None) -> AsyncIterator[str]:
+        """
+        Text deltas of an AI response as they are generated; cached and offline replies arrive in one piece.
+        At most ARIA_MAX_CONCURRENCY calls are in flight, over the async client's pooled connections, and
+        the reply cache's SQLite reads and writes run in worker threads so they never stall the event loop.
+        """
+        started = time.perf_counter()
+        if not self.async_client:
+            first = time.perf_counter()
+            yield self._get_fallback_response(user_message, zone_context)
+            self._record_latency(user_message, "offline", started, first)
+            return
+        
+        key = self._cache_key(user_message, zone_context)
+        cached = self._cached(user_message, await asyncio.to_thread(self._cache_get, key))
+        if cached is not None:
+            first = time.perf_counter()
+            yield cached
+            self._record_latency(user_message, "cache", started, first)
+            return
+        
+        if self._slots is None:
+            # Created on first use so it belongs to the event loop serving the interface
+            self._slots = asyncio.Semaphore(max(self.config.ARIA_MAX_CONCURRENCY, 1))
+        parts: List[str] = []
+        first = None
+        try:
+            async with self._slots:
+                async with self.async_client.messages.stream(**self._request(user_message, zone_context)) as stream:
+                    async for delta in stream.text_stream:
+                        if first is None:
+                            first = time.perf_counter()
+                        parts.append(delta)
+                        yield delta
+                    usage = (await stream.get_final_message()).usage
+            ai_response = self._finish(user_message, "".join(parts), started, usage)
+            self._record_latency(user_message, "api", started, first)
+            await asyncio.to_thread(self._cache_put, user_message, zone_context, key, ai_response, started)
+            
+        except Exception as e:
+            self.logger.error(f"ARIA AI error: {e}")
+            if not parts:
+                yield self._get_fallback_response(user_message, zone_context)
+    
+    def latency_stats(self) -> Dict[str, Any]:
+        """Median time to first token and total latency of recent streamed replies from the API."""
+        api = [entry for entry in self.latencies if entry["source"] == "api"]
+        return {
+            "requests": len(self.latencies),
+            "api_requests": len(api),
+            "ttft_ms_p50": statistics.median(entry["ttft_ms"] for entry in api) if api else None,
+            "total_ms_p50": statistics.median(entry["total_ms"] for entry in api) if api else None,
+        }
+    
+    def _record_latency(self, user_message: str, source: str, started: float, first: Optional[float]) -> None:
+        """Keep the time to first token and total latency of one streamed reply."""
+        done = time.perf_counter()
+        entry = {
+            "message": user_message[:50],
+            "source": source,
+            "ttft_ms": ((first or done) - started) * 1000,
+            "total_ms": (done - started) * 1000,
+        }
+        self.latencies.append(entry)
+        self.logger.info(
+            f"ARIA streamed from {source}: first token {entry['ttft_ms']:.0f} ms, done {entry['total_ms']:.0f} ms"
+        )
+    
+    def _cache_key(self, user_message: str, zone_context: Optional[Dict]) -> str:
+        """Reply cache key of a request."""
+        return make_key(
+            user_message, zone_context, self.config.AI_MODEL, self.config.AI_TEMPERATURE, self.config.AI_MAX_TOKENS
+        )
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        """Cached reply under the current zone data version, or None; may read SQLite."""
+        return self.cache.get(key, self._data_version()) if self.cache is not None else None
+    
+    def _cache_put(self, user_message: str, zone_context: Optional[Dict], key: str, ai_response: str,
+                   started: float) -> None:
+        """Store a reply from the API with the latency it took; may write SQLite."""
+        if self.cache is not None:
+            self.cache.put(
+                key, ai_response, classify_intent(user_message, zone_context), self._data_version(),
+                (time.perf_counter() - started) * 1000
+            )
+    
+    def _cached(self, user_message: str, cached: Optional[str]) -> Optional[str]:
+        """Record a cache hit in the conversation; passes the cached reply or None through."""
+        if cached is not None:
+            self._update_conversation_history(user_message, cached)
+            self.logger.info(f"ARIA answered from cache: {user_message[:50]}...")
+        return cached
+    
+    def _request(self, user_message: str, zone_context: Optional[Dict]) -> Dict[str, Any]:
+        """Messages API parameters of a request, with the persona and zone context marked for prompt caching."""
+        # The persona and a zone's context repeat across calls, so each ends a cacheable prefix;
+        # values that change every call go after them, with the question
+        content = []
+        context_info = self._build_context_info(zone_context)
+        if context_info:
+            content.append({"type": "text", "text": context_info, "cache_control": CACHE_POINT})
+        content.append({"type": "text", "text": self._build_live_info(zone_context) + user_message})
+        
+        return {
+            "model": self.config.AI_MODEL,
+            "max_tokens": self.config.AI_MAX_TOKENS,
+            "system": [{"type": "text", "text": self.system_prompt, "cache_control": CACHE_POINT}],
+            "messages": [
+                {
+                    "role": "user",
+                    "content": content
+                }
+            ],
+            # Not a named argument of the installed SDK's create() and stream(), so it goes in the body
+            "extra_body": {"temperature": self.config.AI_TEMPERATURE},
+        }
+    
+    def _finish(self, user_message: str, text: str, started: float, usage=None) -> str:
+        """Record a reply from the API; the caller caches it."""
+        ai_response = text.strip()
+        if usage is not None:
+            self._record_usage(usage, (time.perf_counter() - started) * 1000)
+        
+        # Update conversation history
+        self._update_conversation_history(user_message, ai_response)
+        
+        self.logger.info(f"ARIA responded to query: {user_message[:50]}...")
+        return ai_response
+    
+    def _record_usage(self, usage, latency_ms: float) -> None:
+        """Add one call's input token usage and latency to the prompt cache counters."""
+        read = getattr(usage, "cache_read_input_tokens", None) or 0
+        written = getattr(usage, "cache_creation_input_tokens", None) or 0
+        fresh = getattr(usage, "input_tokens", None) or 0
+        totals = self.prompt_usage
+        totals["calls"] += 1
+        totals["input_tokens"] += fresh
+        totals["cache_read_tokens"] += read
+        totals["cache_write_tokens"] += written
+        if read:
+            totals["cached_calls"] += 1
+            totals["cached_ms"] += latency_ms
+        else:
+            totals["uncached_ms"] += latency_ms
+        self.logger.info(
+            f"ARIA prompt: {read} of {read + written + fresh} input tokens read from the prompt cache "
+            f"({written} written) in {latency_ms:.0f} ms"
+        )
+    
+    def prompt_cache_stats(self) -> Dict[str, Any]:
+        """Share of input tokens served from the provider's prompt cache, what that saved, and latency with and without it."""
+        totals = dict(self.prompt_usage)
+        prompt_tokens = totals["input_tokens"] + totals["cache_read_tokens"] + totals["cache_write_tokens"]
+        uncached_calls = totals["calls"] - totals["cached_calls"]
+        totals["cache_read_share"] = totals["cache_read_tokens"] / prompt_tokens if prompt_tokens else 0.0
+        # Fresh-token equivalents saved: reads are discounted, writes cost a little extra
+        totals["input_tokens_saved"] = (
+            totals["cache_read_tokens"] * (1 - CACHE_READ_COST) - totals["cache_write_tokens"] * (CACHE_WRITE_COST - 1)
+        )
+        totals["cached_ms_avg"] = totals.pop("cached_ms") / totals["cached_calls"] if totals["cached_calls"] else None
+        totals["uncached_ms_avg"] = totals.pop("uncached_ms") / uncached_calls if uncached_calls else None
+        totals["active"] = self.prompt_cache_active()
+        return totals
+    
+    def prompt_cache_active(self) -> bool:
+        """
+        Whether the persona is long enough for the API to cache it.
+
+        The default persona is far below the minimum, so with it the cache marks are inert: every call is
+        billed as fresh input and prompt_cache_stats() reports no cache reads.
+        """
+        return self._estimate_tokens(self.system_prompt) >= self._min_cached_tokens()
+    
+    def _min_cached_tokens(self) -> int:
+        """Shortest cacheable prefix for the configured model."""
+        return PROMPT_CACHE_MIN_TOKENS_HAIKU if "haiku" in self.config.AI_MODEL else PROMPT_CACHE_MIN_TOKENS
+    
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Rough token count of English text, about four characters per token."""
+        return len(text) // 4
+    
+    def _data_version(self) -> int:
+        """Zone store revision that cached replies are valid for."""
+        return self.zone_manager.revision if self.zone_manager else 0
+    
     def _build_context_info(self, zone_context: Optional[Dict]) -> str:
         """Build context information for AI prompt."""
         if not zone_context:
             return ""
         
+        stock = zone_context.get('stock') or {}
+        stock_info = ', '.join(f"{kind} {quantity:.0f}" for kind, quantity in stock.items()) or 'Unknown'
+        
         return f"""
         CURRENT ZONE CONTEXT:
         - Zone: {zone_context.get('name', 'Unknown')}
         - Danger Level: {zone_context.get('danger', 'Unknown')}
         - Resources: {', '.join(zone_context.get('resources', []))}
+        - Stock (units): {stock_info}
         - Status: {zone_context.get('alert', 'Unknown')}
         - Description: {zone_context.get('description', 'No additional info')}
+        - Planned route: {zone_context.get('route', 'None')}
         """
     
+    def _build_live_info(self, zone_context: Optional[Dict]) -> str:
+        """Zone context values that change between calls, kept out of the cacheable context block."""
+        if not zone_context or zone_context.get('infected') is None:
+            return ""
+        return f"Infected within 1 km of {zone_context.get('name', 'the zone')} right now: {zone_context['infected']}\n\n"
+    
     def _update_conversation_history(self, user_message: str, ai_response: str) -> None:
         """Update conversation history with new exchange."""
         self.conversation_history.append({"role": "user", "content": user_message})
@@ -136,7 +356,9 @@ class ARIAIntelligence:
             return "📦 *ARIA Offline Mode*\n\nResource allocation data requires main server connection. Recommend prioritizing water and medical supplies. Check zone markers for basic resource availability."
         
         elif any(word in message for word in ["route", "path", "travel", "move"]):
-            return "🗺️ *ARIA Offline Mode*\n\nNavigation systems partially functional. Use main map overview for basic pathfinding. Avoid red zones during daylight hours."
+            if zone_context and zone_context.get('route'):
+                return f"🗺️ *ARIA Offline Mode*\n\nDanger-weighted route plotted: {zone_context['route']}. Follow the green line on the map; it bends around infected clusters and high-danger zones. Move in short bounds and re-request the route if the horde shifts."
+            return "🗺️ *ARIA Offline Mode*\n\nNavigation systems partially functional. Ask for a route to a zone (e.g. 'route to Zone B') and the planner will plot the least dangerous path on the map. Avoid red zones during daylight hours."
         
         elif zone_context:
             danger_warnings = {
@@ -161,5 +383,8 @@ class ARIAIntelligence:
             "conversation_length": len(self.conversation_history),
             "max_tokens": self.config.AI_MAX_TOKENS,
             "temperature": self.config.AI_TEMPERATURE,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "latency": self.latency_stats(),
+            "prompt_cache": self.prompt_cache_stats(),
             "status": "OPERATIONAL" if self.is_online() else "OFFLINE MODE"
         }
\ No newline at end of file
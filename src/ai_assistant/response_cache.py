@@ -0,0 +1,178 @@
+"""
+ARIA Response Cache for SurviveTrack
+Two-tier cache of ARIA replies: an in-memory LRU in front of a SQLite file that survives restarts.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY, intent TEXT NOT NULL, response TEXT NOT NULL,
+        version INTEGER NOT NULL, expires REAL NOT NULL, latency_ms REAL NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires);
+"""
+
+# Seconds a reply stays valid, by what was asked; emergencies change fastest
+INTENT_TTL_S = {
+    "emergency": 60,
+    "route": 300,
+    "zone": 900,
+    "resources": 900,
+    "chat": 3600,
+}
+
+# Zone context fields that change every few seconds; left out of the key so the TTL bounds their staleness
+VOLATILE_FIELDS = ("infected",)
+
+Entry = Tuple[str, int, float, float]  # (response, version, expires, latency_ms)
+
+
+def classify_intent(message: str, zone_context: Optional[Dict] = None) -> str:
+    """The kind of request a prompt is, which picks its TTL."""
+    text = message.lower()
+    if "sos" in text or "emergency" in text:
+        return "emergency"
+    if zone_context and zone_context.get("route"):
+        return "route"
+    if zone_context:
+        return "zone"
+    if "resource" in text:
+        return "resources"
+    return "chat"
+
+
+def make_key(message: str, zone_context: Optional[Dict], model: str, temperature: float, max_tokens: int) -> str:
+    """Digest of the normalized prompt, the zone context and the generation settings."""
+    context = {
+        field: value for field, value in (zone_context or {}).items() if field not in VOLATILE_FIELDS
+    }
+    payload = json.dumps(
+        [re.sub(r"\s+", " ", message).strip().casefold(), context, model, temperature, max_tokens],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    ARIA replies keyed by prompt digest, valid for their intent's TTL and zone data version.
+
+    Lookups try the LRU first and then the SQLite file, promoting disk hits into memory.
+    An entry stored under an older zone data version is treated as a miss and dropped.
+    Each entry keeps the API latency it took to produce, so hits add up the time saved.
+    """
+
+    def __init__(self, path=None, max_entries: int = 256):
+        self.path = Path(path) if path else None
+        self.max_entries = max(1, max_entries)
+        self.logger = logging.getLogger(__name__)
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn.executescript(SCHEMA)
+            self.conn.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+            self.conn.commit()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, version: int = 0) -> Optional[str]:
+        """Cached reply for key under the current zone data version, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] == version and entry[2] > now:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    self.saved_ms += entry[3]
+                    return entry[0]
+                del self._entries[key]
+        if self.path is not None:
+            try:
+                row = self.conn.execute(
+                    "SELECT response, version, expires, latency_ms FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and (row[1] != version or row[2] <= now):
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.conn.commit()
+                    row = None
+            except sqlite3.Error as e:
+                self.logger.error(f"ARIA cache read failed: {e}")
+                row = None
+            if row is not None:
+                with self._lock:
+                    self._remember(key, tuple(row))
+                    self.disk_hits += 1
+                    self.saved_ms += row[3]
+                return row[0]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, response: str, intent: str, version: int = 0, latency_ms: float = 0.0) -> None:
+        """Store a reply for its intent's TTL in both tiers."""
+        entry = (response, version, time.time() + INTENT_TTL_S.get(intent, INTENT_TTL_S["chat"]), latency_ms)
+        with self._lock:
+            self._remember(key, entry)
+        if self.path is not None:
+            try:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)", (key, intent, *entry)
+                )
+                self.conn.commit()
+            except sqlite3.Error as e:
+                self.logger.error(f"ARIA cache write failed: {e}")
+
+    def clear(self) -> None:
+        """Drop every cached reply from both tiers."""
+        with self._lock:
+            self._entries.clear()
+        if self.path is not None:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "saved_s": self.saved_ms / 1000,
+            }
+
+    def _remember(self, key: str, entry: Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
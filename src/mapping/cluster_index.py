@@ -0,0 +1,253 @@
+"""
+Hierarchical Marker Clustering for SurviveTrack
+Supercluster-style index with precomputed clusters per zoom level for level-of-detail rendering.
+"""
+
+import logging
+import math
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from src.mapping.marker_layers import make_point
+
+TILE_SIZE = 256
+# (west, south, east, north) of everything the web map can show
+WORLD_BBOX = (-180.0, -85.05112878, 180.0, 85.05112878)
+
+
+class _Node:
+    """A raw point or cluster at one zoom level, in projected [0, 1] coordinates."""
+
+    __slots__ = ("x", "y", "zoom", "count", "sums", "feature", "tag", "children", "parent")
+
+    def __init__(self, x: float, y: float, count: int, sums: Dict[str, float],
+                 feature: Optional[Dict[str, Any]] = None, tag: str = "point",
+                 children: Optional[List["_Node"]] = None):
+        self.x = x
+        self.y = y
+        self.zoom = math.inf
+        self.count = count
+        self.sums = sums
+        self.feature = feature
+        self.tag = tag
+        self.children = children
+        self.parent: Optional[_Node] = None
+
+
+class _LevelGrid:
+    """Uniform grid over one zoom level's nodes for bounding-box queries."""
+
+    def __init__(self, nodes: List[_Node], cell_size: float):
+        self.cell_size = cell_size
+        self.nodes = nodes
+        self.cells: Dict[Tuple[int, int], List[_Node]] = {}
+        for node in nodes:
+            self.cells.setdefault(self._cell(node.x, node.y), []).append(node)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(x / self.cell_size), int(y / self.cell_size)
+
+    def within(self, x: float, y: float, radius: float) -> List[_Node]:
+        """Nodes within radius of (x, y)."""
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        r2 = radius * radius
+        found = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for node in self.cells.get((cx, cy), ()):
+                    if (node.x - x) ** 2 + (node.y - y) ** 2 <= r2:
+                        found.append(node)
+        return found
+
+    def in_box(self, min_x: float, min_y: float, max_x: float, max_y: float) -> List[_Node]:
+        """Nodes inside a projected bounding box."""
+        cx0, cy0 = self._cell(min_x, min_y)
+        cx1, cy1 = self._cell(max_x, max_y)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self.cells):
+            # Box covers more cells than are occupied: scan occupied cells instead
+            buckets = [nodes for (cx, cy), nodes in self.cells.items() if cx0 <= cx <= cx1 and cy0 <= cy <= cy1]
+        else:
+            buckets = [self.cells.get((cx, cy), ()) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+        return [
+            node for nodes in buckets for node in nodes
+            if min_x <= node.x <= max_x and min_y <= node.y <= max_y
+        ]
+
+
+class ClusterIndex:
+    """
+    Hierarchical clustering index over map point features.
+
+    Clusters are precomputed for every zoom level from min_zoom to max_zoom when the
+    index is loaded; queries only touch grid cells covering the requested bounding box.
+    """
+
+    def __init__(self, min_zoom: int = 8, max_zoom: int = 18, radius: int = 60, extent: int = 512,
+                 min_points: int = 2, sum_properties: Sequence[str] = ()):
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.radius = radius
+        self.extent = extent
+        self.min_points = min_points
+        self.sum_properties = tuple(sum_properties)
+        self.logger = logging.getLogger(__name__)
+        self._levels: Dict[int, _LevelGrid] = {}
+        self.point_count = 0
+
+    def load(self, features: List[Dict[str, Any]], tags: Optional[Sequence[str]] = None) -> "ClusterIndex":
+        """Build clusters for every zoom level from GeoJSON point features, optionally tagged by layer."""
+        nodes = []
+        for i, feature in enumerate(features):
+            lon, lat = feature["geometry"]["coordinates"]
+            props = feature["properties"]
+            sums = {name: float(props.get(name, 0) or 0) for name in self.sum_properties}
+            tag = tags[i] if tags else "point"
+            nodes.append(_Node(_project_x(lon), _project_y(lat), 1, sums, feature=feature, tag=tag))
+        self.point_count = len(nodes)
+
+        # Raw points live one level above the deepest cluster level; each level's grid
+        # cells match the merge radius of the level below so neighbour scans touch 3x3 cells
+        self._levels = {self.max_zoom + 1: _LevelGrid(nodes, self._radius_at(self.max_zoom))}
+        for zoom in range(self.max_zoom, self.min_zoom - 1, -1):
+            nodes = self._cluster(self._levels[zoom + 1], zoom)
+            self._levels[zoom] = _LevelGrid(nodes, self._radius_at(zoom - 1))
+
+        self.logger.debug(f"Cluster index built over {self.point_count} points")
+        return self
+
+    def get_clusters(self, bbox: Tuple[float, float, float, float], zoom: int) -> List[Dict[str, Any]]:
+        """Get clusters and unclustered points inside (west, south, east, north) at a zoom level."""
+        return [self._to_feature(node) for node in self._query(bbox, zoom)]
+
+    def get_layers(self, bbox: Tuple[float, float, float, float], zoom: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Get visible features grouped by layer tag, with aggregated clusters under "cluster"."""
+        layers: Dict[str, List[Dict[str, Any]]] = {}
+        for node in self._query(bbox, zoom):
+            tag = "cluster" if node.feature is None else node.tag
+            layers.setdefault(tag, []).append(self._to_feature(node))
+        return layers
+
+    def _query(self, bbox: Tuple[float, float, float, float], zoom: int) -> List[_Node]:
+        """Nodes of the level for zoom that fall inside a bounding box."""
+        level = self._levels.get(max(self.min_zoom, min(int(zoom), self.max_zoom + 1)))
+        if level is None:
+            return []
+
+        west, south, east, north = bbox
+        return level.in_box(_project_x(west), _project_y(north), _project_x(east), _project_y(south))
+
+    def _radius_at(self, zoom: int) -> float:
+        """Cluster radius in projected units at a zoom level."""
+        return self.radius / (self.extent * 2 ** zoom)
+
+    def _cluster(self, previous: _LevelGrid, zoom: int) -> List[_Node]:
+        """Merge nodes of the level above into clusters for this zoom."""
+        radius = self._radius_at(zoom)
+        clusters = []
+
+        for node in previous.nodes:
+            if node.zoom <= zoom:
+                continue
+            node.zoom = zoom
+
+            neighbors = [n for n in previous.within(node.x, node.y, radius) if n.zoom > zoom]
+            count = node.count + sum(n.count for n in neighbors)
+
+            if not neighbors or count < self.min_points:
+                clusters.append(node)
+                for neighbor in neighbors:
+                    neighbor.zoom = zoom
+                    clusters.append(neighbor)
+                continue
+
+            members = [node] + neighbors
+            wx = sum(n.x * n.count for n in members)
+            wy = sum(n.y * n.count for n in members)
+            sums = {name: sum(n.sums[name] for n in members) for name in self.sum_properties}
+            cluster = _Node(wx / count, wy / count, count, sums, children=members)
+            for member in members:
+                member.zoom = zoom
+                member.parent = cluster
+            clusters.append(cluster)
+
+        return clusters
+
+    def _to_feature(self, node: _Node) -> Dict[str, Any]:
+        """Convert a node to a GeoJSON feature."""
+        if node.feature is not None:
+            return node.feature
+
+        size = "small" if node.count < 10 else "medium" if node.count < 100 else "large"
+        summary = "".join(f"<br>{name.title()}: {int(total)}" for name, total in node.sums.items())
+        feature = make_point(
+            _unproject_y(node.y), _unproject_x(node.x), str(node.count),
+            popup=f"<b>📡 {node.count} signals</b>{summary}",
+            tooltip=f"{node.count} grouped markers",
+            variant=size
+        )
+        feature["properties"].update({"cluster": True, "point_count": node.count, **node.sums})
+        return feature
+
+
+class ClusterIndexCache:
+    """Keeps one cluster index per named point set, rebuilt when its data version changes."""
+
+    def __init__(self):
+        self._indexes: Dict[str, Tuple[Hashable, ClusterIndex]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, version: Hashable, build: Callable[[], ClusterIndex]) -> ClusterIndex:
+        """Return the cached index for name, building it if the version changed."""
+        with self._lock:
+            cached = self._indexes.get(name)
+            if cached and cached[0] == version:
+                return cached[1]
+        index = build()
+        with self._lock:
+            self._indexes[name] = (version, index)
+        return index
+
+
+def build_cluster_index(layers: Dict[str, List[Dict[str, Any]]], radius: int = 60,
+                        sum_properties: Sequence[str] = ()) -> ClusterIndex:
+    """Build one cluster index over several tagged point layers."""
+    features: List[Dict[str, Any]] = []
+    tags: List[str] = []
+    for kind, layer_features in layers.items():
+        features.extend(layer_features)
+        tags.extend([kind] * len(layer_features))
+    return ClusterIndex(radius=radius, sum_properties=sum_properties).load(features, tags)
+
+
+def viewport_bbox(lat: float, lon: float, zoom: int, width_px: int, height_px: int,
+                  padding: float = 0.5) -> Tuple[float, float, float, float]:
+    """Bounding box (west, south, east, north) of a viewport centred on a point."""
+    world = TILE_SIZE * 2 ** zoom
+    half_w = width_px * (0.5 + padding) / world
+    half_h = height_px * (0.5 + padding) / world
+    x, y = _project_x(lon), _project_y(lat)
+    return (
+        _unproject_x(max(0.0, x - half_w)),
+        _unproject_y(min(1.0, y + half_h)),
+        _unproject_x(min(1.0, x + half_w)),
+        _unproject_y(max(0.0, y - half_h)),
+    )
+
+
+def _project_x(lon: float) -> float:
+    return lon / 360 + 0.5
+
+
+def _project_y(lat: float) -> float:
+    sin = max(-0.9999, min(0.9999, math.sin(math.radians(lat))))
+    y = 0.5 - 0.25 * math.log((1 + sin) / (1 - sin)) / math.pi
+    return min(1.0, max(0.0, y))
+
+
+def _unproject_x(x: float) -> float:
+    return (x - 0.5) * 360
+
+
+def _unproject_y(y: float) -> float:
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
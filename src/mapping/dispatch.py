@@ -0,0 +1,439 @@
+"""
+Rescue Dispatch for SurviveTrack
+Assigns rescue teams to SOS signals from danger-weighted travel costs, most urgent signals first.
+"""
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from src.mapping.route_planner import SQRT2, CostRaster, _corners
+
+# Urgency multiplier by signal priority; unknown priorities count as MEDIUM
+PRIORITY_WEIGHT = {"CRITICAL": 8.0, "HIGH": 4.0, "MEDIUM": 2.0, "LOW": 1.0}
+# A signal's urgency doubles every this many minutes it goes unanswered
+AGE_DOUBLING_MIN = 60.0
+# Rescue convoy speed over open ground, and time spent on scene before heading back to base
+TEAM_SPEED_M_PER_MIN = 250.0
+ON_SCENE_MIN = 10.0
+
+# Stand-in cost for closed tiles: far above any real route, small enough to keep prefix sums precise.
+# Entering or leaving one costs at least half of it, which marks the path unreachable.
+_BLOCKED = 1e6
+
+
+@dataclass
+class Team:
+    """A rescue team and the base it leaves from and returns to."""
+    team_id: str
+    name: str
+    base_key: str
+    lat: float
+    lon: float
+
+
+@dataclass
+class Assignment:
+    """One stop of a dispatch plan: which team answers which signal, how far it drives and when it gets there."""
+    signal: int
+    team_id: str
+    wave: int
+    travel_m: float
+    eta_min: float
+
+
+@dataclass
+class DispatchPlan:
+    """Assignments in arrival order, plus signals no team can reach."""
+    assignments: List[Assignment] = field(default_factory=list)
+    unreachable: List[int] = field(default_factory=list)
+    method: str = "hungarian"
+    cost: float = 0.0
+    lower_bound: float = 0.0
+    ms: float = 0.0
+
+    @property
+    def gap(self) -> float:
+        """How far the plan's weighted arrival costs can be above optimal, wave by wave, as a fraction."""
+        return self.cost / self.lower_bound - 1.0 if self.lower_bound else 0.0
+
+    def by_signal(self) -> Dict[int, Assignment]:
+        """Assignment of each answered signal."""
+        return {assignment.signal: assignment for assignment in self.assignments}
+
+
+class Dispatcher:
+    """
+    Dispatch planner over the route planner's CostRaster.
+
+    Travel costs come from one distance field per team base, computed on a pooled level
+    of the raster for all bases at once by sweeping rows, columns and both diagonals with
+    running minimums until nothing improves, then read for every signal in a single
+    gather. Fields are cached per base until the raster changes.
+
+    Signals are served in waves of at most one per team, most urgent first; each wave is
+    an assignment problem on urgency-weighted arrival costs, solved exactly with the
+    Hungarian method while signals times teams stays within exact_limit and greedily
+    above it. Teams bring survivors back to base, so a team's next wave starts after
+    the round trip. Arrival times and round trips are driving times over the length of
+    the route taken, read by walking each field back to its base; the danger weighting
+    only steers which team goes where.
+    """
+
+    def __init__(self, raster: CostRaster, factor: int = 4, exact_limit: int = 100_000):
+        if factor != 1 and factor not in raster.factors:
+            raise ValueError(f"no pooled level {factor} in the cost raster")
+        self.raster = raster
+        self.factor = factor
+        self.exact_limit = exact_limit
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # Base key -> ((zone_key, lat, lon), distance field), valid for one raster version
+        self._fields: Dict[str, Tuple[Tuple[str, float, float], np.ndarray]] = {}
+        self._fields_version = -1
+
+    def urgency(self, signals: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Urgency of each signal from its priority, survivor count and age in minutes."""
+        weight = np.array([PRIORITY_WEIGHT.get(s.get('priority'), PRIORITY_WEIGHT["MEDIUM"]) for s in signals])
+        survivors = np.array([max(s.get('survivors', 1), 1) for s in signals], dtype=np.float64)
+        age = np.array([s.get('age_min', 0.0) for s in signals], dtype=np.float64)
+        return weight * survivors * np.exp2(age / AGE_DOUBLING_MIN)
+
+    def travel_costs(self, teams: Sequence[Team], signals: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Danger-weighted travel cost in metres from every team's base to every signal; inf when unreachable."""
+        if not signals:
+            return np.zeros((len(teams), 0))
+        bases = sorted({(team.base_key, team.lat, team.lon) for team in teams})
+        fields = np.stack([self._base_fields(bases)[key] for key, _, _ in bases])
+        cost = self.raster.grid(self.factor)
+        rows, cols = self._to_cells(np.array([s['coords'] for s in signals], dtype=np.float64))
+        height, width = cost.shape
+        inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+        rows, cols = np.clip(rows, 0, height - 1), np.clip(cols, 0, width - 1)
+        best = fields[:, rows, cols]
+        # A signal inside a closed tile is reached from its cheapest open neighbour
+        cut_off = ~np.isfinite(best)
+        if cut_off.any():
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    y, x = np.clip(rows + dy, 0, height - 1), np.clip(cols + dx, 0, width - 1)
+                    near = fields[:, y, x] + math.hypot(dy, dx) * cost[y, x]
+                    best = np.where(cut_off, np.minimum(best, near), best)
+        best[:, ~inside] = np.inf
+        base_row = {key: i for i, (key, _, _) in enumerate(bases)}
+        return best[[base_row[team.base_key] for team in teams]] * self.raster.cell_m * self.factor
+
+    def travel_lengths(self, teams: Sequence[Team], signals: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Length in metres of the route each team's travel cost is measured along, to every signal."""
+        if not signals:
+            return np.zeros((len(teams), 0))
+        bases = sorted({(team.base_key, team.lat, team.lon) for team in teams})
+        fields = np.stack([self._base_fields(bases)[key] for key, _, _ in bases])
+        height, width = fields.shape[1:]
+        rows, cols = self._to_cells(np.array([s['coords'] for s in signals], dtype=np.float64))
+        rows, cols = np.clip(rows, 0, height - 1), np.clip(cols, 0, width - 1)
+        lengths = _descent_lengths(fields, rows, cols).reshape(len(bases), len(signals))
+        base_row = {key: i for i, (key, _, _) in enumerate(bases)}
+        return lengths[[base_row[team.base_key] for team in teams]] * self.raster.cell_m * self.factor
+
+    def plan(self, signals: Sequence[Dict[str, Any]], teams: Sequence[Team]) -> DispatchPlan:
+        """Ordered dispatch plan for signals, each a dict with coords, priority, survivors and age_min."""
+        began = time.perf_counter()
+        plan = DispatchPlan(method="hungarian" if len(signals) * len(teams) <= self.exact_limit else "greedy")
+        if not signals or not teams:
+            plan.unreachable = list(range(len(signals))) if not teams else []
+            return plan
+
+        # Teams are matched on danger-weighted cost, but arrive and return on real driving time
+        cost = self.travel_costs(teams, signals) / TEAM_SPEED_M_PER_MIN
+        travel = self.travel_lengths(teams, signals)
+        minutes = travel / TEAM_SPEED_M_PER_MIN
+        urgency = self.urgency(signals)
+        reachable = np.isfinite(cost).any(axis=0)
+        plan.unreachable = np.nonzero(~reachable)[0].tolist()
+        # Most urgent first; ties keep signal order
+        queue = np.nonzero(reachable)[0]
+        queue = queue[np.argsort(-urgency[queue], kind="stable")]
+
+        ready = np.zeros(len(teams))
+        start = wave = 0
+        while start < len(queue):
+            batch = queue[start:start + len(teams)]
+            start += len(batch)
+            # Weighted arrival costs; a team that cannot reach a signal gets a cost no pairing can beat
+            weighted = urgency[batch] * (ready[:, None] + cost[:, batch])
+            finite = np.isfinite(weighted)
+            penalty = weighted[finite].max(initial=0.0) * len(teams) + 1.0
+            weighted = np.where(finite, weighted, penalty)
+            if plan.method == "hungarian":
+                team_rows, batch_cols = _hungarian(weighted)
+            else:
+                team_rows, batch_cols = _greedy(weighted)
+            floor = weighted.min(axis=0)
+            for team, column in zip(team_rows.tolist(), batch_cols.tolist()):
+                signal = int(batch[column])
+                if not finite[team, column]:
+                    # Every team that could reach it was taken; it waits for the next wave
+                    queue = np.append(queue, signal)
+                    continue
+                plan.cost += float(weighted[team, column])
+                plan.lower_bound += float(floor[column])
+                plan.assignments.append(Assignment(
+                    signal=signal,
+                    team_id=teams[team].team_id,
+                    wave=wave,
+                    travel_m=float(travel[team, signal]),
+                    eta_min=float(ready[team] + minutes[team, signal]),
+                ))
+                ready[team] += 2 * minutes[team, signal] + ON_SCENE_MIN
+            wave += 1
+
+        plan.assignments.sort(key=lambda assignment: assignment.eta_min)
+        plan.ms = (time.perf_counter() - began) * 1000
+        self.logger.info(
+            f"🚑 Dispatched {len(teams)} team(s) to {len(plan.assignments)} signal(s) "
+            f"({len(plan.unreachable)} unreachable, {plan.method}, gap ≤ {plan.gap:.1%}) in {plan.ms:.0f} ms"
+        )
+        return plan
+
+    def path(self, team: Team, signal: Dict[str, Any]) -> List[List[float]]:
+        """[lat, lon] vertices of the route a team's travel cost was measured along, base first."""
+        distance = self._base_fields([(team.base_key, team.lat, team.lon)])[team.base_key]
+        height, width = distance.shape
+        rows, cols = self._to_cells(np.array([signal['coords']], dtype=np.float64))
+        row, col = int(np.clip(rows[0], 0, height - 1)), int(np.clip(cols[0], 0, width - 1))
+        cells = [(row, col)]
+        # Walk downhill on the distance field back to the base
+        while distance[row, col] > 0.0:
+            window = distance[max(row - 1, 0):row + 2, max(col - 1, 0):col + 2]
+            y, x = np.unravel_index(window.argmin(), window.shape)
+            if not window[y, x] < distance[row, col]:
+                break
+            row, col = max(row - 1, 0) + int(y), max(col - 1, 0) + int(x)
+            cells.append((row, col))
+        vertices = _corners(cells[::-1])
+        lats, lons = self._to_latlon([r for r, _ in vertices], [c for _, c in vertices])
+        path = [[round(lat, 6), round(lon, 6)] for lat, lon in zip(lats.tolist(), lons.tolist())]
+        return [[team.lat, team.lon]] + path[1:-1] + [list(signal['coords'])]
+
+    def _base_fields(self, bases: Sequence[Tuple[str, float, float]]) -> Dict[str, np.ndarray]:
+        """Distance field of each (zone_key, lat, lon) base in pooled tile lengths, computing the ones not cached."""
+        with self._lock:
+            if self._fields_version != self.raster.version:
+                self._fields_version, self._fields = self.raster.version, {}
+            missing = [base for base in bases if self._fields.get(base[0], (None,))[0] != base]
+            if missing:
+                began = time.perf_counter()
+                with self.raster.lock:
+                    cost = np.nan_to_num(self.raster.grid(self.factor).astype(np.float64), posinf=_BLOCKED)
+                height, width = cost.shape
+                rows, cols = self._to_cells(np.array([(lat, lon) for _, lat, lon in missing], dtype=np.float64))
+                fields, sweeps = _distance_fields(
+                    cost, np.clip(rows, 0, height - 1), np.clip(cols, 0, width - 1)
+                )
+                fields[fields >= _BLOCKED / 2] = np.inf
+                for base, distance in zip(missing, fields):
+                    self._fields[base[0]] = (base, distance)
+                self.logger.info(
+                    f"🧭 Travel fields for {len(missing)} base(s) over {width}x{height} tiles: "
+                    f"{sweeps} sweep(s) in {(time.perf_counter() - began) * 1000:.0f} ms"
+                )
+            return {base[0]: self._fields[base[0]][1] for base in bases}
+
+    def _to_cells(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, columns) of positions on the pooled grid; may fall outside it."""
+        cells = self.raster.threats._to_cells(positions)
+        return cells[:, 1] // self.factor, cells[:, 0] // self.factor
+
+    def _to_latlon(self, rows, cols) -> Tuple[np.ndarray, np.ndarray]:
+        """Latitudes and longitudes of pooled tile centres."""
+        factor = self.factor
+        return self.raster.to_latlon(np.asarray(rows) * factor + (factor - 1) / 2, np.asarray(cols) * factor + (factor - 1) / 2)
+
+
+def teams_at_bases(bases: Sequence[Tuple[str, float, float]], per_base: int) -> List[Team]:
+    """per_base teams stationed at each (zone_key, lat, lon) base."""
+    return [
+        Team(team_id=f"{key}/{n}", name=f"Rescue {n} ({key})", base_key=key, lat=lat, lon=lon)
+        for key, lat, lon in bases for n in range(1, per_base + 1)
+    ]
+
+
+def _shear(grid: np.ndarray, fill: float, anti: bool) -> np.ndarray:
+    """
+    Copy of (..., H, W) grids with row r shifted right so every diagonal becomes a column.
+
+    Diagonals run down-right, or down-left when anti; the new cells are set to fill.
+    """
+    height, width = grid.shape[-2:]
+    sheared = np.full(grid.shape[:-2] + (height, width + height - 1), fill)
+    for row in range(height):
+        offset = row if anti else height - 1 - row
+        sheared[..., row, offset:offset + width] = grid[..., row, :]
+    return sheared
+
+
+def _unshear(sheared: np.ndarray, out: np.ndarray, anti: bool) -> None:
+    """Write sheared grids back into their (..., H, W) layout."""
+    height, width = out.shape[-2:]
+    for row in range(height):
+        offset = row if anti else height - 1 - row
+        out[..., row, :] = sheared[..., row, offset:offset + width]
+
+
+def _relax(dist: np.ndarray, prefix: np.ndarray, axis: int) -> Tuple[np.ndarray, bool]:
+    """
+    Cheapest costs after relaxing every line along axis both ways; and whether any cell improved.
+
+    prefix holds the cumulative step costs along each line, so relaxing a whole line in one
+    direction is a running minimum: d[k] = P[k] + min(d[j] - P[j], j <= k).
+    """
+    forward = np.minimum.accumulate(dist - prefix, axis=axis) + prefix
+    backward = np.flip(np.minimum.accumulate(np.flip(dist + prefix, axis), axis=axis), axis) - prefix
+    relaxed = np.minimum(dist, np.minimum(forward, backward))
+    # Only count real improvements to reachable cells, not rounding noise from the prefix sums
+    with np.errstate(invalid="ignore"):
+        improved = bool(((dist - relaxed > 1e-6 * (1.0 + relaxed)) & (relaxed < _BLOCKED / 2)).any())
+    return relaxed, improved
+
+
+def _prefix(cost: np.ndarray, axis: int, step: float) -> np.ndarray:
+    """Cumulative cost of stepping along axis, each step the mean of the two cells times step."""
+    edges = np.zeros_like(cost)
+    ahead = [slice(None)] * cost.ndim
+    behind = [slice(None)] * cost.ndim
+    ahead[axis], behind[axis] = slice(1, None), slice(None, -1)
+    edges[tuple(ahead)] = (cost[tuple(ahead)] + cost[tuple(behind)]) * (step / 2)
+    return np.cumsum(edges, axis=axis)
+
+
+def _distance_fields(cost: np.ndarray, rows: np.ndarray, cols: np.ndarray,
+                     max_sweeps: int = 64) -> Tuple[np.ndarray, int]:
+    """
+    Cheapest travel cost from each source cell to every cell, one field per source.
+
+    Moving between neighbouring cells costs the mean of their costs, times sqrt(2) on
+    diagonals, as in route planning. A sweep relaxes every row, column, diagonal and
+    anti-diagonal both ways, the diagonals as columns of a sheared copy; sweeps repeat
+    until no cell improves.
+    """
+    height, width = cost.shape
+    dist = np.full((len(rows), height, width), np.inf)
+    dist[np.arange(len(rows)), rows, cols] = 0.0
+    row_prefix = _prefix(cost, 1, 1.0)
+    col_prefix = _prefix(cost, 0, 1.0)
+    diagonal_prefix = [_prefix(_shear(cost, _BLOCKED, anti), 0, SQRT2) for anti in (False, True)]
+
+    for sweep in range(1, max_sweeps + 1):
+        dist, row_improved = _relax(dist, row_prefix, 2)
+        dist, col_improved = _relax(dist, col_prefix, 1)
+        improved = row_improved or col_improved
+        for anti, prefix in zip((False, True), diagonal_prefix):
+            relaxed, diagonal_improved = _relax(_shear(dist, np.inf, anti), prefix, 1)
+            if diagonal_improved:
+                _unshear(relaxed, dist, anti)
+                improved = True
+        # Rows and columns were relaxed first, so a sweep that only changed them may not be settled yet
+        if not improved:
+            break
+    return dist, sweep
+
+
+def _descent_lengths(fields: np.ndarray, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """
+    Length in cells of the path walked downhill from each cell back to the source of each field.
+
+    Walks the same steps as Dispatcher.path, to the lowest neighbour while it is lower, for
+    every (field, cell) pair at once; diagonal steps count sqrt(2). Returns one length per
+    pair, field-major.
+    """
+    height, width = fields.shape[1:]
+    field = np.repeat(np.arange(len(fields)), len(rows))
+    row, col = np.tile(rows, len(fields)), np.tile(cols, len(fields))
+    here = fields[field, row, col]
+    length = np.zeros(len(field))
+    active = np.arange(len(field))
+    while active.size:
+        best, best_row, best_col, step = here[active], row[active], col[active], np.zeros(active.size)
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if not (dy or dx):
+                    continue
+                y, x = np.clip(row[active] + dy, 0, height - 1), np.clip(col[active] + dx, 0, width - 1)
+                value = fields[field[active], y, x]
+                lower = value < best
+                best = np.where(lower, value, best)
+                best_row, best_col = np.where(lower, y, best_row), np.where(lower, x, best_col)
+                step = np.where(lower, math.hypot(dy, dx), step)
+        moved = best < here[active]
+        active = active[moved]
+        here[active], row[active], col[active] = best[moved], best_row[moved], best_col[moved]
+        length[active] += step[moved]
+        active = active[here[active] > 0.0]
+    return length
+
+
+def _hungarian(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum-cost assignment of a finite rectangular cost matrix by the Hungarian method.
+
+    Returns (rows, columns) of the chosen cells; every row is assigned when there are no
+    more rows than columns, and every column otherwise.
+    """
+    transposed = cost.shape[0] > cost.shape[1]
+    matrix = cost.T if transposed else cost
+    n, m = matrix.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=np.int64)  # Row (1-based) matched to each column; column 0 is a dummy
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        slack = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            free = ~used
+            reduced = matrix[i0 - 1] - u[i0] - v[1:]
+            better = free[1:] & (reduced < slack[1:])
+            slack[1:][better] = reduced[better]
+            way[1:][better] = j0
+            masked = np.where(free, slack, np.inf)
+            masked[0] = np.inf
+            j1 = int(masked.argmin())
+            delta = masked[j1]
+            u[owner[used]] += delta
+            v[used] -= delta
+            slack[free] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+    columns = np.nonzero(owner[1:])[0]
+    rows = owner[1:][columns] - 1
+    if transposed:
+        rows, columns = columns, rows
+    order = np.argsort(rows)
+    return rows[order], columns[order]
+
+
+def _greedy(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Assignment taking columns in order, each to the cheapest row still free."""
+    free = np.ones(cost.shape[0], dtype=bool)
+    rows, columns = [], []
+    for column in range(min(cost.shape[1], cost.shape[0])):
+        row = int(np.where(free, cost[:, column], np.inf).argmin())
+        free[row] = False
+        rows.append(row)
+        columns.append(column)
+    return np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64)
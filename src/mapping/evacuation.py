@@ -0,0 +1,182 @@
+"""
+Evacuation Field for SurviveTrack
+Nearest safe zone for every cell of a city grid, precomputed by jump flooding and read back in constant time.
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.mapping.spatial_index import haversine_m
+from src.mapping.tile_store import KARACHI_BBOX
+from src.utils import geo
+
+METERS_PER_DEGREE = 111320.0
+
+# (row, column) offsets of a cell and its eight neighbours
+_NEIGHBOURS = np.array([(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)], dtype=np.int64)
+
+
+class SafeZoneField:
+    """
+    Voronoi labelling of a grid over a bounding box by nearest safe zone.
+
+    Each cell holds the number of its nearest zone, found with the jump flooding algorithm
+    on the local metric plane: passes at halving steps let every cell adopt a neighbour's
+    zone when that zone is closer, all cells at once, followed by one extra step-1 pass that
+    mends the few cells the halving passes get wrong. Lookups compare the labels of a
+    point's cell and its neighbours and measure the exact great-circle distance and
+    bearing to the closest; points off the grid fall back to scanning every zone.
+    """
+
+    def __init__(self, bbox: Sequence[float] = KARACHI_BBOX, cell_m: float = 50.0):
+        self.bbox = tuple(bbox)
+        self.cell_m = cell_m
+        west, south, east, north = self.bbox
+        self._deg_x = cell_m / (METERS_PER_DEGREE * math.cos(math.radians((south + north) / 2)))
+        self._deg_y = cell_m / METERS_PER_DEGREE
+        self.width = int(math.ceil((east - west) / self._deg_x))
+        self.height = int(math.ceil((north - south) / self._deg_y))
+        self.logger = logging.getLogger(__name__)
+        self.version = 0
+        self._lock = threading.Lock()
+        self._keys: List[str] = []
+        self._lats = np.empty(0, dtype=np.float64)
+        self._lons = np.empty(0, dtype=np.float64)
+        self._labels = np.full((self.height, self.width), -1, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def rebuild(self, zones: Iterable[Tuple[str, float, float]]) -> None:
+        """Relabel the grid from (zone_key, lat, lon) of every safe zone; lookups see the old field until done."""
+        start = time.perf_counter()
+        zones = list(zones)
+        keys = [key for key, _, _ in zones]
+        lats = np.array([lat for _, lat, _ in zones], dtype=np.float64)
+        lons = np.array([lon for _, _, lon in zones], dtype=np.float64)
+        labels = self._flood(*self._to_plane(lats, lons)) if zones else np.full((self.height, self.width), -1, np.int32)
+        with self._lock:
+            self._keys, self._lats, self._lons, self._labels = keys, lats, lons, labels
+            self.version += 1
+        self.logger.info(
+            f"🏳️ Safe zone field rebuilt for {len(keys)} zone(s) over {self.width}x{self.height} cells "
+            f"in {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+
+    def lookup(self, lat: float, lon: float) -> Optional[Tuple[str, float, float]]:
+        """(zone_key, distance_m, bearing_deg) of the safe zone nearest a position, or None when there is none."""
+        with self._lock:
+            keys, zone_lats, zone_lons, labels = self._keys, self._lats, self._lons, self._labels
+        if not keys:
+            return None
+        west, _, _, north = self.bbox
+        col = math.floor((lon - west) / self._deg_x)
+        row = math.floor((north - lat) / self._deg_y)
+        if not (0 <= col < self.width and 0 <= row < self.height):
+            indices, distances, bearings = self.lookup_many([lat], [lon])
+            return keys[indices[0]], float(distances[0]), float(bearings[0])
+        candidates = set(labels[max(row - 1, 0):row + 2, max(col - 1, 0):col + 2].ravel().tolist())
+        distance, index = min(
+            (haversine_m(lat, lon, zone_lats[i], zone_lons[i]), i) for i in candidates
+        )
+        return keys[index], distance, float(geo.bearing(lat, lon, zone_lats[index], zone_lons[index]))
+
+    def lookup_many(self, lats, lons) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Zone numbers (-1 for none), distances in metres and bearings in degrees for many positions."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        with self._lock:
+            keys, zone_lats, zone_lons, labels = self._keys, self._lats, self._lons, self._labels
+        if not keys:
+            empty = np.full(len(lats), np.nan)
+            return np.full(len(lats), -1, dtype=np.int64), empty, empty
+
+        x, y = self._to_plane(lats, lons)
+        cols, rows = np.floor(x).astype(np.int64), np.floor(y).astype(np.int64)
+        inside = (cols >= 0) & (cols < self.width) & (rows >= 0) & (rows < self.height)
+        indices = np.empty(len(lats), dtype=np.int64)
+        if inside.any():
+            # A cell's label is exact for its centre; the 3x3 block around it covers the point itself
+            near_rows = np.clip(rows[inside, None] + _NEIGHBOURS[:, 0], 0, self.height - 1)
+            near_cols = np.clip(cols[inside, None] + _NEIGHBOURS[:, 1], 0, self.width - 1)
+            candidates = labels[near_rows, near_cols]
+            distances = geo.haversine(
+                lats[inside, None], lons[inside, None], zone_lats[candidates], zone_lons[candidates]
+            )
+            indices[inside] = candidates[np.arange(len(candidates)), distances.argmin(axis=1)]
+        if not inside.all():
+            outside = ~inside
+            indices[outside] = geo.distance_matrix(lats[outside], lons[outside], zone_lats, zone_lons).argmin(axis=1)
+        return (
+            indices,
+            geo.haversine(lats, lons, zone_lats[indices], zone_lons[indices]),
+            geo.bearing(lats, lons, zone_lats[indices], zone_lons[indices]),
+        )
+
+    def zone_key(self, index: int) -> str:
+        """Key of a zone number returned by lookup_many."""
+        return self._keys[index]
+
+    def _to_plane(self, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+        """Continuous (x, y) grid coordinates, in cells east of the west edge and south of the north edge."""
+        west, _, _, north = self.bbox
+        return (np.asarray(lons) - west) / self._deg_x, (north - np.asarray(lats)) / self._deg_y
+
+    def _flood(self, zone_x, zone_y) -> np.ndarray:
+        """Label every cell with its nearest zone by jump flooding."""
+        height, width = self.height, self.width
+        labels = np.full((height, width), -1, dtype=np.int32)
+        # Each cell also carries its current zone's plane position, so passes shift arrays instead of gathering
+        seed_x = np.full((height, width), np.inf, dtype=np.float32)
+        seed_y = np.full((height, width), np.inf, dtype=np.float32)
+        centre_x = np.arange(width, dtype=np.float32) + 0.5
+        centre_y = (np.arange(height, dtype=np.float32) + 0.5)[:, None]
+        # Zones off the grid seed the nearest edge cell; distances still use their true position
+        cols = np.clip(np.floor(zone_x).astype(np.int64), 0, width - 1)
+        rows = np.clip(np.floor(zone_y).astype(np.int64), 0, height - 1)
+        seed_d2 = (centre_x[cols] - zone_x) ** 2 + (centre_y[rows, 0] - zone_y) ** 2
+        # Several zones in one cell: the closest to the cell centre seeds it
+        cells = rows * width + cols
+        order = np.lexsort((seed_d2, cells))
+        _, first = np.unique(cells[order], return_index=True)
+        seeds = order[first]
+        labels[rows[seeds], cols[seeds]] = seeds
+        seed_x[rows[seeds], cols[seeds]] = zone_x[seeds]
+        seed_y[rows[seeds], cols[seeds]] = zone_y[seeds]
+        best = (centre_x - seed_x) ** 2 + (centre_y - seed_y) ** 2
+
+        steps = []
+        step = 1 << max(int(math.ceil(math.log2(max(height, width)))) - 1, 0)
+        while step >= 1:
+            steps.append(step)
+            step //= 2
+        for step in steps + [1]:
+            for dy in (-step, 0, step):
+                for dx in (-step, 0, step):
+                    if dy == 0 and dx == 0:
+                        continue
+                    # Cells [ys, xs] look at the zone held by cells [ys + dy, xs + dx]
+                    ys, src_y = _shift(dy, height)
+                    xs, src_x = _shift(dx, width)
+                    candidate_x = seed_x[src_y, src_x].copy()
+                    candidate_y = seed_y[src_y, src_x].copy()
+                    candidate = labels[src_y, src_x].copy()
+                    d2 = (centre_x[xs] - candidate_x) ** 2 + (centre_y[ys] - candidate_y) ** 2
+                    better = d2 < best[ys, xs]
+                    np.copyto(best[ys, xs], d2, where=better)
+                    np.copyto(seed_x[ys, xs], candidate_x, where=better)
+                    np.copyto(seed_y[ys, xs], candidate_y, where=better)
+                    np.copyto(labels[ys, xs], candidate, where=better)
+        return labels
+
+
+def _shift(delta: int, size: int) -> Tuple[slice, slice]:
+    """(destination, source) slices pairing index i with i + delta inside range(size)."""
+    if delta >= 0:
+        return slice(0, max(size - delta, 0)), slice(delta, size)
+    return slice(-delta, size), slice(0, max(size + delta, 0))
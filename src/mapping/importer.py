@@ -0,0 +1,278 @@
+"""
+Bulk Importer for SurviveTrack
+Streams zones, resource stock and threat sightings from GeoJSON, NDJSON or CSV into the zone store.
+"""
+
+import codecs
+import csv
+import json
+import logging
+import mmap
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.mapping.zone_catalog import ZONE_FIELDS, Zone
+from src.mapping.zone_manager import validate_zone
+from src.mapping.zone_store import ZoneStore
+
+IMPORT_KINDS = ("zones", "resources", "sightings")
+FORMATS = {".geojson": "geojson", ".json": "geojson", ".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+
+# Bytes decoded per read while scanning a GeoJSON feature array
+GEOJSON_CHUNK = 1 << 20
+# Mapped pages already parsed are handed back to the OS every this many bytes
+RELEASE_EVERY = 64 << 20
+
+
+class RecordError(ValueError):
+    """A record that cannot be imported."""
+
+
+@contextmanager
+def _open_bytes(path: Path):
+    """The file as a memory map, or a plain binary file when it cannot be mapped (empty files, pipes)."""
+    with open(path, "rb") as handle:
+        try:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            yield handle
+            return
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def _release(source, released: int) -> int:
+    """Drop mapped pages before the read position so resident memory stays flat; returns the new mark."""
+    position = source.tell()
+    if not isinstance(source, mmap.mmap) or position - released < RELEASE_EVERY or not hasattr(mmap, "MADV_DONTNEED"):
+        return released
+    end = position - position % mmap.PAGESIZE
+    source.madvise(mmap.MADV_DONTNEED, 0, end)
+    return end
+
+
+def _lines(source) -> Iterator[str]:
+    """Decoded lines of a mapped or open file, one at a time."""
+    released = 0
+    for line in iter(source.readline, b""):
+        yield line.decode("utf-8-sig")
+        released = _release(source, released)
+
+
+def iter_csv(path: Path) -> Iterator[Dict[str, Any]]:
+    """Rows of a CSV file with a header line, as dicts."""
+    with _open_bytes(path) as source:
+        yield from csv.DictReader(_lines(source))
+
+
+def iter_ndjson(path: Path) -> Iterator[Dict[str, Any]]:
+    """Objects of a newline-delimited JSON file, skipping blank lines."""
+    with _open_bytes(path) as source:
+        for number, line in enumerate(_lines(source), 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise RecordError(f"line {number}: {e}") from e
+
+
+def iter_geojson(path: Path) -> Iterator[Dict[str, Any]]:
+    """Features of a GeoJSON FeatureCollection, decoded one at a time without loading the file."""
+    decoder = json.JSONDecoder()
+    with _open_bytes(path) as source:
+        text = codecs.getincrementaldecoder("utf-8-sig")()
+        buffer, pos, eof, released = "", 0, False, 0
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof, released
+            released = _release(source, released)
+            chunk = source.read(GEOJSON_CHUNK)
+            eof = not chunk
+            buffer = buffer[pos:] + text.decode(chunk, final=eof)
+            pos = 0
+            return not eof
+
+        # Find the opening bracket of the "features" array
+        while True:
+            start = buffer.find('"features"')
+            if start >= 0:
+                bracket = buffer.find("[", start)
+                if bracket >= 0:
+                    pos = bracket + 1
+                    break
+            if not fill():
+                raise RecordError("no \"features\" array found")
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer):
+                if not fill():
+                    raise RecordError("unterminated \"features\" array")
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                feature, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                # Most likely the feature runs past the buffer; read on unless the file is done
+                if not fill():
+                    raise RecordError(f"malformed feature: {e}") from e
+                continue
+            pos = end
+            yield feature
+
+
+READERS: Dict[str, Callable[[Path], Iterator[Dict[str, Any]]]] = {
+    "csv": iter_csv,
+    "ndjson": iter_ndjson,
+    "geojson": iter_geojson,
+}
+
+
+def _flatten(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge a GeoJSON feature's properties and Point geometry into one flat record."""
+    if record.get("type") != "Feature":
+        return record
+    flat = dict(record.get("properties") or {})
+    geometry = record.get("geometry") or {}
+    if geometry.get("type") == "Point":
+        try:
+            flat["lon"], flat["lat"] = geometry["coordinates"][:2]
+        except (KeyError, TypeError, ValueError):
+            raise RecordError("Point geometry without [lon, lat] coordinates")
+    if "id" in record and "zone_key" not in flat:
+        flat["zone_key"] = record["id"]
+    return flat
+
+
+def _coords(record: Dict[str, Any]) -> List[float]:
+    try:
+        lat, lon = float(record["lat"]), float(record["lon"])
+    except (KeyError, TypeError, ValueError):
+        raise RecordError("missing or non-numeric lat/lon")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise RecordError(f"coordinates out of range: {lat}, {lon}")
+    return [lat, lon]
+
+
+def _resources(value: Any) -> List[str]:
+    """Resource labels from a list or a ';'-separated string."""
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    return [part.strip() for part in str(value or "").split(";") if part.strip()]
+
+
+def parse_zone(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Zone store row from a record, checked with the zone data rules."""
+    zone_key = str(record.get("zone_key") or record.get("key") or "").strip()
+    if not zone_key:
+        raise RecordError("missing zone_key")
+    zone = Zone(
+        name=str(record.get("name") or ""),
+        coords=_coords(record),
+        resources=_resources(record.get("resources")),
+        alert=str(record.get("alert") or ""),
+        danger=str(record.get("danger") or "").lower(),
+        description=str(record.get("description") or ""),
+        history=str(record.get("history") or ""),
+        threats=str(record.get("threats") or ""),
+        tactical_notes=str(record.get("tactical_notes") or ""),
+        resource_density=str(record.get("resource_density") or ""),
+    )
+    error = validate_zone(zone_key, zone)
+    if error:
+        raise RecordError(error)
+    row = {name: getattr(zone, name) for name in ZONE_FIELDS}
+    row["zone_key"] = zone_key
+    return row
+
+
+def parse_resource(record: Dict[str, Any], resource_types) -> Tuple[str, str, float]:
+    """(zone_key, resource_type, quantity) from a record."""
+    zone_key = str(record.get("zone_key") or "").strip()
+    resource_type = str(record.get("resource_type") or record.get("type") or "").strip()
+    if not zone_key:
+        raise RecordError("missing zone_key")
+    if resource_type not in resource_types:
+        raise RecordError(f"unknown resource type: {resource_type!r}")
+    try:
+        quantity = float(record.get("quantity"))
+    except (TypeError, ValueError):
+        raise RecordError("missing or non-numeric quantity")
+    if quantity < 0:
+        raise RecordError(f"negative quantity: {quantity}")
+    return zone_key, resource_type, quantity
+
+
+def parse_sighting(record: Dict[str, Any]) -> Tuple[float, float, str, int, Optional[str]]:
+    """(lat, lon, kind, count, seen_at) from a record."""
+    lat, lon = _coords(record)
+    try:
+        count = int(record.get("count") or 1)
+    except (TypeError, ValueError):
+        raise RecordError("non-integer count")
+    if count < 1:
+        raise RecordError(f"count must be positive: {count}")
+    return lat, lon, str(record.get("kind") or "zombie"), count, record.get("seen_at") or None
+
+
+def import_file(store: ZoneStore, path, kind: str, file_format: Optional[str] = None,
+                batch_size: int = 5000, max_errors_logged: int = 20) -> Dict[str, Any]:
+    """
+    Stream one file into the zone store and return import statistics.
+
+    Records are parsed one at a time and written in batches of batch_size, each in its
+    own transaction, so memory use does not grow with the file. Invalid records are
+    counted and skipped.
+    """
+    logger = logging.getLogger(__name__)
+    path = Path(path)
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f"Unknown import kind {kind!r}; expected one of {', '.join(IMPORT_KINDS)}")
+    file_format = file_format or FORMATS.get(path.suffix.lower())
+    if file_format not in READERS:
+        raise ValueError(f"Cannot tell the format of {path.name}; pass one of {', '.join(READERS)}")
+
+    resource_types = set(store.get_resource_markers())
+    parse, write = {
+        "zones": (parse_zone, store.put_zones),
+        "resources": (lambda record: parse_resource(record, resource_types), store.put_stock),
+        "sightings": (parse_sighting, store.put_sightings),
+    }[kind]
+
+    stats = {"read": 0, "imported": 0, "rejected": 0}
+    batch: List[Any] = []
+    start = time.perf_counter()
+    logger.info(f"📥 Importing {kind} from {path} ({file_format})")
+
+    for record in READERS[file_format](path):
+        stats["read"] += 1
+        try:
+            batch.append(parse(_flatten(record)))
+        except (RecordError, AttributeError) as e:
+            stats["rejected"] += 1
+            if stats["rejected"] <= max_errors_logged:
+                logger.warning(f"⚠️ Record {stats['read']} rejected: {e}")
+            continue
+        if len(batch) >= batch_size:
+            write(batch)
+            stats["imported"] += len(batch)
+            batch = []
+            if stats["imported"] % (batch_size * 20) == 0:
+                logger.info(f"📦 {stats['imported']:,} {kind} imported")
+    if batch:
+        write(batch)
+        stats["imported"] += len(batch)
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["records_per_second"] = stats["read"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    logger.info(
+        f"✅ Imported {stats['imported']:,} {kind} ({stats['rejected']:,} rejected) in "
+        f"{stats['seconds']:.1f}s - {stats['records_per_second']:,.0f} records/s"
+    )
+    return stats
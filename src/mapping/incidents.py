@@ -0,0 +1,292 @@
+"""
+Incident Clustering for SurviveTrack
+Incremental grid-accelerated DBSCAN that groups nearby SOS signals into incident areas as they arrive.
+"""
+
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Set
+
+from src.mapping.dispatch import PRIORITY_WEIGHT
+from src.mapping.spatial_index import METERS_PER_DEGREE, GridIndex
+
+
+class _Incident:
+    """Running totals of one incident's signals."""
+
+    __slots__ = ("incident_id", "members", "survivors", "priorities", "lat_sum", "lon_sum")
+
+    def __init__(self, incident_id: int):
+        self.incident_id = incident_id
+        self.members: Set[int] = set()
+        self.survivors = 0
+        self.priorities: Dict[str, int] = {}
+        self.lat_sum = 0.0
+        self.lon_sum = 0.0
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self.members.add(record["id"])
+        self.survivors += record["survivors"]
+        self.priorities[record["priority"]] = self.priorities.get(record["priority"], 0) + 1
+        self.lat_sum += record["lat"]
+        self.lon_sum += record["lon"]
+
+    def discard(self, record: Dict[str, Any]) -> None:
+        self.members.discard(record["id"])
+        self.survivors -= record["survivors"]
+        self.priorities[record["priority"]] -= 1
+        if not self.priorities[record["priority"]]:
+            del self.priorities[record["priority"]]
+        self.lat_sum -= record["lat"]
+        self.lon_sum -= record["lon"]
+
+    @property
+    def priority(self) -> str:
+        """Worst priority among the signals."""
+        return max(self.priorities, key=lambda priority: PRIORITY_WEIGHT.get(priority, 0))
+
+
+class IncidentIndex:
+    """
+    DBSCAN clustering of SOS signals, maintained one signal at a time.
+
+    A signal with at least min_signals signals (itself included) within radius_m is a
+    core signal; core signals within radius_m of each other share an incident, and other
+    signals join the incident of a core neighbour or stand alone. Signals sit in a grid of
+    radius_m cells, so adding one only queries the 3x3 cells around it and merges the
+    incidents of its core neighbours, smaller into larger. Removing a core signal checks
+    that the cores around it still reach each other; only an incident that really split
+    is re-clustered, on its own members.
+    """
+
+    def __init__(self, radius_m: float = 300.0, min_signals: int = 2):
+        self.radius_m = radius_m
+        self.min_signals = max(min_signals, 1)
+        self.grid = GridIndex(cell_m=radius_m)
+        self.version = 0
+        self._records: Dict[int, Dict[str, Any]] = {}
+        self._degree: Dict[int, int] = {}
+        self._core: Set[int] = set()
+        self._incident_of: Dict[int, int] = {}
+        self._incidents: Dict[int, _Incident] = {}
+        self._incident_ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._incidents)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Cluster a signal log record in; a known id only has its priority and survivors refreshed."""
+        signal_id = record["id"]
+        with self._lock:
+            if signal_id in self._records:
+                self._refresh(record)
+                return
+            neighbours = self._neighbours(record)
+            self.grid.insert(signal_id, record["lat"], record["lon"])
+            self._records[signal_id] = record
+            self._degree[signal_id] = len(neighbours) + 1
+            for neighbour in neighbours:
+                self._degree[neighbour] += 1
+            self._place(signal_id, self._new_incident())
+
+            promoted = [
+                candidate for candidate in [signal_id] + neighbours
+                if candidate not in self._core and self._degree[candidate] >= self.min_signals
+            ]
+            self._core.update(promoted)
+            for core in promoted:
+                self._expand(core)
+            if signal_id not in self._core and len(self._incident(signal_id).members) == 1:
+                self._attach(signal_id)
+            self.version += 1
+
+    def remove(self, signal_id: int) -> bool:
+        """Take a resolved or expired signal out; returns whether it was clustered."""
+        with self._lock:
+            record = self._records.pop(signal_id, None)
+            if record is None:
+                return False
+            self.grid.remove(signal_id)
+            del self._degree[signal_id]
+            was_core = signal_id in self._core
+            self._core.discard(signal_id)
+            incident_id = self._incident_of.pop(signal_id)
+            self._incidents[incident_id].discard(record)
+
+            # Signals that may have lost their link to the rest of their incident
+            neighbours = self._neighbours(record)
+            loose = set(neighbours) if was_core else set()
+            for neighbour in neighbours:
+                self._degree[neighbour] -= 1
+                if neighbour in self._core and self._degree[neighbour] < self.min_signals:
+                    self._core.discard(neighbour)
+                    loose.add(neighbour)
+                    loose.update(self._neighbours(self._records[neighbour]))
+            self._mend(loose)
+            if incident_id in self._incidents and not self._incidents[incident_id].members:
+                del self._incidents[incident_id]
+            self.version += 1
+            return True
+
+    def incidents(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Incidents as aid map and dispatch dicts, oldest first, with combined survivors and the worst priority."""
+        now = time.time() if now is None else now
+        with self._lock:
+            incidents = []
+            for incident in self._incidents.values():
+                members = [self._records[signal_id] for signal_id in incident.members]
+                count = len(members)
+                lat, lon = incident.lat_sum / count, incident.lon_sum / count
+                first = min(members, key=lambda record: record["at"])
+                cos_lat = math.cos(math.radians(lat))
+                spread = max(
+                    math.hypot(record["lat"] - lat, (record["lon"] - lon) * cos_lat) for record in members
+                ) * METERS_PER_DEGREE
+                worst = max(members, key=lambda record: (PRIORITY_WEIGHT.get(record["priority"], 0), -record["at"]))
+                incidents.append({
+                    'incident_id': incident.incident_id,
+                    'signal_ids': sorted(incident.members),
+                    'coords': [lat, lon],
+                    'name': (first.get("name") or f"SOS #{first['id']}") if count == 1
+                    else f"Incident #{incident.incident_id} ({count} signals)",
+                    'time': time.strftime('%H:%M', time.localtime(first["at"])),
+                    'age_min': max(now - first["at"], 0.0) / 60,
+                    'priority': incident.priority,
+                    'survivors': incident.survivors,
+                    'message': worst.get("message", ""),
+                    'spread_m': spread,
+                })
+        incidents.sort(key=lambda incident: -incident['age_min'])
+        return incidents
+
+    def _neighbours(self, record: Dict[str, Any]) -> List[int]:
+        """Ids of other signals within radius_m of a record."""
+        return [
+            key for key, _ in self.grid.within_radius(record["lat"], record["lon"], self.radius_m)
+            if key != record["id"]
+        ]
+
+    def _incident(self, signal_id: int) -> _Incident:
+        return self._incidents[self._incident_of[signal_id]]
+
+    def _new_incident(self) -> _Incident:
+        incident = _Incident(next(self._incident_ids))
+        self._incidents[incident.incident_id] = incident
+        return incident
+
+    def _place(self, signal_id: int, incident: _Incident) -> None:
+        """Move a signal into an incident, dropping the one it leaves if that is now empty."""
+        record = self._records[signal_id]
+        previous = self._incident_of.get(signal_id)
+        if previous == incident.incident_id:
+            return
+        if previous is not None:
+            left = self._incidents[previous]
+            left.discard(record)
+            if not left.members:
+                del self._incidents[previous]
+        self._incident_of[signal_id] = incident.incident_id
+        incident.add(record)
+
+    def _expand(self, core: int) -> None:
+        """Join a new core signal's incident with its core neighbours' and take in its unclustered neighbours."""
+        neighbours = self._neighbours(self._records[core])
+        joined = {self._incident_of[neighbour] for neighbour in neighbours if neighbour in self._core}
+        joined.add(self._incident_of[core])
+        target = max((self._incidents[incident_id] for incident_id in joined), key=lambda incident: len(incident.members))
+        for incident_id in joined - {target.incident_id}:
+            for member in list(self._incidents[incident_id].members):
+                self._place(member, target)
+        self._place(core, target)
+        for neighbour in neighbours:
+            if neighbour not in self._core and len(self._incident(neighbour).members) == 1:
+                self._place(neighbour, target)
+
+    def _attach(self, signal_id: int) -> None:
+        """Join a non-core signal to the incident of any core neighbour."""
+        for neighbour in self._neighbours(self._records[signal_id]):
+            if neighbour in self._core:
+                self._place(signal_id, self._incident(neighbour))
+                return
+
+    def _mend(self, loose: Set[int]) -> None:
+        """Re-link signals near a removed or demoted core, splitting off any part of an incident it disconnected."""
+        by_incident: Dict[int, List[int]] = {}
+        for signal_id in loose:
+            by_incident.setdefault(self._incident_of[signal_id], []).append(signal_id)
+        for incident_id, signals in by_incident.items():
+            for piece in self._cut_off({signal_id for signal_id in signals if signal_id in self._core}):
+                grown = self._new_incident()
+                for core in piece:
+                    self._place(core, grown)
+                    for neighbour in self._neighbours(self._records[core]):
+                        if neighbour not in self._core and self._incident_of[neighbour] == incident_id:
+                            self._place(neighbour, grown)
+            for signal_id in signals:
+                if signal_id in self._core:
+                    continue
+                current = self._incident_of[signal_id]
+                if not any(
+                    neighbour in self._core and self._incident_of[neighbour] == current
+                    for neighbour in self._neighbours(self._records[signal_id])
+                ):
+                    self._place(signal_id, self._new_incident())
+                    self._attach(signal_id)
+
+    def _cut_off(self, cores: Set[int]) -> List[Set[int]]:
+        """
+        Core sets of the parts of an incident that the given cores no longer connect to its largest part.
+
+        One breadth-first search grows from each core, a node at a time in turn, and searches
+        that meet are merged. It stops once a single search is still growing, so the work is
+        bounded by the parts that were cut off, not by the incident.
+        """
+        if len(cores) < 2:
+            return []
+        seen = {core: {core} for core in cores}
+        queues = {core: deque([core]) for core in cores}
+        owner = {core: core for core in cores}
+        merged_into: Dict[int, int] = {}
+
+        def root(search: int) -> int:
+            while search in merged_into:
+                search = merged_into[search]
+            return search
+
+        while len(seen) > 1:
+            growing = [search for search in queues if queues[search]]
+            if len(growing) <= 1:
+                largest = growing[0] if growing else max(seen, key=lambda search: len(seen[search]))
+                return [nodes for search, nodes in seen.items() if search != largest]
+            for search in growing:
+                search = root(search)
+                if search not in queues or not queues[search]:
+                    continue
+                for neighbour in self._neighbours(self._records[queues[search].popleft()]):
+                    if neighbour not in self._core:
+                        continue
+                    other = root(owner[neighbour]) if neighbour in owner else None
+                    if other is None:
+                        owner[neighbour] = search
+                        seen[search].add(neighbour)
+                        queues[search].append(neighbour)
+                    elif other != search:
+                        # The searches met: fold the smaller into the larger
+                        small, large = sorted((search, other), key=lambda found: len(seen[found]))
+                        seen[large] |= seen.pop(small)
+                        queues[large].extend(queues.pop(small))
+                        merged_into[small] = large
+                        search = large
+        return []
+
+    def _refresh(self, record: Dict[str, Any]) -> None:
+        """Swap in an updated record of a clustered signal, keeping its position."""
+        incident = self._incident(record["id"])
+        incident.discard(self._records[record["id"]])
+        self._records[record["id"]] = record
+        incident.add(record)
+        self.version += 1
@@ -0,0 +1,226 @@
+"""
+Resource Inventory for SurviveTrack
+Quantities per (zone, resource type) in a NumPy matrix, with vectorized city, danger and scarcity aggregates.
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from src.mapping.zone_catalog import DANGER_LEVELS, Zone
+
+# Estimated stock per listed resource, by the zone's resource density, for zones with no reported stock
+DENSITY_STOCK = {"high": 120.0, "medium": 60.0, "low": 25.0}
+# Stocked types given a line of their own in the summary; any beyond share one line
+SUMMARY_TYPE_LINES = 12
+
+
+class ResourceInventory:
+    """
+    Stock levels as a zones x resource-types matrix.
+
+    Rows are zones and columns are the resource marker types; each row also carries the
+    zone's danger level code and whether its stock was reported rather than estimated.
+    Batched writes go through one vectorized path that also scatters their deltas into
+    per-danger totals and stocked-zone counts, so city and danger aggregates are read
+    without touching the matrix.
+    """
+
+    def __init__(self, resource_markers: Mapping[str, Dict[str, str]], capacity: int = 64):
+        self.logger = logging.getLogger(__name__)
+        self.resource_types: List[str] = list(resource_markers)
+        self.markers = dict(resource_markers)
+        self._columns = {kind: i for i, kind in enumerate(self.resource_types)}
+        # Zone resource labels such as "💧 Water" are matched to types by their emoji
+        self._emoji_types = {marker["emoji"]: kind for kind, marker in resource_markers.items()}
+        self._rows: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._stock = np.zeros((capacity, len(self.resource_types)), dtype=np.float64)
+        self._danger = np.zeros(capacity, dtype=np.uint8)
+        self._reported = np.zeros(capacity, dtype=bool)
+        self._by_danger = np.zeros((len(DANGER_LEVELS), len(self.resource_types)), dtype=np.float64)
+        self._stocked = np.zeros(len(self.resource_types), dtype=np.int64)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def resource_type(self, label: str) -> Optional[str]:
+        """Resource type of a zone resource label like "💧 Water", or of a type name itself."""
+        if label in self._columns:
+            return label
+        return self._emoji_types.get(label.split(" ", 1)[0])
+
+    def add_zone(self, zone_key: str, zone: Zone, seed: bool = True) -> None:
+        """Track a zone, seeding stock for the resources it lists when it is new."""
+        self.load_zones([(zone_key, zone)], seed)
+
+    def load_zones(self, zones: Iterable[Tuple[str, Zone]], seed: bool = True) -> None:
+        """Track many zones at once, seeding every new one in a single write."""
+        width = len(self.resource_types)
+        cells: List[int] = []
+        values: List[float] = []
+        with self._lock:
+            for zone_key, zone in zones:
+                row = self._rows.get(zone_key)
+                is_new = row is None
+                if is_new:
+                    row = self._append(zone_key)
+                danger = DANGER_LEVELS.index(zone.danger) if zone.danger in DANGER_LEVELS else 0
+                if danger != self._danger[row]:
+                    self._by_danger[self._danger[row]] -= self._stock[row]
+                    self._by_danger[danger] += self._stock[row]
+                    self._danger[row] = danger
+                if is_new and seed:
+                    amount = DENSITY_STOCK.get(zone.resource_density, DENSITY_STOCK["low"])
+                    columns = {self._columns[kind] for kind in map(self.resource_type, zone.resources) if kind}
+                    cells.extend(row * width + column for column in columns)
+                    values.extend([amount] * len(columns))
+            if cells:
+                self._write_cells(np.array(cells, dtype=np.intp), np.array(values, dtype=np.float64))
+
+    def remove_zone(self, zone_key: str) -> bool:
+        """Stop tracking a zone, moving the last row into its slot."""
+        with self._lock:
+            row = self._rows.get(zone_key)
+            if row is None:
+                return False
+            width = len(self.resource_types)
+            self._write_cells(np.arange(row * width, (row + 1) * width), np.zeros(width))
+            del self._rows[zone_key]
+            last = len(self._keys) - 1
+            if row != last:
+                moved = self._keys[last]
+                self._keys[row] = moved
+                self._rows[moved] = row
+                self._stock[row] = self._stock[last]
+                self._danger[row] = self._danger[last]
+                self._reported[row] = self._reported[last]
+            self._stock[last] = 0.0
+            self._danger[last] = 0
+            self._reported[last] = False
+            self._keys.pop()
+            return True
+
+    def set_quantities(self, updates: Iterable[Tuple[str, str, float]]) -> int:
+        """Set reported stock for (zone_key, resource_type, quantity) triples; returns how many were applied."""
+        with self._lock:
+            cells, values = self._resolve(updates)
+            # Last write to a cell wins
+            last, first = np.unique(cells[::-1], return_index=True)
+            self._write_cells(last, values[::-1][first])
+            self._reported[last // len(self.resource_types)] = True
+        return len(cells)
+
+    def reported_zones(self) -> int:
+        """Number of zones with stock reported to the store rather than estimated."""
+        with self._lock:
+            return int(np.count_nonzero(self._reported[:len(self._keys)]))
+
+    def zone_stock(self, zone_key: str) -> Dict[str, float]:
+        """Non-zero stock of one zone by resource type."""
+        with self._lock:
+            row = self._rows.get(zone_key)
+            if row is None:
+                return {}
+            return {kind: float(q) for kind, q in zip(self.resource_types, self._stock[row]) if q > 0}
+
+    def city_totals(self) -> Dict[str, float]:
+        """Total stock of every resource type across all zones."""
+        with self._lock:
+            totals = self._by_danger.sum(axis=0)
+        return dict(zip(self.resource_types, totals.tolist()))
+
+    def totals_by_danger(self) -> Dict[str, Dict[str, float]]:
+        """Total stock of every resource type, grouped by zone danger level."""
+        with self._lock:
+            grouped = self._by_danger.copy()
+        return {level: dict(zip(self.resource_types, row.tolist())) for level, row in zip(DANGER_LEVELS, grouped)}
+
+    def top_zones(self, resource_type: str, k: int = 5) -> List[Tuple[str, float]]:
+        """(zone_key, quantity) of the k best-stocked zones for a resource type."""
+        column = self._columns[resource_type]
+        with self._lock:
+            stock = self._stock[:len(self._keys), column]
+            k = min(k, len(stock))
+            if k == 0:
+                return []
+            top = np.argpartition(-stock, k - 1)[:k]
+            top = top[np.argsort(-stock[top], kind="stable")]
+            return [(self._keys[row], float(stock[row])) for row in top if stock[row] > 0]
+
+    def scarcity(self) -> List[Tuple[str, float, float]]:
+        """(resource_type, total, share of zones stocking it), scarcest first."""
+        with self._lock:
+            totals = self._by_danger.sum(axis=0)
+            coverage = self._stocked / max(len(self._keys), 1)
+        order = np.lexsort((coverage, totals))
+        return [(self.resource_types[i], float(totals[i]), float(coverage[i])) for i in order]
+
+    def summary_lines(self, top: int = SUMMARY_TYPE_LINES) -> List[str]:
+        """
+        Human-readable stock report for chat replies and ARIA context.
+
+        Every stocked type is listed, largest first; past top types, the rest share a "+N more" line.
+        """
+        totals = self.city_totals()
+        by_danger = self.totals_by_danger()
+        stocked = sorted(((q, kind) for kind, q in totals.items() if q > 0), reverse=True)
+        lines = []
+        for q, kind in stocked[:top]:
+            best_zone, best = self.top_zones(kind, 1)[0]
+            lines.append(
+                f"{self.markers[kind]['emoji']} {self.markers[kind]['name']}: {q:,.0f} units "
+                f"({by_danger['low'][kind] / q:.0%} in low-danger zones, most at {best_zone}: {best:,.0f})"
+            )
+        if len(stocked) > top:
+            lines.append(f"+{len(stocked) - top} more: " + ", ".join(
+                f"{self.markers[kind]['emoji']} {self.markers[kind]['name']}: {q:,.0f}" for q, kind in stocked[top:]
+            ))
+        scarce = [kind for kind, total, _ in self.scarcity() if total == 0]
+        if scarce:
+            lines.append("Out of stock city-wide: " + ", ".join(self.markers[kind]["name"] for kind in scarce))
+        reported = self.reported_zones()
+        if reported < len(self):
+            lines.append(f"Stock reported for {reported} of {len(self)} zones; the rest estimated from resource density")
+        return lines
+
+    def _write_cells(self, cells: np.ndarray, values: np.ndarray) -> None:
+        """Overwrite distinct flat matrix cells and fold the change into the running aggregates."""
+        width = len(self.resource_types)
+        flat = self._stock.ravel()
+        old = flat[cells]
+        flat[cells] = values
+        rows, columns = np.divmod(cells, width)
+        np.add.at(self._by_danger, (self._danger[rows], columns), values - old)
+        np.add.at(self._stocked, columns, (values > 0).astype(np.int64) - (old > 0))
+
+    def _append(self, zone_key: str) -> int:
+        row = len(self._keys)
+        if row == len(self._stock):
+            self._stock = np.concatenate([self._stock, np.zeros_like(self._stock)])
+            self._danger = np.concatenate([self._danger, np.zeros_like(self._danger)])
+            self._reported = np.concatenate([self._reported, np.zeros_like(self._reported)])
+        self._rows[zone_key] = row
+        self._keys.append(zone_key)
+        return row
+
+    def _resolve(self, updates: Iterable[Tuple[str, str, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Flat matrix cell and value arrays for updates, skipping unknown zones and types."""
+        rows, columns, values = [], [], []
+        skipped = 0
+        for zone_key, kind, quantity in updates:
+            row = self._rows.get(zone_key)
+            column = self._columns.get(self.resource_type(kind) or "")
+            if row is None or column is None:
+                skipped += 1
+                continue
+            rows.append(row)
+            columns.append(column)
+            values.append(quantity)
+        if skipped:
+            self.logger.warning(f"⚠️ Skipped {skipped} inventory update(s) for unknown zones or resource types")
+        cells = np.array(rows, dtype=np.intp) * len(self.resource_types) + np.array(columns, dtype=np.intp)
+        return cells, np.array(values, dtype=np.float64)
@@ -0,0 +1,260 @@
+"""
+Live Feed for SurviveTrack
+Pushes SOS signals, zone alerts and threat sightings to every open map in short coalesced batches.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.mapping.marker_layers import make_point
+from src.mapping.outbreak import ALERT_RADIUS_M, current_outbreak
+
+Entry = Tuple[str, Dict[str, Any]]
+
+
+class LiveFeed:
+    """
+    Shared layer of live map features, published in batches.
+
+    Sources publish or retract features by id at any rate; a background thread closes a
+    batch every window_s seconds in which only the last state of each feature survives.
+    Batches are computed once and kept in a short history, so each connected map only
+    applies the small batches it has not seen instead of regenerating its scene. Waiters
+    on asyncio loops are woken per batch without holding a thread each.
+    """
+
+    def __init__(self, window_s: float = 0.25, history: int = 256):
+        self.window_s = window_s
+        self.logger = logging.getLogger(__name__)
+        self.seq = 0
+        self.stats = {"published": 0, "coalesced": 0, "batches": 0}
+        self._features: Dict[str, Entry] = {}
+        self._pending: Dict[str, Optional[Entry]] = {}
+        self._batches: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self._pollers: List[Callable[[], None]] = []
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, kind: str, feature: Dict[str, Any]) -> None:
+        """Queue a feature, keyed by its id, for the next batch."""
+        self._queue(feature["id"], (kind, feature))
+
+    def retract(self, feature_id: str) -> None:
+        """Queue removing a feature in the next batch."""
+        self._queue(feature_id, None)
+
+    def add_poller(self, poll: Callable[[], None]) -> None:
+        """Call poll on the feed thread before each batch closes, for sources that must be polled."""
+        self._pollers.append(poll)
+
+    def snapshot(self) -> Tuple[int, Dict[str, Entry]]:
+        """(seq, every live feature by id) as of the latest batch."""
+        with self._lock:
+            return self.seq, dict(self._features)
+
+    def since(self, seq: int) -> Optional[List[Dict[str, Any]]]:
+        """Batches after seq, oldest first, or None when some of them already left the history."""
+        with self._lock:
+            if seq >= self.seq:
+                return []
+            if not self._batches or self._batches[0]["seq"] > seq + 1:
+                return None
+            return [batch for batch in self._batches if batch["seq"] > seq]
+
+    async def wait(self, seq: int, timeout: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        """Batches after seq as soon as there are any; empty after timeout, None when seq fell out of the history."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            ready = self.seq > seq
+            if not ready:
+                self._waiters.append((loop, future))
+        if not ready:
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    if (loop, future) in self._waiters:
+                        self._waiters.remove((loop, future))
+        return self.since(seq)
+
+    def start(self) -> "LiveFeed":
+        """Start closing batches in a background thread."""
+        self._thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the batching thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """Close the current batch now; returns it, or None when nothing changed."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            upserts, removed = [], []
+            for feature_id, entry in pending.items():
+                previous = self._features.get(feature_id)
+                if entry is None:
+                    if previous is not None:
+                        del self._features[feature_id]
+                        removed.append(feature_id)
+                elif entry != previous:
+                    self._features[feature_id] = entry
+                    upserts.append(list(entry))
+            if not upserts and not removed:
+                return None
+            self.seq += 1
+            batch = {"seq": self.seq, "upserts": upserts, "removed": removed}
+            self._batches.append(batch)
+            self.stats["batches"] += 1
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                # The waiter's loop has closed; its client is gone
+                pass
+        return batch
+
+    def _queue(self, feature_id: str, entry: Optional[Entry]) -> None:
+        with self._lock:
+            if feature_id in self._pending:
+                self.stats["coalesced"] += 1
+            self._pending[feature_id] = entry
+            self.stats["published"] += 1
+
+    def _run(self) -> None:
+        """Body of the batching thread."""
+        while not self._stop.wait(self.window_s):
+            for poll in list(self._pollers):
+                try:
+                    poll()
+                except Exception as e:
+                    self.logger.error(f"Live feed poll failed: {e}")
+            self.flush()
+
+
+def merge_batches(batches: List[Dict[str, Any]]) -> Tuple[List[List[Any]], List[str]]:
+    """Fold consecutive batches into one ([kind, feature] upserts, removed ids) change."""
+    upserts: Dict[str, List[Any]] = {}
+    removed: Dict[str, None] = {}
+    for batch in batches:
+        for feature_id in batch["removed"]:
+            upserts.pop(feature_id, None)
+            removed[feature_id] = None
+        for kind, feature in batch["upserts"]:
+            removed.pop(feature["id"], None)
+            upserts[feature["id"]] = [kind, feature]
+    return list(upserts.values()), list(removed)
+
+
+def _round_count(count: int) -> int:
+    """A head count to two significant figures, so alerts are not re-pushed for every straggler."""
+    return count if count < 100 else int(round(count, 2 - len(str(count))))
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def signal_feature(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Live map beacon of an SOS signal log record."""
+    priority = record["priority"]
+    return make_point(
+        record["lat"], record["lon"],
+        f"🆘<br><span class='st-sub-aid'>{priority}</span>",
+        popup=(
+            f"<b>🚨 {record.get('name') or 'SOS #' + str(record['id'])}</b><br>Priority: {priority}"
+            f"<br>Survivors: {record['survivors']}<br>{record.get('message', '')}"
+        ),
+        variant=priority.lower() if priority in ("CRITICAL", "HIGH", "MEDIUM") else "critical",
+        feature_id=f"live/sos/{record['id']}"
+    )
+
+
+def alert_feature(zone_key: str, zone, infected: Optional[int] = None) -> Dict[str, Any]:
+    """Live map badge carrying a zone's current alert and, when the outbreak runs, the infected near it."""
+    return make_point(
+        zone.coords[0], zone.coords[1], "📢",
+        popup=f"<b>📢 {zone.name}</b><br>{zone.alert}" + (
+            f"<br>🧟 ~{infected} infected within {ALERT_RADIUS_M / 1000:.0f} km" if infected is not None else ""
+        ),
+        feature_id=f"live/alert/{zone_key}"
+    )
+
+
+def sighting_feature(sighting_id: int, lat: float, lon: float, kind: str, count: int,
+                     seen_at: Optional[str]) -> Dict[str, Any]:
+    """Live map marker of a threat sighting."""
+    return make_point(
+        lat, lon, "🧟" if count == 1 else f"🧟×{count}",
+        popup=f"Sighting: {count} {kind}" + (f"<br>Seen: {seen_at}" if seen_at else ""),
+        variant="high",
+        feature_id=f"live/threat/{sighting_id}"
+    )
+
+
+def start_live_feed(config, zone_manager, sos_ingestor) -> Optional[LiveFeed]:
+    """Start the live feed wired to SOS signals, zone changes and new sightings, unless its window is 0."""
+    if not config.LIVE_PUSH_WINDOW_MS:
+        return None
+    feed = LiveFeed(config.LIVE_PUSH_WINDOW_MS / 1000)
+
+    def on_signals(records: List[Dict[str, Any]]) -> None:
+        for signal_id in {record["id"] for record in records}:
+            record = sos_ingestor.index.get(signal_id)
+            if record is None:
+                feed.retract(f"live/sos/{signal_id}")
+            else:
+                feed.publish("sos", signal_feature(record))
+
+    def on_zones(zone_keys: List[str]) -> None:
+        for zone_key in zone_keys:
+            zone = zone_manager.get_zone(zone_key)
+            if zone is None:
+                feed.retract(f"live/alert/{zone_key}")
+            else:
+                feed.publish("danger", alert_feature(zone_key, zone, infected.get(zone_key)))
+
+    # Only the newest sightings stay on the map
+    shown: Deque[int] = deque()
+    last_sighting = [0]
+    # Rounded infected count last pushed per zone, and the outbreak tick they were counted at
+    infected: Dict[str, int] = {}
+    last_tick = [-1]
+
+    def poll() -> None:
+        for sighting in zone_manager.store.sightings_since(last_sighting[0], config.LIVE_THREAT_LIMIT):
+            feed.publish("zombie", sighting_feature(*sighting))
+            shown.append(sighting[0])
+            last_sighting[0] = sighting[0]
+        while len(shown) > config.LIVE_THREAT_LIMIT:
+            feed.retract(f"live/threat/{shown.popleft()}")
+        outbreak = current_outbreak()
+        if outbreak is not None and outbreak.tick != last_tick[0]:
+            last_tick[0] = outbreak.tick
+            for zone_key, lat, lon, _, _ in zone_manager.store.zone_positions():
+                count = _round_count(outbreak.count_near(lat, lon, ALERT_RADIUS_M))
+                if infected.get(zone_key) != count:
+                    infected[zone_key] = count
+                    on_zones([zone_key])
+
+    for record in sos_ingestor.index.records():
+        feed.publish("sos", signal_feature(record))
+    sos_ingestor.subscribe(on_signals)
+    zone_manager.subscribe(on_zones)
+    feed.add_poller(poll)
+    poll()
+    feed.flush()
+    return feed.start()
@@ -5,8 +5,23 @@ Creates folium maps with zones, resources, and tactical overlays.
 
 import math
 import random
+import threading
 import time
 import logging
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.mapping.cluster_index import ClusterIndexCache, build_cluster_index, viewport_bbox
+from src.mapping.map_sync import MapSyncSession, make_view, render_live_map
+from src.mapping.marker_layers import (
+    add_overlay_hook, build_scene_map, make_area, make_pin, make_point, make_route, overlay_layers
+)
+from src.mapping.outbreak import current_outbreak
+from src.mapping.render_cache import MapRenderCache
+from src.mapping.threat_heatmap import apply_threat_heatmap, density_layer
+from src.mapping.tile_server import basemap_options
+from src.utils.geo import offset
 
 try:
     import folium
@@ -15,12 +30,51 @@ except ImportError:
     FOLIUM_AVAILABLE = False
     folium = None
 
+KARACHI_CENTER = (24.8607, 67.0011)
+OVERVIEW_ZOOM = 11
+ZONE_ZOOM = 16
+
+# Planned routes are drawn in safe-passage green, dashed so they stay visible over zone circles
+ROUTE_COLOR = "#39ff14"
+ROUTE_MAX_ZOOM = 16
+
+# Marker layouts are written as [north, east, ...] offsets in steps of one thousandth of a degree of latitude
+LAYOUT_STEP_M = 111.32
+
+# While the outbreak simulation runs, zone maps show the infected nearest each zone instead of a fixed layout
+ZONE_INFECTED_RADIUS_M = 600
+ZONE_INFECTED_LIMIT = 12
+OVERVIEW_INFECTED_RADIUS_M = 1500
+OVERVIEW_INFECTED_LIMIT = 4
+# Layers holding the simulated infected; they change every tick, so cached renders leave them out and get them laid over
+INFECTED_LAYERS = ("zombie", "heatmap")
+# Shared heatmap the whole outbreak is drawn into, whichever map shows it
+OUTBREAK_HEATMAP = "outbreak"
+
+
+def _layout(coords, positions):
+    """Resolve a marker layout around coords into [lat, lon, ...] rows with one vectorized offset call."""
+    if not positions:
+        return []
+    steps = np.array([row[:2] for row in positions], dtype=np.float64) * LAYOUT_STEP_M
+    lats, lons = offset(coords[0], coords[1], steps[:, 0], steps[:, 1])
+    return [[lat, lon, *row[2:]] for lat, lon, row in zip(lats.tolist(), lons.tolist(), positions)]
+
+
 class MapGenerator:
     """Generates interactive maps with tactical overlays for SurviveTrack."""
     
-    def __init__(self, config):
+    def __init__(self, config, zone_manager=None):
         self.config = config
+        self.zone_manager = zone_manager
         self.logger = logging.getLogger(__name__)
+        self.render_cache = MapRenderCache(config.MAP_CACHE_SIZE)
+        self.cluster_indexes = ClusterIndexCache()
+        self.basemap = basemap_options(config)
+        self._density_at = -math.inf
+        self._density_refresh = threading.Lock()
+        if zone_manager is not None:
+            zone_manager.subscribe(self._on_zones_changed)
         
         if not FOLIUM_AVAILABLE:
             self.logger.error("Folium not available. Map generation will be limited.")
@@ -32,18 +86,26 @@ class MapGenerator:
         if not FOLIUM_AVAILABLE:
             return self._get_fallback_map_html("Install folium: pip install folium")
         
+        key = MapRenderCache.make_key("overview", show_welcome=show_welcome, version=self._data_version())
+        infected = {} if show_welcome else self._overview_infected_layers()
+        cached = self.render_cache.get(key)
+        if cached is not None:
+            return overlay_layers(cached, infected)
+        
         try:
             # Create base map centered on Karachi
-            m = folium.Map(
-                location=[24.8607, 67.0011],  # Karachi coordinates
-                zoom_start=11,
-                tiles="CartoDB dark_matter"
+            m = build_scene_map(
+                {} if show_welcome else self._overview_static_scene(),
+                location=list(KARACHI_CENTER),  # Karachi coordinates
+                zoom_start=OVERVIEW_ZOOM,
+                mode=self.config.MAP_MARKER_MODE,
+                basemap=self.basemap
             )
+            add_overlay_hook(m, INFECTED_LAYERS)
             
-            if not show_welcome:
-                self._add_zone_overview_markers(m)
-            
-            return m._repr_html_()
+            map_html = m._repr_html_()
+            self.render_cache.put(key, map_html)
+            return overlay_layers(map_html, infected)
             
         except Exception as e:
             self.logger.error(f"Failed to generate overview map: {e}")
@@ -54,264 +116,439 @@ class MapGenerator:
         if not FOLIUM_AVAILABLE:
             return self._get_fallback_map_html(f"Zone {zone_key} map not available")
         
+        zone = zone_data.get(zone_key)
+        if not zone:
+            return self._get_fallback_map_html(f"Zone {zone_key} not found")
+        
+        key = MapRenderCache.make_key("zone", zone_key, cinematic=cinematic, version=self._data_version())
+        infected = self._zone_infected_layers(zone_key, zone)
+        cached = self.render_cache.get(key)
+        if cached is not None:
+            return overlay_layers(cached, infected)
+        
         try:
-            zone = zone_data.get(zone_key)
-            if not zone:
-                return self._get_fallback_map_html(f"Zone {zone_key} not found")
-            
-            # Create map centered on zone
-            m = folium.Map(
+            # Create map centered on zone with zone-specific markers
+            m = build_scene_map(
+                self._zone_static_scene(zone_key, zone),
                 location=zone.coords,
-                zoom_start=16,
-                tiles="CartoDB dark_matter"
+                zoom_start=ZONE_ZOOM,
+                mode=self.config.MAP_MARKER_MODE,
+                basemap=self.basemap
             )
-            
-            # Add zone-specific markers
-            self._add_zone_detailed_markers(m, zone)
-            self._add_resource_markers(m, zone)
-            self._add_zombie_markers(m, zone)
-            self._add_danger_indicators(m, zone)
+            add_overlay_hook(m, INFECTED_LAYERS)
             
             # Add cinematic effects
             map_html = m._repr_html_()
             if cinematic:
                 map_html = self._add_cinematic_effects(map_html, zone)
             
-            return map_html
+            self.render_cache.put(key, map_html)
+            return overlay_layers(map_html, infected)
             
         except Exception as e:
             self.logger.error(f"Failed to generate zone map for {zone_key}: {e}")
             return self._get_fallback_map_html(f"Zone {zone_key} map generation failed")
     
-    def _add_zone_overview_markers(self, map_obj):
-        """Add zone markers for overview map - YOUR ORIGINAL ZONE_DATA"""
-        zones = {
-            "Zone A": {
-                "coords": [24.8182, 67.0256],
-                "danger": "low",
-                "name": "📍 Zone A – Boat Basin",
-                "alert": "🟢 Clear. No zombies spotted.",
-                "resources": ["💧 Water", "🍞 Food", "🏠 Shelter"]
-            },
-            "Zone B": {
-                "coords": [24.8784, 67.0103], 
-                "danger": "medium",
-                "name": "📍 Zone B – Lyari",
-                "alert": "🧟‍♂ Danger! Zombie activity nearby. 🚨",
-                "resources": ["💊 Medicine", "🔦 Flashlight"]
-            },
-            "Zone C": {
-                "coords": [24.9090, 67.0940],
-                "danger": "high", 
-                "name": "📍 Zone C – Railway Station",
-                "alert": "🔴 Safe for now, but stay alert. 👀",
-                "resources": ["🔫 Weapons", "🩺 Medical Kit"]
-            }
+    def generate_route_map(self, zone_key: str, zone, route, start) -> str:
+        """Generate a zone's detailed map with a planned route to it"""
+        if not FOLIUM_AVAILABLE:
+            return self._get_fallback_map_html(f"Route to {zone_key} not available")
+        
+        try:
+            view = self.route_view(route)
+            m = build_scene_map(
+                self.route_scene(zone_key, zone, route, start),
+                location=view["center"],
+                zoom_start=view["zoom"],
+                mode=self.config.MAP_MARKER_MODE,
+                basemap=self.basemap
+            )
+            return m._repr_html_()
+            
+        except Exception as e:
+            self.logger.error(f"Failed to generate route map for {zone_key}: {e}")
+            return self._get_fallback_map_html(f"Route to {zone_key} map generation failed")
+    
+    def generate_live_map(self, session: MapSyncSession) -> str:
+        """Generate the persistent client map that applies scene diffs pushed from the server."""
+        if not FOLIUM_AVAILABLE:
+            return self._get_fallback_map_html("Install folium: pip install folium")
+        
+        try:
+            return render_live_map(session.snapshot(), self.basemap)
+        except Exception as e:
+            self.logger.error(f"Failed to generate live map: {e}")
+            return self._get_fallback_map_html("Map generation failed")
+    
+    def overview_scene(self, show_welcome: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+        """Features of the overview map grouped by marker category."""
+        if show_welcome:
+            return {}
+        scene = self._overview_static_scene()
+        scene.update(self._overview_infected_layers())
+        return scene
+    
+    def zone_scene(self, zone_key: str, zone) -> Dict[str, List[Dict[str, Any]]]:
+        """Features of a zone's detailed map grouped by marker category."""
+        scene = self._zone_static_scene(zone_key, zone)
+        scene.update(self._zone_infected_layers(zone_key, zone))
+        return scene
+    
+    def route_scene(self, zone_key: str, zone, route, start) -> Dict[str, List[Dict[str, Any]]]:
+        """A zone's detailed map features plus a planned route to it and its starting point."""
+        scene = self.zone_scene(zone_key, zone)
+        scene["route"] = [make_route(
+            route.path, ROUTE_COLOR, dash="10 6",
+            popup=f"<b>🧭 Route to {zone.name}</b><br>{route.distance_m / 1000:.1f} km",
+            tooltip=f"🧭 {route.distance_m / 1000:.1f} km",
+            feature_id=f"{zone_key}/route"
+        )]
+        scene["zone"] = scene.get("zone", []) + [make_pin(
+            start[0], start[1], "blue", "user", tooltip="📍 You are here", feature_id=f"{zone_key}/route/start"
+        )]
+        return scene
+    
+    def route_view(self, route) -> Dict[str, Any]:
+        """Camera framing a whole route."""
+        lats = [lat for lat, _ in route.path]
+        lons = [lon for _, lon in route.path]
+        width, height = self.config.MAP_VIEWPORT
+        # Web Mercator: a zoom level z spans 256 * 2**z pixels around the world
+        span_x = max(max(lons) - min(lons), 1e-4) / 360.0
+        span_y = max(max(lats) - min(lats), 1e-4) / 180.0
+        zoom = int(math.floor(math.log2(min(width / span_x, height / span_y) / 256))) - 1
+        return make_view(
+            ((max(lats) + min(lats)) / 2, (max(lons) + min(lons)) / 2),
+            max(min(zoom, ROUTE_MAX_ZOOM), OVERVIEW_ZOOM), fly=True
+        )
+    
+    def threat_positions(self):
+        """[lat, lon] of every simulated infected, or of every infected marker the zone maps show without it."""
+        outbreak = current_outbreak()
+        if outbreak is not None:
+            lats, lons = outbreak.positions(np.arange(len(outbreak)))
+            return np.column_stack([lats, lons])
+        zones = self.zone_manager.get_all_zones() if self.zone_manager else {}
+        return [
+            feature["geometry"]["coordinates"][::-1]
+            for zone_key, zone in zones.items() for feature in self._zombie_points(zone_key, zone)
+        ]
+    
+    def threat_density(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Density layer of the whole outbreak, or nothing when the simulation is off.
+
+        Rasterizing every infected takes a few hundred milliseconds, so after the first
+        draw the layer is moved to the latest tick in the background at most every
+        MAP_HEATMAP_REFRESH_S, and maps show the last finished raster meanwhile.
+        """
+        if current_outbreak() is None:
+            return {}
+        if self._density_at == -math.inf:
+            with self._density_refresh:
+                if self._density_at == -math.inf:
+                    density_layer(OUTBREAK_HEATMAP, self.config, self.threat_positions())
+                    self._density_at = time.monotonic()
+        elif (time.monotonic() - self._density_at >= self.config.MAP_HEATMAP_REFRESH_S
+              and self._density_refresh.acquire(blocking=False)):
+            def refresh():
+                try:
+                    density_layer(OUTBREAK_HEATMAP, self.config, self.threat_positions())
+                except Exception as e:
+                    self.logger.error(f"Outbreak heatmap refresh failed: {e}")
+                finally:
+                    self._density_at = time.monotonic()
+                    self._density_refresh.release()
+            threading.Thread(target=refresh, name="outbreak-heatmap", daemon=True).start()
+        return density_layer(OUTBREAK_HEATMAP, self.config)
+    
+    @staticmethod
+    def overview_view() -> Dict[str, Any]:
+        """Camera for the overview map."""
+        return make_view(KARACHI_CENTER, OVERVIEW_ZOOM)
+    
+    @staticmethod
+    def zone_view(zone, cinematic: bool = True) -> Dict[str, Any]:
+        """Camera for a zone map, flying in close when cinematic."""
+        if cinematic:
+            return make_view(zone.coords, 18, fly=True, cinematic=True)
+        return make_view(zone.coords, ZONE_ZOOM)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get render cache hit/miss/eviction counters."""
+        return self.render_cache.stats()
+    
+    def _on_zones_changed(self, zone_keys: List[str]) -> None:
+        """Drop renders of the old zone data as soon as the zone store changes."""
+        self.render_cache.clear()
+        self.logger.info(f"🗺️ Map cache cleared after {len(zone_keys)} zone change(s)")
+    
+    def _data_version(self):
+        """Current zone data version, and whether the simulation supplies the infected, used to key cached renders."""
+        version = self.zone_manager.version if self.zone_manager else 0
+        return (version, current_outbreak() is not None)
+    
+    def _overview_static_scene(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Overview features that only change with the zone data."""
+        return apply_threat_heatmap("overview", self._zone_overview_features(), self.config)
+    
+    def _overview_infected_layers(self) -> Dict[str, List[Dict[str, Any]]]:
+        """The outbreak's density plus pins for the infected around every zone, or nothing when the simulation is off."""
+        if current_outbreak() is None or not self.zone_manager:
+            return {}
+        zombies = [
+            point for zone_key, zone in self.zone_manager.get_all_zones().items()
+            for point in self._overview_zombie_points(zone_key, zone)
+        ]
+        return apply_threat_heatmap("overview", {"zombie": zombies}, self.config, self.threat_density())
+    
+    def _zone_static_scene(self, zone_key: str, zone) -> Dict[str, List[Dict[str, Any]]]:
+        """A zone's detailed features that only change with the zone data."""
+        pin, area = self._zone_detailed_features(zone_key, zone)
+        scene = {
+            "area": [area],
+            "zone": [pin],
+            "resource": self._resource_points(zone_key, zone),
+            "danger": self._danger_points(zone_key, zone),
         }
+        if current_outbreak() is None:
+            scene["zombie"] = self._zombie_points(zone_key, zone)
+        return apply_threat_heatmap(zone_key, scene, self.config)
+    
+    def _zone_infected_layers(self, zone_key: str, zone) -> Dict[str, List[Dict[str, Any]]]:
+        """The outbreak's density plus pins for the infected nearest a zone, or nothing when the simulation is off."""
+        if current_outbreak() is None:
+            return {}
+        return apply_threat_heatmap(
+            zone_key, {"zombie": self._zombie_points(zone_key, zone)}, self.config, self.threat_density()
+        )
+    
+    def _zone_overview_features(self):
+        """Zone features for overview map, read from the zone manager"""
+        zones = self.zone_manager.get_all_zones() if self.zone_manager else {}
+        
+        areas = []
+        pins = []
+        resource_points = []
+        zombie_points = []
         
-        for zone_key, zone_info in zones.items():
+        for zone_key, zone in zones.items():
             color_map = {"low": "green", "medium": "orange", "high": "red"}
-            marker_color = color_map.get(zone_info["danger"], "red")
+            marker_color = color_map.get(zone.danger, "red")
+            lat, lon = zone.coords
             
             # Enhanced SOS Distress Beacon - The Last of Us style
-            folium.Marker(
-                zone_info["coords"],
-                popup=f"<b>{zone_info['name']}</b><br>{zone_info['alert']}<br>Resources: {', '.join(zone_info['resources'])}",
-                icon=folium.Icon(color=marker_color, icon="info-sign"),
-                tooltip=zone_info["name"]
-            ).add_to(map_obj)
+            pins.append(make_pin(
+                lat, lon, marker_color, "info-sign",
+                popup=f"<b>{zone.name}</b><br>{zone.alert}<br>Resources: {', '.join(zone.resources)}",
+                tooltip=zone.name,
+                feature_id=f"overview/{zone_key}/pin"
+            ))
             
             # Add circles around zones
-            folium.CircleMarker(
-                location=zone_info["coords"],
-                radius=40,
-                color=marker_color,
-                fill=True,
-                fill_opacity=0.3,
-                weight=2
-            ).add_to(map_obj)
+            areas.append(make_area(
+                lat, lon, 40, marker_color, fill_opacity=0.3, pixels=True,
+                feature_id=f"overview/{zone_key}/area"
+            ))
             
             # Add resource markers inside zone circles
-            self._add_overview_resource_markers(map_obj, zone_info)
+            resource_points.extend(self._overview_resource_points(zone_key, zone))
             
-            # Add zombie markers for high danger zones
-            if zone_info["danger"] == "high":
-                self._add_overview_zombie_markers(map_obj, zone_info)
+            # Add zombie markers for high danger zones; the simulated infected are laid over separately
+            if zone.danger == "high" and current_outbreak() is None:
+                zombie_points.extend(self._overview_zombie_points(zone_key, zone))
+        
+        scene = {"area": areas, "zone": pins}
+        scene.update(self._level_of_detail(
+            "overview", {"resource": resource_points, "zombie": zombie_points},
+            center=KARACHI_CENTER, zoom=OVERVIEW_ZOOM
+        ))
+        return scene
+    
+    def _level_of_detail(self, name, layers, center, zoom):
+        """Aggregate point layers into clusters when there are too many to send raw."""
+        if sum(len(features) for features in layers.values()) <= self.config.MAP_CLUSTER_THRESHOLD:
+            return layers
+        
+        index = self.cluster_indexes.get(
+            name, self._data_version(),
+            lambda: build_cluster_index(layers, self.config.MAP_CLUSTER_RADIUS)
+        )
+        bbox = viewport_bbox(center[0], center[1], zoom, *self.config.MAP_VIEWPORT)
+        return index.get_layers(bbox, zoom)
     
-    def _add_overview_resource_markers(self, map_obj, zone_info):
-        """Add resource markers for overview - YOUR ORIGINAL RESOURCE SYSTEM"""
-        coords = zone_info["coords"]
+    def _overview_resource_points(self, zone_key, zone):
+        """Resource marker points for overview - YOUR ORIGINAL RESOURCE SYSTEM"""
         
-        if zone_info["danger"] == "low":  # Zone A - abundant resources
+        if zone.danger == "low":  # Zone A - abundant resources
             positions = [
-                [coords[0] + 0.0008, coords[1] - 0.0008, "💧"],
-                [coords[0] - 0.0008, coords[1] + 0.0008, "🍞"],
-                [coords[0] + 0.0006, coords[1] + 0.0006, "🏠"],
-                [coords[0] - 0.0006, coords[1] - 0.0006, "💧"],
+                [0.8, -0.8, "💧"],
+                [-0.8, 0.8, "🍞"],
+                [0.6, 0.6, "🏠"],
+                [-0.6, -0.6, "💧"],
             ]
-        elif zone_info["danger"] == "medium":  # Zone B - medical supplies
+        elif zone.danger == "medium":  # Zone B - medical supplies
             positions = [
-                [coords[0] + 0.0008, coords[1] - 0.0008, "💊"],
-                [coords[0] - 0.0008, coords[1] + 0.0008, "🔦"],
+                [0.8, -0.8, "💊"],
+                [-0.8, 0.8, "🔦"],
             ]
         else:  # Zone C - military equipment
             positions = [
-                [coords[0] + 0.0008, coords[1] - 0.0008, "🔫"],
-                [coords[0] - 0.0008, coords[1] + 0.0008, "🩺"],
+                [0.8, -0.8, "🔫"],
+                [-0.8, 0.8, "🩺"],
             ]
         
-        for lat, lon, emoji in positions:
-            folium.Marker(
-                [lat, lon],
-                icon=folium.DivIcon(html=f"""
-                <div style="
-                    font-size: 12px;
-                    text-shadow: 1px 1px 2px black;
-                    opacity: 0.8;
-                ">
-                {emoji}
-                </div>
-                """),
-                popup=f"<b>📦 Resource</b><br>Zone: {zone_info['name']}<br>Type: {emoji}",
-                tooltip=f"{emoji} Resource"
-            ).add_to(map_obj)
+        return [
+            make_point(
+                lat, lon, emoji,
+                popup=f"<b>📦 Resource</b><br>Zone: {zone.name}<br>Type: {emoji}",
+                tooltip=f"{emoji} Resource",
+                variant="overview",
+                feature_id=f"overview/{zone_key}/resource/{i}"
+            )
+            for i, (lat, lon, emoji) in enumerate(_layout(zone.coords, positions))
+        ]
     
-    def _add_overview_zombie_markers(self, map_obj, zone_info):
-        """Add zombie markers for high danger zones"""
-        coords = zone_info["coords"]
+    def _overview_zombie_points(self, zone_key, zone):
+        """Zombie marker points for high danger zones"""
+        outbreak = current_outbreak()
+        if outbreak is not None:
+            return [
+                make_point(
+                    lat, lon, "🧟", popup="Zombie threat", tooltip="🧟 Hunting" if hunting else "🧟 Infected",
+                    variant="overview", feature_id=f"overview/{zone_key}/zombie/{agent}"
+                )
+                for agent, lat, lon, hunting in outbreak.around(
+                    *zone.coords, OVERVIEW_INFECTED_RADIUS_M, OVERVIEW_INFECTED_LIMIT
+                )
+            ]
+        
         zombie_positions = [
-            [coords[0] + 0.002, coords[1] - 0.002],
-            [coords[0] - 0.002, coords[1] + 0.002],
-            [coords[0] + 0.001, coords[1] + 0.001],
-            [coords[0] - 0.001, coords[1] - 0.001],
+            [2, -2],
+            [-2, 2],
+            [1, 1],
+            [-1, -1],
         ]
         
-        for lat, lon in zombie_positions:
-            folium.Marker(
-                [lat, lon],
-                icon=folium.DivIcon(html='<div style="font-size:18px;text-shadow:1px 1px 2px black;">🧟</div>'),
-                popup="Zombie threat",
-                tooltip="🧟 Infected"
-            ).add_to(map_obj)
+        return [
+            make_point(
+                lat, lon, "🧟", popup="Zombie threat", tooltip="🧟 Infected", variant="overview",
+                feature_id=f"overview/{zone_key}/zombie/{i}"
+            )
+            for i, (lat, lon) in enumerate(_layout(zone.coords, zombie_positions))
+        ]
     
-    def _add_zone_detailed_markers(self, map_obj, zone):
-        """Add detailed markers for a specific zone - YOUR ORIGINAL DETAILED SYSTEM"""
+    def _zone_detailed_features(self, zone_key, zone):
+        """Detailed pin and danger circle for a specific zone - YOUR ORIGINAL DETAILED SYSTEM"""
         color_map = {"low": "green", "medium": "orange", "high": "red"}
         marker_color = color_map.get(zone.danger, "red")
+        lat, lon = zone.coords
         
         # Enhanced zone marker
-        folium.Marker(
-            zone.coords,
+        pin = make_pin(
+            lat, lon, "red", "exclamation-sign",
             popup=f"<b>{zone.name}</b><br>{zone.alert}<br>Resources: {', '.join(zone.resources)}",
-            icon=folium.Icon(color="red", icon="exclamation-sign")
-        ).add_to(map_obj)
+            feature_id=f"{zone_key}/pin"
+        )
         
         # Danger circle
-        folium.CircleMarker(
-            location=zone.coords,
-            radius=40,
-            color=marker_color,
-            fill=True,
-            fill_opacity=0.3,
-            weight=2
-        ).add_to(map_obj)
+        area = make_area(lat, lon, 40, marker_color, fill_opacity=0.3, pixels=True, feature_id=f"{zone_key}/area")
+        return pin, area
     
-    def _add_resource_markers(self, map_obj, zone):
-        """Add resource markers based on zone characteristics - YOUR ORIGINAL RESOURCE PLACEMENT"""
-        coords = zone.coords
+    def _resource_points(self, zone_key, zone):
+        """Resource marker points based on zone characteristics - YOUR ORIGINAL RESOURCE PLACEMENT"""
         
         if zone.danger == "low":  # Zone A - High resources
             positions = [
-                [coords[0] + 0.001, coords[1] - 0.001, "💧"],
-                [coords[0] - 0.002, coords[1] + 0.003, "💧"],
-                [coords[0] + 0.003, coords[1] + 0.002, "💧"],
-                [coords[0] + 0.002, coords[1] - 0.003, "🍞"],
-                [coords[0] - 0.003, coords[1] - 0.001, "🍞"],
-                [coords[0] + 0.002, coords[1] + 0.002, "🏠"],
-                [coords[0] - 0.002, coords[1] - 0.002, "🏠"],
+                [1, -1, "💧"],
+                [-2, 3, "💧"],
+                [3, 2, "💧"],
+                [2, -3, "🍞"],
+                [-3, -1, "🍞"],
+                [2, 2, "🏠"],
+                [-2, -2, "🏠"],
             ]
         elif zone.danger == "medium":  # Zone B - Medium resources
             positions = [
-                [coords[0] + 0.002, coords[1] - 0.002, "💊"],
-                [coords[0] - 0.003, coords[1] + 0.002, "💊"],
-                [coords[0] + 0.001, coords[1] + 0.003, "🔦"],
-                [coords[0] - 0.002, coords[1] - 0.003, "🔦"],
+                [2, -2, "💊"],
+                [-3, 2, "💊"],
+                [1, 3, "🔦"],
+                [-2, -3, "🔦"],
             ]
         else:  # Zone C - Low resources (high risk, high reward)
             positions = [
-                [coords[0] + 0.001, coords[1] - 0.002, "🔫"],
-                [coords[0] - 0.002, coords[1] + 0.001, "🔫"],
-                [coords[0] + 0.003, coords[1] + 0.002, "🩺"],
+                [1, -2, "🔫"],
+                [-2, 1, "🔫"],
+                [3, 2, "🩺"],
             ]
         
-        for lat, lon, emoji in positions:
-            folium.Marker(
-                [lat, lon],
-                icon=folium.DivIcon(html=f"""
-                <div style="
-                    font-size: 16px;
-                    text-shadow: 1px 1px 3px black;
-                    background: rgba(0,0,0,0.7);
-                    border-radius: 50%;
-                    padding: 4px;
-                    border: 1px solid #daa520;
-                ">
-                {emoji}
-                </div>
-                """),
+        return [
+            make_point(
+                lat, lon, emoji,
                 popup=f"<b>📦 Resource</b><br>Zone: {zone.name}<br>Type: {emoji}",
-                tooltip=f"{emoji} Resource"
-            ).add_to(map_obj)
+                tooltip=f"{emoji} Resource",
+                feature_id=f"{zone_key}/resource/{i}"
+            )
+            for i, (lat, lon, emoji) in enumerate(_layout(zone.coords, positions))
+        ]
     
-    def _add_zombie_markers(self, map_obj, zone):
-        """Add zombie markers based on zone danger level - YOUR ORIGINAL ZOMBIE DISTRIBUTION"""
-        coords = zone.coords
+    def _zombie_points(self, zone_key, zone):
+        """Zombie marker points based on zone danger level - YOUR ORIGINAL ZOMBIE DISTRIBUTION"""
+        outbreak = current_outbreak()
+        if outbreak is not None:
+            return [
+                make_point(
+                    lat, lon, "🧟", popup=f"Zombie threat in {zone.name}",
+                    tooltip="🧟 Hunting" if hunting else "🧟 Infected",
+                    feature_id=f"{zone_key}/zombie/{agent}"
+                )
+                for agent, lat, lon, hunting in outbreak.around(*zone.coords, ZONE_INFECTED_RADIUS_M, ZONE_INFECTED_LIMIT)
+            ]
         
         if zone.danger == "low":
             zombie_positions = []  # No zombies in safe zones
         elif zone.danger == "medium":
             zombie_positions = [
-                [coords[0] + 0.003, coords[1] - 0.003],
-                [coords[0] - 0.003, coords[1] + 0.003],
-                [coords[0] + 0.005, coords[1] + 0.002],
-                [coords[0] - 0.002, coords[1] - 0.005]
+                [3, -3],
+                [-3, 3],
+                [5, 2],
+                [-2, -5]
             ]
         else:  # high danger
             zombie_positions = [
-                [coords[0] + 0.003, coords[1] - 0.003],
-                [coords[0] - 0.003, coords[1] + 0.003],
-                [coords[0] + 0.005, coords[1] + 0.002],
-                [coords[0] - 0.002, coords[1] - 0.005],
-                [coords[0] + 0.001, coords[1] + 0.006],
-                [coords[0] - 0.006, coords[1] - 0.001],
-                [coords[0] + 0.004, coords[1] - 0.001],
-                [coords[0] - 0.001, coords[1] + 0.004],
+                [3, -3],
+                [-3, 3],
+                [5, 2],
+                [-2, -5],
+                [1, 6],
+                [-6, -1],
+                [4, -1],
+                [-1, 4],
             ]
         
-        for lat, lon in zombie_positions:
-            folium.Marker(
-                [lat, lon],
-                icon=folium.DivIcon(html='<div style="font-size:20px;text-shadow:1px 1px 2px black;">🧟</div>'),
-                popup=f"Zombie threat in {zone.name}",
-                tooltip="🧟 Infected"
-            ).add_to(map_obj)
+        return [
+            make_point(
+                lat, lon, "🧟", popup=f"Zombie threat in {zone.name}", tooltip="🧟 Infected",
+                feature_id=f"{zone_key}/zombie/{i}"
+            )
+            for i, (lat, lon) in enumerate(_layout(zone.coords, zombie_positions))
+        ]
     
-    def _add_danger_indicators(self, map_obj, zone):
-        """Add danger warning indicators around the zone - YOUR ORIGINAL DANGER SYSTEM"""
-        coords = zone.coords
+    def _danger_points(self, zone_key, zone):
+        """Danger warning indicators around the zone - YOUR ORIGINAL DANGER SYSTEM"""
         
         danger_positions = [
-            [coords[0] + 0.005, coords[1] + 0.005],
-            [coords[0] - 0.005, coords[1] - 0.005]
+            [5, 5],
+            [-5, -5]
         ]
         
-        for lat, lon in danger_positions:
-            folium.Marker(
-                [lat, lon],
-                icon=folium.DivIcon(html='<div style="font-size:24px;color:red;text-shadow:2px 2px 4px black;">❗</div>'),
-                popup="Danger Zone Warning",
-                tooltip="⚠️ Danger"
-            ).add_to(map_obj)
+        return [
+            make_point(
+                lat, lon, "❗", popup="Danger Zone Warning", tooltip="⚠️ Danger",
+                feature_id=f"{zone_key}/danger/{i}"
+            )
+            for i, (lat, lon) in enumerate(_layout(zone.coords, danger_positions))
+        ]
     
     def _add_cinematic_effects(self, map_html: str, zone) -> str:
         """Add cinematic JavaScript effects to the map - YOUR ORIGINAL CINEMATIC SYSTEM"""
@@ -0,0 +1,259 @@
+"""
+Live Map Synchronization for SurviveTrack
+Keeps one persistent client map per session and pushes feature diffs and view changes to it.
+"""
+
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.mapping.marker_layers import (
+    MARKER_STYLES, POINT_TO_LAYER_JS, MapStylesheet, RawElement, _to_script_json
+)
+from src.mapping.tile_server import basemap_options, use_served_assets
+
+try:
+    import folium
+    from branca.element import MacroElement
+    from jinja2 import Template
+    FOLIUM_AVAILABLE = True
+except ImportError:
+    FOLIUM_AVAILABLE = False
+    folium = None
+    MacroElement = object
+    Template = None
+
+# window.postMessage type the live map listens for
+DIFF_MESSAGE_TYPE = "survivetrack-map-diff"
+
+# Layer groups created up front so later categories keep a stable stacking order
+LAYER_ORDER = ["area", "heatmap", "route", "zone", "sos", "resource", "zombie", "danger", "cluster"]
+
+Scene = Dict[str, List[Dict[str, Any]]]
+
+
+def make_view(center: Sequence[float], zoom: int, fly: bool = False, cinematic: bool = False) -> Dict[str, Any]:
+    """Build a camera change for the live map."""
+    return {"center": [center[0], center[1]], "zoom": zoom, "fly": fly, "cinematic": cinematic}
+
+
+class MapSyncSession:
+    """
+    Server-side mirror of what one browser's live map is showing.
+
+    Each update compares a new scene with the mirrored one and returns only the
+    features that were added, changed or removed, plus the requested view. Features
+    pushed from the live feed sit in a layer of their own that scene updates keep,
+    and their diffs are marked live so the browser applies them whatever order they
+    arrive in relative to scene diffs.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.view: Optional[Dict[str, Any]] = None
+        self._features: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._live: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo) -> "MapSyncSession":
+        # gr.State copies its initial value for every browser session
+        copy = MapSyncSession()
+        with self._lock:
+            copy.seq, copy.view = self.seq, self.view
+            copy._features, copy._live = dict(self._features), dict(self._live)
+        return copy
+
+    def update(self, scene: Scene, view: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Replace the mirrored scene and get the diff that brings the client up to date."""
+        features = self._index(scene)
+        with self._lock:
+            features.update(self._live)
+            added, changed = [], []
+            for feature_id, entry in features.items():
+                previous = self._features.get(feature_id)
+                if previous is None:
+                    added.append(list(entry))
+                elif previous != entry:
+                    changed.append(list(entry))
+            removed = [feature_id for feature_id in self._features if feature_id not in features]
+
+            self._features = features
+            self.seq += 1
+            if view is not None:
+                self.view = view
+            return {"seq": self.seq, "added": added, "changed": changed, "removed": removed, "view": view}
+
+    def patch_live(self, upserts: List[List[Any]], removed: Sequence[str]) -> Dict[str, Any]:
+        """Apply [kind, feature] upserts and removals from the live feed and get the live diff for the client."""
+        with self._lock:
+            added, changed, gone = [], [], []
+            for feature_id in removed:
+                if self._live.pop(feature_id, None) is not None:
+                    self._features.pop(feature_id, None)
+                    gone.append(feature_id)
+            for kind, feature in upserts:
+                entry = (kind, feature)
+                previous = self._live.get(feature["id"])
+                if previous == entry:
+                    continue
+                (added if previous is None else changed).append([kind, feature])
+                self._live[feature["id"]] = self._features[feature["id"]] = entry
+            return {"seq": self.seq, "live": True, "added": added, "changed": changed, "removed": gone, "view": None}
+
+    def sync_live(self, features: Dict[str, Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Replace the whole live layer, for a client joining or one that fell behind the feed."""
+        with self._lock:
+            stale = [feature_id for feature_id in self._live if feature_id not in features]
+        return self.patch_live([list(entry) for entry in features.values()], stale)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Full state as a reset diff, used to seed a freshly rendered live map."""
+        with self._lock:
+            view = dict(self.view, fly=False) if self.view else None
+            return {
+                "seq": self.seq,
+                "reset": True,
+                "added": [list(entry) for entry in self._features.values()],
+                "changed": [],
+                "removed": [],
+                "view": view,
+            }
+
+    @staticmethod
+    def _index(scene: Scene) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Key scene features by id, deriving a content id for features without one."""
+        features = {}
+        for kind, layer in scene.items():
+            for feature in layer:
+                feature_id = feature.get("id")
+                if feature_id is None:
+                    digest = hashlib.sha1(_to_script_json(feature).encode("utf-8")).hexdigest()[:12]
+                    feature_id = f"{kind}#{digest}"
+                    feature = dict(feature, id=feature_id)
+                features[feature_id] = (kind, feature)
+        return features
+
+
+class LiveMapBridge(MacroElement):
+    """Client half of the sync protocol: keeps Leaflet layers by feature id and applies diffs."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            (function(map, initial) {
+                var pointToLayer = ({{ this.point_to_layer_js }});
+                var groups = {};
+                var layers = {};
+                var timers = [];
+                var seq = -1;
+
+                function group(kind) {
+                    if (!groups[kind]) { groups[kind] = L.layerGroup().addTo(map); }
+                    return groups[kind];
+                }
+                {{ this.layer_order_json }}.forEach(group);
+
+                function addFeature(kind, feature) {
+                    var coords = feature.geometry.coordinates;
+                    var layer = pointToLayer(kind)(feature, L.latLng(coords[1], coords[0]));
+                    layers[feature.id] = {kind: kind, layer: layer};
+                    group(kind).addLayer(layer);
+                }
+
+                function removeFeature(id) {
+                    var entry = layers[id];
+                    if (entry) {
+                        groups[entry.kind].removeLayer(entry.layer);
+                        delete layers[id];
+                    }
+                }
+
+                function tilt(transform) {
+                    var container = map.getContainer();
+                    container.style.transform = transform;
+                    container.style.transformOrigin = "center bottom";
+                    container.style.transition = "transform 1s ease-out";
+                    container.style.filter = transform ? "contrast(1.1) saturate(1.2)" : "";
+                    container.style.boxShadow = transform ? "inset 0 0 50px rgba(255,0,0,0.1)" : "";
+                }
+
+                function setView(view) {
+                    timers.forEach(clearTimeout);
+                    timers = [];
+                    tilt("");
+                    if (view.fly) {
+                        map.flyTo(view.center, view.zoom, {animate: true, duration: 2.5, easeLinearity: 0.1});
+                    } else {
+                        map.setView(view.center, view.zoom);
+                    }
+                    if (view.cinematic) {
+                        timers.push(setTimeout(function() { tilt("perspective(1000px) rotateX(15deg)"); }, 1000));
+                        timers.push(setTimeout(function() { tilt("perspective(1000px) rotateX(5deg)"); }, 4000));
+                    }
+                }
+
+                function apply(diff) {
+                    // Live feed diffs touch only their own layer, so they skip the scene ordering check
+                    if (!diff.live) {
+                        if (diff.seq <= seq) { return; }
+                        seq = diff.seq;
+                    }
+                    if (diff.reset) { Object.keys(layers).forEach(removeFeature); }
+                    diff.removed.forEach(removeFeature);
+                    diff.changed.concat(diff.added).forEach(function(entry) {
+                        removeFeature(entry[1].id);
+                        addFeature(entry[0], entry[1]);
+                    });
+                    if (diff.view) { setView(diff.view); }
+                }
+
+                apply(initial);
+                window.addEventListener("message", function(event) {
+                    var data = event.data;
+                    if (data && data.type === "{{ this.message_type }}") { apply(data.diff); }
+                });
+            })({{ this._parent.get_name() }}, {{ this.initial_json }});
+        {% endmacro %}
+    """) if Template else None
+
+    def __init__(self, snapshot: Dict[str, Any]):
+        super().__init__()
+        self._name = "LiveMapBridge"
+        self.point_to_layer_js = POINT_TO_LAYER_JS
+        self.layer_order_json = _to_script_json(LAYER_ORDER)
+        self.message_type = DIFF_MESSAGE_TYPE
+        self.initial_json = _to_script_json(snapshot)
+
+    def render(self, **kwargs):
+        """Render the script without re-compiling the output as a template."""
+        figure = self.get_root()
+        module = self._template.module
+        figure.script.add_child(RawElement(module.script(self, kwargs)), name=self.get_name())
+
+
+def render_live_map(snapshot: Dict[str, Any], basemap: Optional[Dict[str, str]] = None) -> str:
+    """Render the persistent live map seeded with a session snapshot."""
+    view = snapshot.get("view") or make_view((24.8607, 67.0011), 11)
+    m = folium.Map(location=view["center"], zoom_start=view["zoom"], **(basemap or basemap_options()))
+    use_served_assets(m)
+
+    # Every category may arrive later as a diff, so declare all marker classes up front
+    stylesheet = MapStylesheet()
+    stylesheet.kinds.update(MARKER_STYLES)
+    stylesheet.add_to(m)
+    m._st_stylesheet = stylesheet
+
+    LiveMapBridge(snapshot).add_to(m)
+    return m._repr_html_()
+
+
+def diff_push_js(elem_id: str) -> str:
+    """Browser-side event handler that forwards a diff into the live map iframe inside elem_id."""
+    return f"""
+        (diff) => {{
+            const frame = document.querySelector("#{elem_id} iframe");
+            if (diff && frame && frame.contentWindow) {{
+                frame.contentWindow.postMessage({{type: "{DIFF_MESSAGE_TYPE}", diff: diff}}, "*");
+            }}
+            return [];
+        }}
+    """
@@ -0,0 +1,394 @@
+"""
+Marker Layer Rendering for SurviveTrack
+Emits each marker category as a single GeoJSON layer with a shared client-side style function.
+"""
+
+import json
+from html import escape
+from typing import Any, Dict, List, Optional
+
+from src.mapping.tile_server import basemap_options, use_served_assets
+
+try:
+    import folium
+    from branca.element import Element, MacroElement
+    from jinja2 import Template
+    FOLIUM_AVAILABLE = True
+except ImportError:
+    FOLIUM_AVAILABLE = False
+    folium = None
+    Element = MacroElement = object
+    Template = None
+
+RENDER_MODE_GEOJSON = "geojson"
+RENDER_MODE_MARKERS = "markers"
+
+# Marker rules per category and variant, declared once per map as .st-<kind>-<variant>
+MARKER_STYLES: Dict[str, Dict[str, str]] = {
+    "zombie": {
+        "default": "font-size:20px;text-shadow:1px 1px 2px black;",
+        "overview": "font-size:18px;text-shadow:1px 1px 2px black;",
+        "sos": "font-size:18px;text-shadow:2px 2px 4px black;color:#FF0000;",
+        "critical": "font-size:16px;text-shadow:1px 1px 2px black;color:#FF0000;",
+        "high": "font-size:16px;text-shadow:1px 1px 2px black;color:#FF6600;",
+        "medium": "font-size:16px;text-shadow:1px 1px 2px black;color:#FFAA00;",
+    },
+    "resource": {
+        "default": "font-size:16px;text-shadow:1px 1px 3px black;background:rgba(0,0,0,0.7);"
+                   "border-radius:50%;padding:4px;border:1px solid #daa520;",
+        "overview": "font-size:12px;text-shadow:1px 1px 2px black;opacity:0.8;",
+    },
+    "danger": {
+        "default": "font-size:24px;color:red;text-shadow:2px 2px 4px black;",
+    },
+    "sos": {
+        "default": "background:radial-gradient(circle, #ff0000 0%, #cc0000 50%, #990000 100%);"
+                   "color:white;padding:12px 16px;font-weight:bold;font-size:12px;border-radius:50%;"
+                   "text-align:center;animation:sos-pulse 1.5s infinite;"
+                   "box-shadow:0 0 30px #ff0000, 0 0 60px rgba(255,0,0,0.6);"
+                   "border:3px solid rgba(255,255,255,0.4);z-index:1000;",
+    },
+    "cluster": {
+        "default": "background:rgba(139,0,0,0.85);color:#f5deb3;font-weight:bold;font-size:12px;"
+                   "border-radius:50%;text-align:center;border:2px solid #daa520;"
+                   "box-shadow:0 0 12px rgba(255,0,0,0.6);",
+        "small": "background:rgba(204,102,0,0.85);color:#f5deb3;font-weight:bold;font-size:11px;"
+                 "border-radius:50%;padding:6px 9px;text-align:center;border:2px solid #daa520;",
+        "medium": "background:rgba(178,34,34,0.85);color:#f5deb3;font-weight:bold;font-size:12px;"
+                  "border-radius:50%;padding:9px 12px;text-align:center;border:2px solid #daa520;",
+        "large": "background:rgba(139,0,0,0.9);color:#f5deb3;font-weight:bold;font-size:14px;"
+                 "border-radius:50%;padding:12px 15px;text-align:center;border:2px solid #daa520;"
+                 "box-shadow:0 0 12px rgba(255,0,0,0.6);",
+    },
+}
+
+for _priority, _color in {"critical": "#FF0000", "high": "#FF6600", "medium": "#FFAA00"}.items():
+    MARKER_STYLES["sos"][_priority] = (
+        f"background:radial-gradient(circle, {_color} 0%, {_color}80 50%, {_color}60 100%);"
+        "color:white;padding:8px 12px;font-weight:bold;font-size:10px;border-radius:50%;"
+        f"text-align:center;animation:aid-pulse 2s infinite;box-shadow:0 0 20px {_color};"
+        "border:2px solid rgba(255,255,255,0.3);"
+    )
+
+# Animations and label helpers a category needs besides its marker classes
+CATEGORY_CSS: Dict[str, str] = {
+    "sos": (
+        "@keyframes sos-pulse{0%,100%{transform:scale(1);opacity:1}50%{transform:scale(1.2);opacity:.8}}"
+        "@keyframes aid-pulse{0%,100%{transform:scale(1);opacity:1}50%{transform:scale(1.1);opacity:.8}}"
+        ".st-sub-sos{font-size:10px}.st-sub-aid{font-size:8px}"
+    ),
+}
+
+
+def build_stylesheet(kinds) -> str:
+    """Stylesheet declaring marker classes and animations for the given categories."""
+    return "".join(
+        CATEGORY_CSS.get(kind, "") + "".join(
+            f".st-{kind}-{variant}{{{rules}}}" for variant, rules in MARKER_STYLES.get(kind, {}).items()
+        )
+        for kind in sorted(kinds)
+    )
+
+
+def marker_class(kind: str, variant: Optional[str] = None) -> str:
+    """CSS class for a marker category and variant."""
+    return f"st-{kind}-{variant or 'default'}"
+
+
+# Client-side factory shared by every layer: builds the Leaflet layer for one feature of a category
+POINT_TO_LAYER_JS = """function(kind) {
+    return function(feature, latlng) {
+        var props = feature.properties;
+        var layer;
+        if (props.radius || props.pixel_radius) {
+            var options = {
+                color: props.color, fillColor: props.color, fill: true,
+                fillOpacity: props.fill_opacity, weight: props.weight
+            };
+            if (props.radius) {
+                options.radius = props.radius;
+                layer = L.circle(latlng, options);
+            } else {
+                options.radius = props.pixel_radius;
+                layer = L.circleMarker(latlng, options);
+            }
+        } else if (props.image) {
+            layer = L.imageOverlay(props.image, props.bounds, {opacity: props.opacity, interactive: false});
+        } else if (props.path) {
+            layer = L.polyline(props.path, {
+                color: props.color, weight: props.weight, opacity: props.opacity, dashArray: props.dash
+            });
+        } else if (props.pin) {
+            layer = L.marker(latlng, {icon: L.AwesomeMarkers.icon({
+                icon: props.icon, markerColor: props.pin, iconColor: "white", prefix: "glyphicon"
+            })});
+        } else {
+            layer = L.marker(latlng, {icon: L.divIcon({
+                className: "empty",
+                html: '<div class="st-' + kind + '-' + (props.variant || "default") + '">' + props.label + '</div>'
+            })});
+        }
+        if (props.popup) { layer.bindPopup(props.popup); }
+        if (props.tooltip) { layer.bindTooltip(props.tooltip); }
+        return layer;
+    };
+}"""
+
+
+def make_point(lat: float, lon: float, label: str, popup: Optional[str] = None,
+               tooltip: Optional[str] = None, variant: str = "default",
+               feature_id: Optional[str] = None) -> Dict[str, Any]:
+    """Build a GeoJSON point feature for a map marker."""
+    properties: Dict[str, Any] = {"label": label}
+    if popup:
+        properties["popup"] = popup
+    if tooltip:
+        properties["tooltip"] = tooltip
+    if variant != "default":
+        properties["variant"] = variant
+    return _feature(lat, lon, properties, feature_id)
+
+
+def make_area(lat: float, lon: float, radius: float, color: str, fill_opacity: float = 0.2,
+              weight: int = 2, pixels: bool = False, feature_id: Optional[str] = None) -> Dict[str, Any]:
+    """Build a GeoJSON point feature drawn as a circle, sized in metres or in screen pixels."""
+    properties = {
+        "pixel_radius" if pixels else "radius": radius,
+        "color": color,
+        "fill_opacity": fill_opacity,
+        "weight": weight,
+    }
+    return _feature(lat, lon, properties, feature_id)
+
+
+def make_pin(lat: float, lon: float, color: str, icon: str, popup: Optional[str] = None,
+             tooltip: Optional[str] = None, feature_id: Optional[str] = None) -> Dict[str, Any]:
+    """Build a GeoJSON point feature drawn as a coloured map pin."""
+    properties: Dict[str, Any] = {"pin": color, "icon": icon}
+    if popup:
+        properties["popup"] = popup
+    if tooltip:
+        properties["tooltip"] = tooltip
+    return _feature(lat, lon, properties, feature_id)
+
+
+def make_overlay(image_url: str, bounds: List[List[float]], opacity: float = 0.75,
+                 feature_id: Optional[str] = None) -> Dict[str, Any]:
+    """Build a GeoJSON point feature drawn as an image stretched over [[south, west], [north, east]]."""
+    (south, west), (north, east) = bounds
+    properties = {"image": image_url, "bounds": bounds, "opacity": opacity}
+    return _feature((south + north) / 2, (west + east) / 2, properties, feature_id)
+
+
+def make_route(path: List[List[float]], color: str, weight: int = 5, opacity: float = 0.85,
+               dash: Optional[str] = None, popup: Optional[str] = None, tooltip: Optional[str] = None,
+               feature_id: Optional[str] = None) -> Dict[str, Any]:
+    """Build a GeoJSON point feature at a path's start, drawn as a polyline through its [lat, lon] vertices."""
+    properties: Dict[str, Any] = {"path": path, "color": color, "weight": weight, "opacity": opacity}
+    if dash:
+        properties["dash"] = dash
+    if popup:
+        properties["popup"] = popup
+    if tooltip:
+        properties["tooltip"] = tooltip
+    return _feature(path[0][0], path[0][1], properties, feature_id)
+
+
+def _feature(lat: float, lon: float, properties: Dict[str, Any], feature_id: Optional[str]) -> Dict[str, Any]:
+    feature: Dict[str, Any] = {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [round(lon, 6), round(lat, 6)]},
+        "properties": properties,
+    }
+    if feature_id is not None:
+        feature["id"] = feature_id
+    return feature
+
+
+class MapStylesheet(MacroElement):
+    """Marker classes and animations declared once in the map header for the categories it uses."""
+
+    _template = Template("""
+        {% macro header(this, kwargs) %}
+            <style>{{ this.css }}</style>
+        {% endmacro %}
+    """) if Template else None
+
+    def __init__(self):
+        super().__init__()
+        self._name = "MapStylesheet"
+        self.kinds = set()
+
+    @property
+    def css(self) -> str:
+        return build_stylesheet(self.kinds)
+
+
+def ensure_stylesheet(map_obj, kind: str) -> None:
+    """Declare a marker category in the map's shared stylesheet, attaching it on first use."""
+    stylesheet = getattr(map_obj, "_st_stylesheet", None)
+    if stylesheet is None:
+        stylesheet = MapStylesheet()
+        stylesheet.add_to(map_obj)
+        map_obj._st_stylesheet = stylesheet
+    stylesheet.kinds.add(kind)
+
+
+class PointLayer(MacroElement):
+    """A single GeoJSON FeatureCollection layer rendered through one pointToLayer function."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.geoJSON({{ this.data_json }}, {
+                pointToLayer: ({{ this.point_to_layer_js }})("{{ this.kind }}")
+            }).addTo({{ this._parent.get_name() }});
+        {% endmacro %}
+    """) if Template else None
+
+    def __init__(self, kind: str, features: List[Dict[str, Any]]):
+        super().__init__()
+        self._name = f"PointLayer_{kind}"
+        self.kind = kind
+        self.point_to_layer_js = POINT_TO_LAYER_JS
+        self.data_json = _to_script_json({"type": "FeatureCollection", "features": features})
+
+    def render(self, **kwargs):
+        """Render the script without re-compiling the output as a template."""
+        figure = self.get_root()
+        module = self._template.module
+        figure.script.add_child(RawElement(module.script(self, kwargs)), name=self.get_name())
+
+
+class OverlayHook(MacroElement):
+    """Exposes a function that adds point layers to the map, so layers can be laid over a cached render."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            window.stAddLayers = function(scene) {
+                Object.keys(scene).forEach(function(kind) {
+                    L.geoJSON({type: "FeatureCollection", features: scene[kind]}, {
+                        pointToLayer: ({{ this.point_to_layer_js }})(kind)
+                    }).addTo({{ this._parent.get_name() }});
+                });
+            };
+        {% endmacro %}
+    """) if Template else None
+
+    def __init__(self):
+        super().__init__()
+        self._name = "OverlayHook"
+        self.point_to_layer_js = POINT_TO_LAYER_JS
+
+    def render(self, **kwargs):
+        """Render the script without re-compiling the output as a template."""
+        figure = self.get_root()
+        module = self._template.module
+        figure.script.add_child(RawElement(module.script(self, kwargs)), name=self.get_name())
+
+
+def add_overlay_hook(map_obj, kinds) -> None:
+    """Let overlay_layers() add the given marker categories to this map once it is rendered."""
+    for kind in kinds:
+        ensure_stylesheet(map_obj, kind)
+    OverlayHook().add_to(map_obj)
+
+
+def overlay_layers(map_html: str, scene: Dict[str, List[Dict[str, Any]]]) -> str:
+    """Lay a scene's point layers over map HTML from _repr_html_() of a map with an overlay hook."""
+    scene = {kind: features for kind, features in scene.items() if features}
+    if not scene:
+        return map_html
+    # The map document sits escaped in the iframe's srcdoc, so the script is escaped the same way
+    script = escape(f"<script>stAddLayers({_to_script_json(scene)});</script>")
+    head, tail = map_html.rsplit(escape("</html>"), 1)
+    return head + script + escape("</html>") + tail
+
+
+class RawElement(Element):
+    """Pre-rendered markup added to a figure section as-is."""
+
+    def __init__(self, markup: str):
+        super().__init__()
+        self.markup = markup
+
+    def render(self, **kwargs) -> str:
+        return self.markup
+
+
+def build_scene_map(scene: Dict[str, List[Dict[str, Any]]], location, zoom_start: int,
+                    mode: str = RENDER_MODE_GEOJSON, basemap: Optional[Dict[str, str]] = None):
+    """Create a folium map and add every category of a scene as a point layer."""
+    m = folium.Map(location=location, zoom_start=zoom_start, **(basemap or basemap_options()))
+    use_served_assets(m)
+    for kind, features in scene.items():
+        add_point_layer(m, kind, features, mode)
+    return m
+
+
+def add_point_layer(map_obj, kind: str, features: List[Dict[str, Any]],
+                    mode: str = RENDER_MODE_GEOJSON) -> None:
+    """Add a marker category to the map as one GeoJSON layer or as individual markers."""
+    if not features:
+        return
+
+    ensure_stylesheet(map_obj, kind)
+    if mode == RENDER_MODE_MARKERS:
+        _add_individual_markers(map_obj, kind, features)
+        return
+
+    PointLayer(kind, features).add_to(map_obj)
+
+
+def _add_individual_markers(map_obj, kind: str, features: List[Dict[str, Any]]) -> None:
+    """Legacy path: one folium.Marker with its own DivIcon per point."""
+    for feature in features:
+        lon, lat = feature["geometry"]["coordinates"]
+        props = feature["properties"]
+        if "radius" in props or "pixel_radius" in props:
+            circle_cls = folium.Circle if "radius" in props else folium.CircleMarker
+            circle_cls(
+                location=[lat, lon],
+                radius=props.get("radius", props.get("pixel_radius")),
+                color=props["color"],
+                fill=True,
+                fill_opacity=props["fill_opacity"],
+                weight=props["weight"]
+            ).add_to(map_obj)
+            continue
+        if "image" in props:
+            folium.raster_layers.ImageOverlay(
+                image=props["image"],
+                bounds=props["bounds"],
+                opacity=props["opacity"]
+            ).add_to(map_obj)
+            continue
+        if "path" in props:
+            folium.PolyLine(
+                props["path"],
+                color=props["color"],
+                weight=props["weight"],
+                opacity=props["opacity"],
+                dash_array=props.get("dash"),
+                popup=props.get("popup"),
+                tooltip=props.get("tooltip")
+            ).add_to(map_obj)
+            continue
+        if "pin" in props:
+            folium.Marker(
+                [lat, lon],
+                popup=props.get("popup"),
+                icon=folium.Icon(color=props["pin"], icon=props["icon"]),
+                tooltip=props.get("tooltip")
+            ).add_to(map_obj)
+            continue
+        folium.Marker(
+            [lat, lon],
+            icon=folium.DivIcon(html=f'<div class="{marker_class(kind, props.get("variant"))}">{props["label"]}</div>'),
+            popup=props.get("popup"),
+            tooltip=props.get("tooltip")
+        ).add_to(map_obj)
+
+
+def _to_script_json(value: Any) -> str:
+    """Serialize a value as compact JSON that is safe to embed in a script tag."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
@@ -0,0 +1,357 @@
+"""
+Outbreak Simulation for SurviveTrack
+Agent-based infected population held in NumPy arrays and advanced in vectorized ticks by a background worker.
+"""
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.mapping.threat_heatmap import _convolve
+from src.mapping.tile_store import KARACHI_BBOX
+
+METERS_PER_DEGREE = 111320.0
+
+# Agent states
+WANDERING, HUNTING = 0, 1
+
+# Simulated seconds per second of wall time, so the horde visibly moves between map views
+TIME_SCALE = 30.0
+# Shambling speed in metres per simulated second on open ground
+SHAMBLE_M_PER_S = 0.8
+# Sideways stagger of a step, relative to its length
+STAGGER = 0.35
+# How far noise and survivors carry, in metres; the attraction kernel's standard deviation
+ATTRACTION_RANGE_M = 1500.0
+# Attraction below this fraction of one source's peak is not noticed
+ATTRACTION_FLOOR = 0.02
+# Share of infected seeded around high, medium and low danger zones; the rest roam the whole city
+ZONE_SHARE = {"high": 0.5, "medium": 0.2, "low": 0.0}
+SEED_SPREAD_M = 1200.0
+# Noise weight of a safe zone's camp, against one per survivor calling for help
+SAFE_ZONE_NOISE = 5.0
+# Radius zone alerts count infected within
+ALERT_RADIUS_M = 1000.0
+
+
+@dataclass
+class OutbreakSnapshot:
+    """
+    Infected positions and states after one tick, with the per-cell head count.
+
+    Positions stay on the simulation's metric plane; only agents a reader asks for are
+    converted to latitude and longitude. The arrays are never written after publishing.
+    """
+    tick: int
+    at: float
+    x: np.ndarray
+    y: np.ndarray
+    states: np.ndarray
+    density: np.ndarray
+    cell_m: float
+    bbox: Tuple[float, float, float, float]
+    m_per_deg_x: float
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def near(self, lat: float, lon: float, radius_m: float, limit: Optional[int] = None) -> np.ndarray:
+        """Agent numbers within radius_m of a position, nearest first, at most limit of them."""
+        west, _, _, north = self.bbox
+        cx, cy = (lon - west) * self.m_per_deg_x, (north - lat) * METERS_PER_DEGREE
+        candidates = np.flatnonzero((np.abs(self.x - cx) <= radius_m) & (np.abs(self.y - cy) <= radius_m))
+        d2 = (self.x[candidates] - cx) ** 2 + (self.y[candidates] - cy) ** 2
+        inside = d2 <= radius_m ** 2
+        candidates, d2 = candidates[inside], d2[inside]
+        if limit is not None and limit < len(d2):
+            nearest = np.argpartition(d2, limit)[:limit]
+            candidates, d2 = candidates[nearest], d2[nearest]
+        return candidates[np.argsort(d2, kind="stable")]
+
+    def around(self, lat: float, lon: float, radius_m: float, limit: int) -> List[Tuple[int, float, float, bool]]:
+        """(agent, lat, lon, hunting) of up to limit agents within radius_m of a position, nearest first."""
+        agents = self.near(lat, lon, radius_m, limit)
+        lats, lons = self.positions(agents)
+        return list(zip(agents.tolist(), lats.tolist(), lons.tolist(), (self.states[agents] == HUNTING).tolist()))
+    
+    def positions(self, agents) -> Tuple[np.ndarray, np.ndarray]:
+        """Latitudes and longitudes of the given agent numbers."""
+        west, _, _, north = self.bbox
+        return (
+            north - self.y[agents].astype(np.float64) / METERS_PER_DEGREE,
+            west + self.x[agents].astype(np.float64) / self.m_per_deg_x,
+        )
+
+    def count_near(self, lat: float, lon: float, radius_m: float) -> int:
+        """Infected within roughly radius_m of a position, summed from the head count of whole cells."""
+        west, _, _, north = self.bbox
+        height, width = self.density.shape
+        row = (north - lat) * METERS_PER_DEGREE / self.cell_m
+        col = (lon - west) * self.m_per_deg_x / self.cell_m
+        reach = radius_m / self.cell_m
+        r0, r1 = max(int(row - reach), 0), min(int(row + reach) + 1, height)
+        c0, c1 = max(int(col - reach), 0), min(int(col + reach) + 1, width)
+        if r0 >= r1 or c0 >= c1:
+            return 0
+        rows, cols = np.ogrid[r0:r1, c0:c1]
+        disc = (rows + 0.5 - row) ** 2 + (cols + 0.5 - col) ** 2 <= reach ** 2
+        return int(self.density[r0:r1, c0:c1][disc].sum())
+
+
+class OutbreakSimulation:
+    """
+    Infected agents on a metric grid over a bounding box, stepped all at once.
+
+    Positions are float32 metres east and south of the box's north-west corner. Noise and
+    survivors are painted onto the grid and blurred into an attraction field whose
+    normalized gradient each agent reads from its cell: agents that notice it hunt along
+    it, the rest wander. Every step staggers sideways, is shortened by the terrain cost of
+    the cell it starts in, and is refused when it enters a closed cell or a cell already
+    holding cell_cap agents. A seed makes runs reproducible.
+    """
+
+    def __init__(self, bbox: Sequence[float] = KARACHI_BBOX, cell_m: float = 100.0, cell_cap: int = 50,
+                 seed: Optional[int] = None):
+        self.bbox = tuple(bbox)
+        self.cell_m = cell_m
+        self.cell_cap = cell_cap
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.logger = logging.getLogger(__name__)
+        west, south, east, north = self.bbox
+        self._m_per_deg_x = METERS_PER_DEGREE * math.cos(math.radians((south + north) / 2))
+        self.width = int(math.ceil((east - west) * self._m_per_deg_x / cell_m))
+        self.height = int(math.ceil((north - south) * METERS_PER_DEGREE / cell_m))
+        self._max_x = np.float32(self.width * cell_m - 0.01)
+        self._max_y = np.float32(self.height * cell_m - 0.01)
+        self.tick_count = 0
+        self.x = np.empty(0, dtype=np.float32)
+        self.y = np.empty(0, dtype=np.float32)
+        self.states = np.empty(0, dtype=np.uint8)
+        self._pull_x = np.zeros(self.width * self.height, dtype=np.float32)
+        self._pull_y = np.zeros(self.width * self.height, dtype=np.float32)
+        self._step = np.full(self.width * self.height, SHAMBLE_M_PER_S, dtype=np.float32)
+        self._closed = np.zeros(self.width * self.height, dtype=bool)
+        self._attractors: Optional[list] = None
+        self._lock = threading.Lock()
+        self._snapshot: Optional[OutbreakSnapshot] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def populate(self, count: int, zones: Iterable[Tuple[float, float, str]] = ()) -> None:
+        """Place count agents, clustered around zones by their (lat, lon, danger) and spread over the city."""
+        zones = list(zones)
+        shares = [ZONE_SHARE.get(danger, 0.0) for _, _, danger in zones]
+        total = sum(shares)
+        clustered = int(count * min(total, 0.9)) if zones else 0
+        per_zone = self.rng.multinomial(clustered, [share / total for share in shares]) if clustered else []
+        xs, ys = [self.rng.uniform(0, self._max_x, count - clustered)], [self.rng.uniform(0, self._max_y, count - clustered)]
+        for (lat, lon, _), n in zip(zones, per_zone):
+            cx, cy = self._to_plane(lat, lon)
+            xs.append(self.rng.normal(cx, SEED_SPREAD_M, n))
+            ys.append(self.rng.normal(cy, SEED_SPREAD_M, n))
+        self.x = np.clip(np.concatenate(xs), 0, self._max_x).astype(np.float32)
+        self.y = np.clip(np.concatenate(ys), 0, self._max_y).astype(np.float32)
+        self.states = np.zeros(count, dtype=np.uint8)
+        self._publish()
+
+    def set_terrain(self, cost, closed=None) -> None:
+        """Per-cell terrain cost (1 is open ground) and impassable cells, as grids over the same box at any resolution."""
+        cost = _resample(np.asarray(cost, dtype=np.float32), self.height, self.width)
+        step = SHAMBLE_M_PER_S / np.maximum(cost, 1.0)
+        blocked = ~np.isfinite(cost)
+        if closed is not None:
+            blocked |= _resample(np.asarray(closed, dtype=np.float32), self.height, self.width) > 0.5
+        step[blocked] = 0.0
+        with self._lock:
+            self._step = step.ravel().astype(np.float32)
+            self._closed = blocked.ravel()
+
+    def set_attractors(self, points: Iterable[Tuple[float, float, float]]) -> None:
+        """Replace the (lat, lon, weight) noise and survivor sources; the field is rebuilt on the next tick."""
+        with self._lock:
+            self._attractors = list(points)
+
+    def tick(self, dt: float = 1.0) -> OutbreakSnapshot:
+        """Advance every agent by dt seconds of wall time and publish the result."""
+        with self._lock:
+            attractors, self._attractors = self._attractors, None
+            step_grid, closed = self._step, self._closed
+        if attractors is not None:
+            self._build_field(attractors)
+
+        inv_cell = np.float32(1.0 / self.cell_m)
+        cells = (self.y * inv_cell).astype(np.int32)
+        cells *= self.width
+        cells += (self.x * inv_cell).astype(np.int32)
+
+        pull_x = self._pull_x[cells]
+        pull_y = self._pull_y[cells]
+        length = step_grid[cells]
+        length *= np.float32(dt * TIME_SCALE)
+        stagger = self.rng.standard_normal((2, len(cells)), dtype=np.float32)
+        hunting = (pull_x != 0) | (pull_y != 0)
+        # Wanderers have no pull, so their whole step is stagger
+        stagger *= np.where(hunting, np.float32(STAGGER), np.float32(1.0))
+        pull_x += stagger[0]
+        pull_y += stagger[1]
+        new_x = self.x + pull_x * length
+        new_y = self.y + pull_y * length
+        np.clip(new_x, 0, self._max_x, out=new_x)
+        np.clip(new_y, 0, self._max_y, out=new_y)
+
+        new_cells = (new_y * inv_cell).astype(np.int32)
+        new_cells *= self.width
+        new_cells += (new_x * inv_cell).astype(np.int32)
+        counts = np.bincount(new_cells, minlength=self.width * self.height)
+        moved = new_cells != cells
+        refused = moved & ((counts[new_cells] > self.cell_cap) | closed[new_cells])
+        if refused.any():
+            new_x[refused] = self.x[refused]
+            new_y[refused] = self.y[refused]
+            np.add.at(counts, new_cells[refused], -1)
+            np.add.at(counts, cells[refused], 1)
+
+        self.x, self.y = new_x, new_y
+        self.states = hunting.view(np.uint8)
+        self.tick_count += 1
+        return self._publish(counts)
+
+    def snapshot(self) -> Optional[OutbreakSnapshot]:
+        """The latest published snapshot."""
+        return self._snapshot
+
+    def start(self, tick_s: float = 1.0, setup: Optional[Callable[[], None]] = None) -> "OutbreakSimulation":
+        """Tick in a background thread every tick_s seconds, after running setup on it."""
+        def run():
+            if setup is not None:
+                try:
+                    setup()
+                except Exception as e:
+                    self.logger.error(f"Outbreak setup failed: {e}")
+            last = time.perf_counter()
+            while not self._stop.wait(max(tick_s - (time.perf_counter() - last), 0.0)):
+                began = time.perf_counter()
+                try:
+                    self.tick(began - last)
+                except Exception as e:
+                    self.logger.error(f"Outbreak tick failed: {e}")
+                last = began
+                if self.tick_count % 60 == 0:
+                    self.logger.debug(
+                        f"🧟 Outbreak tick {self.tick_count}: {len(self)} agents in "
+                        f"{(time.perf_counter() - began) * 1000:.0f} ms"
+                    )
+
+        self._thread = threading.Thread(target=run, name="outbreak-sim", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the background worker."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _to_plane(self, lat: float, lon: float) -> Tuple[float, float]:
+        west, _, _, north = self.bbox
+        return (lon - west) * self._m_per_deg_x, (north - lat) * METERS_PER_DEGREE
+
+    def _build_field(self, attractors) -> None:
+        """Blur the sources into an attraction field and keep its unit gradient where it is noticeable."""
+        weights = np.zeros((self.height, self.width), dtype=np.float32)
+        for lat, lon, weight in attractors:
+            x, y = self._to_plane(lat, lon)
+            row, col = int(y // self.cell_m), int(x // self.cell_m)
+            if 0 <= row < self.height and 0 <= col < self.width:
+                weights[row, col] += weight
+        sigma = ATTRACTION_RANGE_M / self.cell_m
+        offsets = np.arange(-int(math.ceil(3 * sigma)), int(math.ceil(3 * sigma)) + 1)
+        kernel = np.exp(-offsets ** 2 / (2 * sigma ** 2)).astype(np.float32)
+        field = _convolve(weights, kernel, 0, self.height, 0, self.width)
+        grad_y, grad_x = np.gradient(field)
+        norm = np.hypot(grad_x, grad_y)
+        noticed = (field > ATTRACTION_FLOOR) & (norm > 0)
+        scale = np.divide(1.0, norm, out=np.zeros_like(norm), where=noticed)
+        self._pull_x = (grad_x * scale).ravel().astype(np.float32)
+        self._pull_y = (grad_y * scale).ravel().astype(np.float32)
+
+    def _publish(self, counts: Optional[np.ndarray] = None) -> OutbreakSnapshot:
+        """Hand the current arrays to readers; ticks replace them rather than writing into them."""
+        if counts is None:
+            cells = (self.y // self.cell_m).astype(np.int32) * self.width + (self.x // self.cell_m).astype(np.int32)
+            counts = np.bincount(cells, minlength=self.width * self.height)
+        self._snapshot = OutbreakSnapshot(
+            tick=self.tick_count,
+            at=time.time(),
+            x=self.x,
+            y=self.y,
+            states=self.states,
+            density=counts.reshape(self.height, self.width),
+            cell_m=self.cell_m,
+            bbox=self.bbox,
+            m_per_deg_x=self._m_per_deg_x,
+        )
+        return self._snapshot
+
+
+def _resample(grid: np.ndarray, height: int, width: int) -> np.ndarray:
+    """Nearest-cell resampling of a grid to height x width."""
+    rows = np.minimum((np.arange(height) + 0.5) * grid.shape[0] / height, grid.shape[0] - 1).astype(np.int64)
+    cols = np.minimum((np.arange(width) + 0.5) * grid.shape[1] / width, grid.shape[1] - 1).astype(np.int64)
+    return grid[rows][:, cols]
+
+
+_simulation: Optional[OutbreakSimulation] = None
+
+
+def current_outbreak() -> Optional[OutbreakSnapshot]:
+    """Latest snapshot of the running outbreak simulation, or None when none is running."""
+    return _simulation.snapshot() if _simulation is not None else None
+
+
+def start_outbreak(config, zone_manager, sos_ingestor=None) -> Optional[OutbreakSimulation]:
+    """Start the outbreak simulation drawn to SOS signals and safe zones, unless OUTBREAK_AGENTS is 0."""
+    global _simulation
+    if not config.OUTBREAK_AGENTS:
+        return None
+    simulation = OutbreakSimulation(cell_m=config.OUTBREAK_CELL_M, cell_cap=config.OUTBREAK_CELL_CAP,
+                                    seed=config.OUTBREAK_SEED)
+    zones = zone_manager.store.zone_positions()
+    simulation.populate(config.OUTBREAK_AGENTS, [(lat, lon, danger) for _, lat, lon, danger, _ in zones])
+
+    def attract(*_) -> None:
+        points = [
+            (lat, lon, SAFE_ZONE_NOISE)
+            for _, lat, lon, danger, _ in zone_manager.store.zone_positions() if danger == "low"
+        ]
+        if sos_ingestor is not None:
+            points.extend((record["lat"], record["lon"], max(record["survivors"], 1))
+                          for record in sos_ingestor.index.records())
+        simulation.set_attractors(points)
+
+    def terrain() -> None:
+        raster = zone_manager.route_planner.raster
+        with raster.lock:
+            cost, closed = raster.cost.copy(), raster.closed.copy()
+        simulation.set_terrain(cost, closed)
+
+    def on_zones(*_) -> None:
+        terrain()
+        attract()
+
+    if sos_ingestor is not None:
+        sos_ingestor.subscribe(attract)
+    zone_manager.subscribe(on_zones)
+    # Painting the route raster takes a moment, so it happens on the worker
+    _simulation = simulation.start(config.OUTBREAK_TICK_S, on_zones)
+    simulation.logger.info(f"🧟 Outbreak simulation started with {len(simulation)} infected")
+    return simulation
@@ -0,0 +1,74 @@
+"""
+Map Render Cache for SurviveTrack
+Bounded LRU cache of rendered map HTML keyed by map kind and zone data version.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class MapRenderCache:
+    """Thread-safe LRU cache of rendered map HTML with hit/miss/eviction counters."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max(1, max_entries)
+        self.logger = logging.getLogger(__name__)
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(kind: str, zone_key: Optional[str] = None, show_welcome: bool = False,
+                 cinematic: bool = False, version: int = 0) -> tuple:
+        """Build a cache key for a map render."""
+        return (kind, zone_key, show_welcome, cinematic, version)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Return cached HTML for key, or None on a miss."""
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key: Hashable, html: str) -> None:
+        """Store rendered HTML, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_render(self, key: Hashable, render: Callable[[], str]) -> str:
+        """Return cached HTML or render, store and return it."""
+        html = self.get(key)
+        if html is None:
+            html = render()
+            self.put(key, html)
+        return html
+
+    def clear(self) -> None:
+        """Drop all cached renders."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
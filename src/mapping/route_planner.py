@@ -0,0 +1,332 @@
+"""
+Route Planner for SurviveTrack
+Danger-weighted A* routes over a cached cost raster built from zone danger, threat density and closed ground.
+"""
+
+import heapq
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.mapping.threat_heatmap import ThreatHeatmap, _convolve
+from src.mapping.tile_store import KARACHI_BBOX
+
+# Extra cost per metre at the centre of a zone, by danger level; it fades out over DANGER_RADIUS_M
+DANGER_PENALTY = {"low": 0.5, "medium": 3.0, "high": 8.0}
+DANGER_RADIUS_M = 600.0
+
+SQRT2 = math.sqrt(2.0)
+# (row, column) steps of the 8-connected grid
+_STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+@dataclass
+class Route:
+    """A planned route: [lat, lon] vertices and what walking it costs."""
+    path: List[List[float]]
+    distance_m: float
+    cost: float
+    expanded: int
+    ms: float
+
+    @property
+    def risk(self) -> float:
+        """Average extra cost per metre over plain open ground; 0 for a route that meets no danger."""
+        return self.cost / self.distance_m - 1.0 if self.distance_m else 0.0
+
+
+class CostRaster:
+    """
+    Travel cost per metre for every cell of a grid over a bounding box.
+
+    A cell costs 1 plus the faded danger penalty of nearby zones plus threat_weight times
+    the threat kernel density, or infinity when closed. The density term saturates where the
+    heatmap's colour does, so a crowd of thousands of infected costs like a dense cluster
+    rather than thousands of times one infected. The threat layer is a ThreatHeatmap
+    on the same grid, so moving threats only re-derives the blocks their kernels touch.
+    Coarser copies of the grid, one per pooling factor, hold the mean cost of each tile
+    for hierarchical planning.
+    """
+
+    def __init__(self, bbox: Sequence[float] = KARACHI_BBOX, cell_m: float = 35.0,
+                 factors: Sequence[int] = (16, 4, 2), threat_weight: float = 4.0, bandwidth_m: float = 150.0):
+        # Pooling factors from coarsest to finest; the coarsest is also the update block size
+        self.factors = tuple(factors)
+        self.block = self.factors[0]
+        if any(self.block % factor for factor in self.factors):
+            raise ValueError("every pooling factor must divide the first")
+        self.threats = ThreatHeatmap(bbox, cell_m=cell_m, bandwidth_m=bandwidth_m, block=self.block)
+        self.bbox = self.threats.bbox
+        self.cell_m = cell_m
+        self.threat_weight = threat_weight
+        self.width, self.height = self.threats.width, self.threats.height
+        self.blocks_x, self.blocks_y = self.threats.blocks_x, self.threats.blocks_y
+        self.danger = np.zeros((self.height, self.width), dtype=np.float32)
+        self.closed = np.zeros((self.height, self.width), dtype=bool)
+        self.cost = np.ones((self.height, self.width), dtype=np.float32)
+        self.pooled = {
+            factor: np.ones((-(-self.height // factor), -(-self.width // factor)), dtype=np.float32)
+            for factor in self.factors
+        }
+        self.version = 0
+        self.lock = threading.RLock()
+        self.logger = logging.getLogger(__name__)
+        # Row-major costs padded with a closed one-cell border, as lists for the search loop
+        self._flat: Dict[int, List[float]] = {}
+
+    def grid(self, factor: int = 1) -> np.ndarray:
+        """Cell costs, or the pooled tile costs for a pooling factor."""
+        return self.cost if factor == 1 else self.pooled[factor]
+
+    def to_cell(self, lat: float, lon: float) -> Optional[Tuple[int, int]]:
+        """(row, column) of the cell holding a position, or None outside the raster."""
+        col, row = self.threats._to_cells(np.array([[lat, lon]], dtype=np.float64))[0].tolist()
+        if 0 <= row < self.height and 0 <= col < self.width:
+            return row, col
+        return None
+
+    def to_latlon(self, rows, cols) -> Tuple[np.ndarray, np.ndarray]:
+        """Latitudes and longitudes of cell centres."""
+        west, _, _, north = self.bbox
+        lats = north - (np.asarray(rows, dtype=np.float64) + 0.5) * self.threats._deg_y
+        lons = west + (np.asarray(cols, dtype=np.float64) + 0.5) * self.threats._deg_x
+        return lats, lons
+
+    def set_zones(self, zones: Iterable[Tuple[float, float, str]]) -> None:
+        """Repaint the danger layer from (lat, lon, danger) of every zone."""
+        zones = list(zones)
+        weights = np.zeros((self.height, self.width), dtype=np.float32)
+        if zones:
+            positions = np.array([(lat, lon) for lat, lon, _ in zones], dtype=np.float64)
+            penalty = np.array([DANGER_PENALTY.get(danger, 0.0) for _, _, danger in zones], dtype=np.float32)
+            cells = self.threats._to_cells(positions)
+            inside = (cells[:, 0] >= 0) & (cells[:, 0] < self.width) & (cells[:, 1] >= 0) & (cells[:, 1] < self.height)
+            np.add.at(weights, (cells[inside, 1], cells[inside, 0]), penalty[inside])
+        sigma = DANGER_RADIUS_M / 2 / self.cell_m
+        offsets = np.arange(-int(math.ceil(2 * sigma)), int(math.ceil(2 * sigma)) + 1)
+        kernel = np.exp(-offsets ** 2 / (2 * sigma ** 2)).astype(np.float32)
+        with self.lock:
+            self.danger = _convolve(weights, kernel, 0, self.height, 0, self.width)
+            self._refresh(np.ones((self.blocks_y, self.blocks_x), dtype=bool))
+
+    def update_threats(self, positions) -> int:
+        """Replace threat positions, an (N, 2) array of lat/lon; returns the number of re-derived blocks."""
+        with self.lock:
+            if self.threats.update(positions):
+                self._refresh(self.threats.last_dirty)
+            return self.threats.last_dirty_blocks
+
+    def flat(self, factor: int = 1) -> List[float]:
+        """Row-major costs at a pooling factor, padded with a closed border, as a list of floats."""
+        with self.lock:
+            flat = self._flat.get(factor)
+            if flat is None:
+                grid = self.grid(factor)
+                padded = np.full((grid.shape[0] + 2, grid.shape[1] + 2), np.inf, dtype=np.float64)
+                padded[1:-1, 1:-1] = grid
+                flat = self._flat[factor] = padded.ravel().tolist()
+            return flat
+
+    def _refresh(self, dirty) -> None:
+        """Re-derive cell and pooled costs over the dirty blocks, one span of blocks per block row."""
+        for by in np.nonzero(dirty.any(axis=1))[0]:
+            cols = np.nonzero(dirty[by])[0]
+            ys = slice(by * self.block, min((by + 1) * self.block, self.height))
+            xs = slice(cols[0] * self.block, min((cols[-1] + 1) * self.block, self.width))
+            saturation = self.threats.saturation
+            threat = saturation * (1.0 - np.exp(-self.threats.density[ys, xs] / saturation))
+            cost = 1.0 + self.danger[ys, xs] + self.threat_weight * threat
+            cost[self.closed[ys, xs]] = np.inf
+            self.cost[ys, xs] = cost
+            self._copy_to_flat(1, ys.start, xs.start, cost)
+            for factor in self.factors:
+                pooled = _pool(cost, factor)
+                y0, x0 = ys.start // factor, xs.start // factor
+                self.pooled[factor][y0:y0 + pooled.shape[0], x0:x0 + pooled.shape[1]] = pooled
+                self._copy_to_flat(factor, y0, x0, pooled)
+        self.version += 1
+
+    def _copy_to_flat(self, factor: int, y0: int, x0: int, values) -> None:
+        """Mirror a rectangle of updated costs into the cached list, if there is one."""
+        flat = self._flat.get(factor)
+        if flat is None:
+            return
+        stride = self.grid(factor).shape[1] + 2
+        for y, row in enumerate(values.tolist(), y0 + 1):
+            start = y * stride + x0 + 1
+            flat[start:start + len(row)] = row
+
+
+class RoutePlanner:
+    """
+    Cheapest routes between two positions over a CostRaster.
+
+    A* first runs over the coarsest pooled grid, then over each finer one inside a
+    corridor one tile wide around the previous level's route, ending on single cells.
+    A level whose corridor is cut off is searched whole instead. The heuristic is weighted
+    so near-uniform ground does not flood the corridor: each level's path costs at most
+    heuristic_weight times the cheapest path within it.
+    """
+
+    def __init__(self, raster: CostRaster, heuristic_weight: float = 1.1):
+        self.raster = raster
+        self.heuristic_weight = heuristic_weight
+        self.logger = logging.getLogger(__name__)
+        # Build the search lists now rather than on the first query
+        for factor in (*raster.factors, 1):
+            raster.flat(factor)
+
+    def plan(self, start: Sequence[float], goal: Sequence[float]) -> Optional[Route]:
+        """Cheapest route from start to goal [lat, lon], or None when either is off the raster or unreachable."""
+        began = time.perf_counter()
+        raster = self.raster
+        start_cell, goal_cell = raster.to_cell(*start[:2]), raster.to_cell(*goal[:2])
+        if start_cell is None or goal_cell is None:
+            return None
+
+        expanded = 0
+        cells: Optional[List[Tuple[int, int]]] = None
+        previous = 0
+        with raster.lock:
+            for factor in (*raster.factors, 1):
+                grid = raster.grid(factor)
+                flat = raster.flat(factor)
+                stride = grid.shape[1] + 2
+                ends = [(row // factor, col // factor) for row, col in (start_cell, goal_cell)]
+                # The end tiles stay usable even when mostly closed
+                saved = [(i, flat[i]) for i in ((r + 1) * stride + c + 1 for r, c in ends)]
+                for i, _ in saved:
+                    if flat[i] == math.inf:
+                        flat[i] = 1.0
+                try:
+                    allowed = None if cells is None else _corridor(cells, previous // factor, grid.shape)
+                    found, cost, count = _astar(flat, stride, *ends, allowed, self.heuristic_weight)
+                    expanded += count
+                    if found is None and allowed is not None:
+                        found, cost, count = _astar(flat, stride, *ends, None, self.heuristic_weight)
+                        expanded += count
+                finally:
+                    for i, value in saved:
+                        flat[i] = value
+                if found is None:
+                    return None
+                cells, previous = found, factor
+
+        vertices = _corners(cells)
+        lats, lons = raster.to_latlon([r for r, _ in vertices], [c for _, c in vertices])
+        steps = np.abs(np.diff(np.array(cells), axis=0)).sum(axis=1) if len(cells) > 1 else np.zeros(0)
+        distance = float(np.where(steps == 2, SQRT2, 1.0).sum() * raster.cell_m)
+        route = Route(
+            path=[[round(lat, 6), round(lon, 6)] for lat, lon in zip(lats.tolist(), lons.tolist())],
+            distance_m=distance,
+            cost=cost * raster.cell_m,
+            expanded=expanded,
+            ms=(time.perf_counter() - began) * 1000,
+        )
+        self.logger.debug(
+            f"Route planned: {route.distance_m:.0f} m, {len(cells)} cells, {route.expanded} expanded in {route.ms:.1f} ms"
+        )
+        return route
+
+
+def _pool(cost, factor: int) -> np.ndarray:
+    """Mean cost of each factor x factor tile; a tile more than half closed is closed."""
+    if factor == 1:
+        return cost
+    height, width = cost.shape
+    padded = np.full((-(-height // factor) * factor, -(-width // factor) * factor), np.nan, dtype=np.float32)
+    padded[:height, :width] = cost
+    tiles = padded.reshape(padded.shape[0] // factor, factor, padded.shape[1] // factor, factor)
+    open_cells = np.isfinite(tiles)
+    inside = (~np.isnan(tiles)).sum(axis=(1, 3))
+    count = open_cells.sum(axis=(1, 3))
+    total = np.where(open_cells, tiles, 0.0).sum(axis=(1, 3))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count * 2 > inside, total / count, np.inf).astype(np.float32)
+
+
+def _corridor(cells: List[Tuple[int, int]], scale: int, shape: Tuple[int, int]) -> bytes:
+    """Padded row-major mask of the tiles within one coarse tile of a coarse path, at scale times finer."""
+    rows, cols = np.array(cells).T
+    coarse = np.zeros((-(-shape[0] // scale), -(-shape[1] // scale)), dtype=bool)
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            coarse[np.clip(rows + dy, 0, coarse.shape[0] - 1), np.clip(cols + dx, 0, coarse.shape[1] - 1)] = True
+    mask = np.zeros((shape[0] + 2, shape[1] + 2), dtype=np.uint8)
+    mask[1:-1, 1:-1] = np.repeat(np.repeat(coarse, scale, 0), scale, 1)[:shape[0], :shape[1]]
+    return mask.tobytes()
+
+
+def _astar(cost: List[float], stride: int, start: Tuple[int, int], goal: Tuple[int, int],
+           allowed: Optional[bytes] = None, weight: float = 1.0) -> Tuple[Optional[List[Tuple[int, int]]], float, int]:
+    """
+    Weighted A* over a row-major cost grid padded with an impassable border.
+
+    Moving between neighbouring cells costs the mean of their costs, times sqrt(2) on
+    diagonals. The heuristic is the octile distance, a lower bound because no cell costs
+    less than 1, times weight; the path found costs at most weight times the cheapest.
+    Returns ((row, column) path, total cost in cell lengths, expanded count).
+    """
+    source = (start[0] + 1) * stride + start[1] + 1
+    target = (goal[0] + 1) * stride + goal[1] + 1
+    goal_row, goal_col = divmod(target, stride)
+    offsets = [(dy * stride + dx, 0.5 if dy == 0 or dx == 0 else 0.5 * SQRT2) for dy, dx in _STEPS]
+    diagonal_extra = SQRT2 - 1.0
+    inf = math.inf
+    push, pop = heapq.heappush, heapq.heappop
+
+    best = {source: 0.0}
+    parent = {source: -1}
+    closed = set()
+    heap = [(0.0, 0.0, source)]
+    while heap:
+        _, _, node = pop(heap)
+        if node == target:
+            break
+        if node in closed:
+            continue
+        closed.add(node)
+        g = best[node]
+        here = cost[node]
+        for offset, half_step in offsets:
+            neighbour = node + offset
+            there = cost[neighbour]
+            if there == inf or (allowed is not None and not allowed[neighbour]) or neighbour in closed:
+                continue
+            tentative = g + (here + there) * half_step
+            if tentative < best.get(neighbour, inf):
+                best[neighbour] = tentative
+                parent[neighbour] = node
+                row, col = divmod(neighbour, stride)
+                dy, dx = abs(row - goal_row), abs(col - goal_col)
+                h = (max(dy, dx) + diagonal_extra * min(dy, dx)) * weight
+                # Ties go to the node closer to the goal so open ground is crossed in a straight line
+                push(heap, (tentative + h, h, neighbour))
+    else:
+        return None, inf, len(closed)
+
+    path = []
+    node = target
+    while node != -1:
+        row, col = divmod(node, stride)
+        path.append((row - 1, col - 1))
+        node = parent[node]
+    path.reverse()
+    return path, best[target], len(closed)
+
+
+def _corners(cells: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """The cells of a path where its direction changes, plus both ends."""
+    if len(cells) < 3:
+        return list(cells)
+    corners = [cells[0]]
+    for previous, current, following in zip(cells, cells[1:], cells[2:]):
+        if (current[0] - previous[0], current[1] - previous[1]) != (following[0] - current[0], following[1] - current[1]):
+            corners.append(current)
+    corners.append(cells[-1])
+    return corners
@@ -0,0 +1,305 @@
+"""
+SOS Ingestion for SurviveTrack
+Accepts SOS signals from the UI and a local HTTP endpoint on an asyncio loop and makes them durable in batches.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from src.mapping.sos_log import SignalError, SignalIndex, SOSLog, parse_signal, parse_update
+
+# Largest HTTP request body accepted by the endpoint
+MAX_BODY_BYTES = 1 << 20
+HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 503: "Service Unavailable"}
+# Seconds between sweeps for signals older than the TTL
+EXPIRE_SWEEP_S = 5.0
+
+
+class SOSIngestor:
+    """
+    SOS ingestion service running an asyncio loop in a background thread.
+
+    submit() and resolve() only assign an id and hand the record to the loop's queue,
+    so Gradio handlers never wait on disk. A writer task drains the queue in batches of
+    up to batch_size, appends each batch to the SOS log with a single fsync, then
+    applies it to the index of active signals. On start the index is rebuilt by
+    replaying the log, which is compacted first when resolved signals dominate it.
+    Signals older than max_age_min are dropped by expire(), which the loop also runs
+    periodically, and reported to subscribers as "expire" records.
+    """
+
+    def __init__(self, log_path, batch_size: int = 1000, host: str = "127.0.0.1", port: int = 0,
+                 max_age_min: Optional[float] = None, incident_radius_m: float = 300.0, incident_min_signals: int = 2):
+        self.log = SOSLog(log_path)
+        self.index = SignalIndex(incident_radius_m, incident_min_signals)
+        self.batch_size = batch_size
+        self.host = host
+        self.port = port
+        self.max_age_min = max_age_min
+        self.logger = logging.getLogger(__name__)
+        self.stats = {"accepted": 0, "written": 0, "batches": 0, "rejected": 0}
+        self._ids = itertools.count(1)
+        self._id_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._sweeper_task: Optional[asyncio.Task] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    def start(self) -> "SOSIngestor":
+        """Rebuild the index from the log and start the loop, writer and HTTP endpoint."""
+        began = time.perf_counter()
+        self.index.apply(self.log.replay())
+        self._ids = itertools.count(self.index.last_id + 1)
+        if self.log.lines > 2 * len(self.index) + 1000:
+            self.log.rewrite(self.index.records())
+        self.logger.info(
+            f"🆘 SOS log replayed: {len(self.index)} active signal(s) in "
+            f"{(time.perf_counter() - began) * 1000:.0f} ms"
+        )
+        self._thread = threading.Thread(target=self._run, name="sos-ingest", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def submit(self, lat: float, lon: float, priority: str = "HIGH", survivors: int = 1,
+               message: str = "", name: str = "") -> int:
+        """Queue one SOS signal and return its id without waiting for it to be written."""
+        return self.submit_many([{
+            "lat": lat, "lon": lon, "priority": priority, "survivors": survivors, "message": message, "name": name
+        }])[0]
+
+    def submit_many(self, signals: Sequence[Dict[str, Any]]) -> List[int]:
+        """Queue SOS submissions, each a dict with lat, lon and optional priority, survivors, message, name."""
+        records = [parse_signal(signal) for signal in signals]
+        now = time.time()
+        with self._id_lock:
+            ids = [next(self._ids) for _ in records]
+        for record, signal_id in zip(records, ids):
+            record.update(op="sos", id=signal_id, at=now)
+        self._enqueue(records)
+        self.stats["accepted"] += len(records)
+        return ids
+
+    def update(self, signal_id: int, priority: Optional[str] = None, survivors: Optional[int] = None,
+               message: Optional[str] = None) -> None:
+        """Queue a change to a signal's priority, survivors or message; it keeps its place in the waiting order."""
+        fields = parse_update({"priority": priority, "survivors": survivors, "message": message})
+        self._enqueue([dict(fields, op="update", id=int(signal_id), at=time.time())])
+
+    def resolve(self, signal_id: int) -> None:
+        """Queue marking a signal answered, removing it from the active signals."""
+        self._enqueue([{"op": "resolve", "id": int(signal_id), "at": time.time()}])
+
+    def active_signals(self) -> List[Dict[str, Any]]:
+        """Active signals that are durably logged, oldest first."""
+        return self.index.active(self.max_age_min)
+
+    def top(self, k: int) -> List[Dict[str, Any]]:
+        """The k most urgent active signals from the triage heap, most urgent first."""
+        self.expire()
+        return self.index.top(k)
+
+    def incidents(self) -> List[Dict[str, Any]]:
+        """Active signals clustered into incidents, oldest first, each with combined survivors and worst priority."""
+        self.expire()
+        return self.index.incidents.incidents()
+
+    def expire(self) -> List[int]:
+        """Drop signals older than max_age_min and tell subscribers; returns their ids."""
+        if not self.max_age_min:
+            return []
+        now = time.time()
+        expired = self.index.expire(self.max_age_min, now)
+        if expired:
+            self._notify([{"op": "expire", "id": signal_id, "at": now} for signal_id in expired])
+        return expired
+
+    def subscribe(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Call listener with every batch of log records once it is written and indexed, and with expire records."""
+        self._listeners.append(listener)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until everything queued so far is written and indexed."""
+        asyncio.run_coroutine_threadsafe(self._queue.join(), self._loop).result(timeout)
+
+    def stop(self) -> None:
+        """Write what is queued, stop the loop and close the log."""
+        if self._loop is None:
+            return
+        self.flush(timeout=10)
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+        self._loop.close()
+        self._loop = None
+        self.log.close()
+
+    def _enqueue(self, records: List[Dict[str, Any]]) -> None:
+        if self._loop is None:
+            raise RuntimeError("SOS ingestor not started")
+        self._loop.call_soon_threadsafe(self._put_all, records)
+
+    def _put_all(self, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            self._queue.put_nowait(record)
+
+    def _run(self) -> None:
+        """Body of the loop thread."""
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._writer_task = self._loop.create_task(self._writer())
+        if self.max_age_min:
+            self._sweeper_task = self._loop.create_task(self._sweeper())
+        if self.port:
+            try:
+                self._server = self._loop.run_until_complete(
+                    asyncio.start_server(self._handle_connection, self.host, self.port)
+                )
+                self.logger.info(f"🆘 SOS endpoint listening on http://{self.host}:{self.port}/sos")
+            except OSError as e:
+                self.logger.error(f"Failed to start SOS endpoint: {e}")
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _shutdown(self) -> None:
+        """Close the endpoint and its open connections, then stop the writer."""
+        if self._server is not None:
+            self._server.close()
+        for writer in list(self._connections):
+            writer.close()
+        # Let the connection handlers see the closed streams and return
+        await asyncio.sleep(0)
+        tasks = [task for task in (self._writer_task, self._sweeper_task) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _writer(self) -> None:
+        """Drain the queue in batches, each appended with one fsync and then indexed."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                # The fsync runs off the loop so submissions keep queueing meanwhile
+                await loop.run_in_executor(None, self.log.append, batch)
+            except OSError as e:
+                self.logger.error(f"❌ SOS log write failed, {len(batch)} record(s) lost: {e}")
+            else:
+                self.index.apply(batch)
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+                self._notify(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _sweeper(self) -> None:
+        """Expire old signals every EXPIRE_SWEEP_S, so they leave the map without anyone reading them."""
+        while True:
+            await asyncio.sleep(EXPIRE_SWEEP_S)
+            self.expire()
+
+    def _notify(self, records: List[Dict[str, Any]]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(records)
+            except Exception as e:
+                self.logger.error(f"SOS listener failed: {e}")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on one connection until the client closes it."""
+        self._connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, _, path = request_line.decode("latin-1").partition(" ")
+                path = path.rsplit(" ", 1)[0].split("?", 1)[0]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": f"body over {MAX_BODY_BYTES} bytes"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = self._route(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, close=not keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        """(status, JSON payload) for one request."""
+        parts = [part for part in path.split("/") if part]
+        if not parts or parts[0] != "sos" or len(parts) > 3:
+            return 404, {"error": "not found"}
+        if len(parts) == 1 and method == "GET":
+            return 200, {"signals": self.active_signals()}
+        if len(parts) == 1 and method == "POST":
+            try:
+                submitted = json.loads(body or b"null")
+                ids = self.submit_many(submitted if isinstance(submitted, list) else [submitted])
+            except (json.JSONDecodeError, UnicodeDecodeError, SignalError) as e:
+                self.stats["rejected"] += 1
+                return 400, {"error": str(e)}
+            return 202, {"ids": ids}
+        if len(parts) == 2 and method == "POST" and parts[1].isdigit():
+            try:
+                fields = parse_update(json.loads(body or b"null"))
+            except (json.JSONDecodeError, UnicodeDecodeError, SignalError) as e:
+                self.stats["rejected"] += 1
+                return 400, {"error": str(e)}
+            self.update(int(parts[1]), **fields)
+            return 202, {"updated": int(parts[1])}
+        if len(parts) == 3 and parts[2] == "resolve" and method == "POST" and parts[1].isdigit():
+            self.resolve(int(parts[1]))
+            return 202, {"resolved": int(parts[1])}
+        return 405, {"error": f"{method} not allowed on {path}"}
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any], close: bool) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+
+def start_sos_ingestor(config) -> SOSIngestor:
+    """Start the SOS ingestor on the configured log, with the HTTP endpoint unless its port is 0."""
+    return SOSIngestor(
+        config.SOS_LOG_PATH,
+        batch_size=config.SOS_BATCH_SIZE,
+        host=config.SOS_INGEST_HOST,
+        port=config.SOS_INGEST_PORT,
+        max_age_min=config.SOS_SIGNAL_TTL_MIN or None,
+        incident_radius_m=config.INCIDENT_RADIUS_M,
+        incident_min_signals=config.INCIDENT_MIN_SIGNALS
+    ).start()
@@ -0,0 +1,249 @@
+"""
+SOS Log for SurviveTrack
+Append-only NDJSON log of SOS signals, written in fsync'd batches and replayed into an index of active signals.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src.mapping.incidents import IncidentIndex
+from src.mapping.triage import TriageQueue
+
+PRIORITIES = ("CRITICAL", "HIGH", "MEDIUM", "LOW")
+MAX_MESSAGE_LENGTH = 500
+
+
+class SignalError(ValueError):
+    """An SOS submission that cannot be accepted."""
+
+
+def parse_signal(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Log fields of an SOS submission: lat, lon, priority, survivors, message and name, checked."""
+    if not isinstance(record, dict):
+        raise SignalError("signal must be a JSON object")
+    try:
+        lat, lon = float(record["lat"]), float(record["lon"])
+    except (KeyError, TypeError, ValueError):
+        raise SignalError("missing or non-numeric lat/lon")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise SignalError(f"coordinates out of range: {lat}, {lon}")
+    priority = str(record.get("priority") or "HIGH").upper()
+    if priority not in PRIORITIES:
+        raise SignalError(f"unknown priority {priority!r}; expected one of {', '.join(PRIORITIES)}")
+    try:
+        survivors = int(record.get("survivors") or 1)
+    except (TypeError, ValueError):
+        raise SignalError("non-integer survivors")
+    if survivors < 1:
+        raise SignalError(f"survivors must be positive: {survivors}")
+    return {
+        "lat": lat,
+        "lon": lon,
+        "priority": priority,
+        "survivors": survivors,
+        "message": str(record.get("message") or "")[:MAX_MESSAGE_LENGTH],
+        "name": str(record.get("name") or "")[:80],
+    }
+
+
+def parse_update(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Changed fields of an SOS update: any of priority, survivors and message, checked."""
+    if not isinstance(record, dict):
+        raise SignalError("update must be a JSON object")
+    fields = {}
+    if record.get("priority") is not None:
+        fields["priority"] = str(record["priority"]).upper()
+        if fields["priority"] not in PRIORITIES:
+            raise SignalError(f"unknown priority {fields['priority']!r}; expected one of {', '.join(PRIORITIES)}")
+    if record.get("survivors") is not None:
+        try:
+            fields["survivors"] = int(record["survivors"])
+        except (TypeError, ValueError):
+            raise SignalError("non-integer survivors")
+        if fields["survivors"] < 1:
+            raise SignalError(f"survivors must be positive: {fields['survivors']}")
+    if record.get("message") is not None:
+        fields["message"] = str(record["message"])[:MAX_MESSAGE_LENGTH]
+    if not fields:
+        raise SignalError("nothing to update; expected priority, survivors or message")
+    return fields
+
+
+class SOSLog:
+    """
+    SOS records as one JSON object per line in an append-only file.
+
+    append() writes a whole batch with one write and one fsync, so the cost of making
+    signals durable is shared by everything queued together. Replay drops and cuts off
+    a torn last line left by a crash mid-write.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.logger = logging.getLogger(__name__)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(self.path, "ab")
+        self.lines = 0
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Append records and fsync once; returns the number written."""
+        data = b"".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+            for record in records
+        )
+        if not data:
+            return 0
+        count = data.count(b"\n")
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.lines += count
+        return count
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Every intact record in the log, oldest first; a torn last line is cut off the file."""
+        self.lines = 0
+        intact_end = 0
+        with open(self.path, "rb") as handle:
+            for number, line in enumerate(handle, 1):
+                if not line.endswith(b"\n"):
+                    self.logger.warning(f"⚠️ Dropping torn SOS log line {number} left by an interrupted write")
+                    break
+                intact_end += len(line)
+                self.lines += 1
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    self.logger.warning(f"⚠️ Skipping corrupt SOS log line {number}")
+        # New appends must start on a fresh line
+        if intact_end < self.path.stat().st_size:
+            with self._lock:
+                os.truncate(self.path, intact_end)
+
+    def rewrite(self, records: List[Dict[str, Any]]) -> None:
+        """Replace the log with records, atomically, so it stops growing with resolved signals."""
+        temporary = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(temporary, "wb") as handle:
+            for record in records:
+                handle.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+        with self._lock:
+            self._file.close()
+            os.replace(temporary, self.path)
+            self._file = open(self.path, "ab")
+            self.lines = len(records)
+
+    def close(self) -> None:
+        """Close the log file."""
+        with self._lock:
+            self._file.close()
+
+
+class SignalIndex:
+    """
+    Active SOS signals by id, kept up to date by applying log records in order.
+
+    Every active signal is also queued in a TriageQueue, so the most urgent ones are read
+    from the heap instead of sorting all signals on each request, and clustered into
+    incidents by an IncidentIndex as it arrives.
+    """
+
+    # Fields an "update" record may change; the receive time stays, so waiting keeps counting
+    UPDATABLE = ("priority", "survivors", "message")
+
+    def __init__(self, incident_radius_m: float = 300.0, incident_min_signals: int = 2):
+        self._signals: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.triage = TriageQueue()
+        self.incidents = IncidentIndex(incident_radius_m, incident_min_signals)
+        self.last_id = 0
+
+    def __len__(self) -> int:
+        return len(self._signals)
+
+    def apply(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Apply "sos", "update" and "resolve" log records."""
+        with self._lock:
+            for record in records:
+                signal_id = record.get("id")
+                if not isinstance(signal_id, int):
+                    continue
+                self.last_id = max(self.last_id, signal_id)
+                op = record.get("op")
+                if op == "sos":
+                    self._signals[signal_id] = record
+                    self.triage.push(record)
+                    self.incidents.add(record)
+                elif op == "update" and signal_id in self._signals:
+                    changes = {field: record[field] for field in self.UPDATABLE if field in record}
+                    self._signals[signal_id] = merged = dict(self._signals[signal_id], **changes)
+                    self.triage.push(merged)
+                    self.incidents.add(merged)
+                elif op == "resolve":
+                    self._signals.pop(signal_id, None)
+                    self.triage.cancel(signal_id)
+                    self.incidents.remove(signal_id)
+
+    def expire(self, max_age_min: float, now: Optional[float] = None) -> List[int]:
+        """Drop signals received more than max_age_min ago; returns their ids."""
+        cutoff = (time.time() if now is None else now) - max_age_min * 60
+        expired = []
+        with self._lock:
+            # Signals are kept in id order, which is also receive order
+            while self._signals:
+                signal_id = next(iter(self._signals))
+                if self._signals[signal_id]["at"] >= cutoff:
+                    break
+                del self._signals[signal_id]
+                self.triage.cancel(signal_id)
+                self.incidents.remove(signal_id)
+                expired.append(signal_id)
+        return expired
+
+    def get(self, signal_id: int) -> Optional[Dict[str, Any]]:
+        """Log record of an active signal, with updates merged in."""
+        with self._lock:
+            return self._signals.get(signal_id)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Log records of every active signal, oldest first."""
+        with self._lock:
+            return list(self._signals.values())
+
+    def active(self, max_age_min: Optional[float] = None, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Active signals as aid map and dispatch dicts, oldest first, optionally only the recent ones."""
+        now = time.time() if now is None else now
+        with self._lock:
+            records = list(self._signals.values())
+        return [
+            self.describe(record, now) for record in records
+            if max_age_min is None or now - record["at"] <= max_age_min * 60
+        ]
+
+    def top(self, k: int, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """The k most urgent active signals as aid map and dispatch dicts, most urgent first."""
+        now = time.time() if now is None else now
+        return [self.describe(record, now) for record in self.triage.top(k)]
+
+    @staticmethod
+    def describe(record: Dict[str, Any], now: float) -> Dict[str, Any]:
+        """Aid map and dispatch dict of a signal log record."""
+        return {
+            'signal_id': record["id"],
+            'coords': [record["lat"], record["lon"]],
+            'name': record.get("name") or f"SOS #{record['id']}",
+            'time': time.strftime('%H:%M', time.localtime(record["at"])),
+            'age_min': max(now - record["at"], 0.0) / 60,
+            'priority': record["priority"],
+            'survivors': record["survivors"],
+            'message': record.get("message", ""),
+            'urgency': TriageQueue.score(record, now),
+        }
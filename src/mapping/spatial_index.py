@@ -0,0 +1,218 @@
+"""
+Spatial Index for SurviveTrack
+Uniform lat/lon grid buckets for nearest, radius and bounding-box queries over keyed points.
+"""
+
+import heapq
+import math
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180.0
+
+Cell = Tuple[int, int]
+
+
+class GridIndex:
+    """
+    Point index bucketed into square grid cells of roughly cell_m metres.
+
+    Distances use a local equirectangular projection at the query latitude, which is
+    accurate to centimetres over the few kilometres these queries cover.
+    """
+
+    def __init__(self, cell_m: float = 250.0, ref_lat: float = 24.86):
+        self.cell_m = cell_m
+        self.cell_lat = cell_m / METERS_PER_DEGREE
+        self._lon_scale = math.cos(math.radians(ref_lat))
+        self.cell_lon = self.cell_lat / self._lon_scale
+        self._cells: Dict[Cell, Dict[Hashable, Tuple[float, float, Any]]] = {}
+        self._points: Dict[Hashable, Tuple[float, float, Any]] = {}
+        self._extent: Optional[Tuple[int, int, int, int]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._points
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return int(math.floor(lon / self.cell_lon)), int(math.floor(lat / self.cell_lat))
+
+    def insert(self, key: Hashable, lat: float, lon: float, payload: Any = None) -> None:
+        """Add a point, moving it if the key is already indexed."""
+        with self._lock:
+            if key in self._points:
+                self._discard(key)
+            entry = (lat, lon, payload)
+            self._points[key] = entry
+            cell = self._cell(lat, lon)
+            self._cells.setdefault(cell, {})[key] = entry
+            self._grow_extent(cell)
+
+    def load(self, entries: Iterable[Tuple[Hashable, float, float, Any]]) -> None:
+        """Insert many (key, lat, lon, payload) points under one lock; keys must not be indexed yet."""
+        cell_lat, cell_lon = self.cell_lat, self.cell_lon
+        floor = math.floor
+        with self._lock:
+            points, cells = self._points, self._cells
+            for key, lat, lon, payload in entries:
+                entry = (lat, lon, payload)
+                points[key] = entry
+                cell = (floor(lon / cell_lon), floor(lat / cell_lat))
+                bucket = cells.get(cell)
+                if bucket is None:
+                    cells[cell] = bucket = {}
+                bucket[key] = entry
+            if cells:
+                xs = [x for x, _ in cells]
+                ys = [y for _, y in cells]
+                self._grow_extent((min(xs), min(ys)))
+                self._grow_extent((max(xs), max(ys)))
+
+    def remove(self, key: Hashable) -> bool:
+        """Remove a point; returns whether it was indexed."""
+        with self._lock:
+            if key not in self._points:
+                return False
+            self._discard(key)
+            return True
+
+    def _discard(self, key: Hashable) -> None:
+        lat, lon, _ = self._points.pop(key)
+        cell = self._cell(lat, lon)
+        bucket = self._cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self._cells[cell]
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, float, Any]]:
+        """(lat, lon, payload) of an indexed key."""
+        return self._points.get(key)
+
+    def within_radius(self, lat: float, lon: float, radius_m: float,
+                      predicate: Optional[Callable[[Hashable, Any], bool]] = None) -> List[Tuple[Hashable, float]]:
+        """(key, distance_m) of points within radius_m, nearest first."""
+        cos_lat = math.cos(math.radians(lat))
+        reach_x = int(math.ceil(radius_m / (self.cell_lon * cos_lat * METERS_PER_DEGREE)))
+        reach_y = int(math.ceil(radius_m / self.cell_m))
+        cx, cy = self._cell(lat, lon)
+        limit = (radius_m / METERS_PER_DEGREE) ** 2
+        hits = []
+        with self._lock:
+            for cell in self._cells_around(cx, cy, reach_x, reach_y):
+                for key, (p_lat, p_lon, payload) in self._cells[cell].items():
+                    d_lat = p_lat - lat
+                    d_lon = (p_lon - lon) * cos_lat
+                    d2 = d_lat * d_lat + d_lon * d_lon
+                    if d2 <= limit and (predicate is None or predicate(key, payload)):
+                        hits.append((key, math.sqrt(d2) * METERS_PER_DEGREE))
+        hits.sort(key=lambda hit: hit[1])
+        return hits
+
+    def nearest(self, lat: float, lon: float, k: int = 1, max_distance_m: Optional[float] = None,
+                predicate: Optional[Callable[[Hashable, Any], bool]] = None) -> List[Tuple[Hashable, float]]:
+        """(key, distance_m) of the k nearest points, searching outward ring by ring."""
+        cx, cy = self._cell(lat, lon)
+        cos_lat = math.cos(math.radians(lat))
+        # Ring width in degrees of latitude on the query's local plane
+        ring_width = min(self.cell_lat, self.cell_lon * cos_lat)
+        best: List[Tuple[float, Hashable]] = []  # max-heap by negated planar distance
+        max_ring = self._max_ring(cx, cy, max_distance_m)
+
+        with self._lock:
+            if not self._points:
+                return []
+            ring = 0
+            while ring <= max_ring:
+                for cell in self._ring_cells(cx, cy, ring):
+                    for key, (p_lat, p_lon, payload) in self._cells.get(cell, {}).items():
+                        if predicate is not None and not predicate(key, payload):
+                            continue
+                        d_lat = p_lat - lat
+                        d_lon = (p_lon - lon) * cos_lat
+                        d2 = d_lat * d_lat + d_lon * d_lon
+                        if len(best) < k:
+                            heapq.heappush(best, (-d2, key))
+                        elif d2 < -best[0][0]:
+                            heapq.heapreplace(best, (-d2, key))
+                # Every unvisited cell is at least `ring` cells away
+                if len(best) == k and (ring * ring_width) ** 2 >= -best[0][0]:
+                    break
+                ring += 1
+            results = [(key, haversine_m(lat, lon, *self._points[key][:2])) for _, key in best]
+
+        results.sort(key=lambda hit: hit[1])
+        if max_distance_m is not None:
+            results = [hit for hit in results if hit[1] <= max_distance_m]
+        return results
+
+    def in_bbox(self, west: float, south: float, east: float, north: float) -> List[Hashable]:
+        """Keys of points inside a lat/lon bounding box."""
+        x0, y0 = self._cell(south, west)
+        x1, y1 = self._cell(north, east)
+        found = []
+        with self._lock:
+            if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self._cells):
+                cells: Iterable[Cell] = [c for c in self._cells if x0 <= c[0] <= x1 and y0 <= c[1] <= y1]
+            else:
+                cells = ((x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+            for cell in cells:
+                for key, (p_lat, p_lon, _) in self._cells.get(cell, {}).items():
+                    if south <= p_lat <= north and west <= p_lon <= east:
+                        found.append(key)
+        return found
+
+    def _cells_around(self, cx: int, cy: int, reach_x: int, reach_y: int) -> List[Cell]:
+        """Occupied cells within reach of (cx, cy)."""
+        if (2 * reach_x + 1) * (2 * reach_y + 1) > len(self._cells):
+            return [c for c in self._cells if abs(c[0] - cx) <= reach_x and abs(c[1] - cy) <= reach_y]
+        cells = self._cells
+        return [
+            (x, y) for x in range(cx - reach_x, cx + reach_x + 1) for y in range(cy - reach_y, cy + reach_y + 1)
+            if (x, y) in cells
+        ]
+
+    def _ring_cells(self, cx: int, cy: int, ring: int) -> List[Cell]:
+        """Cells at Chebyshev distance ring from (cx, cy), clipped to the occupied extent."""
+        if self._extent is None:
+            return []
+        ex0, ey0, ex1, ey1 = self._extent
+        x_lo, x_hi = max(cx - ring, ex0), min(cx + ring, ex1)
+        y_lo, y_hi = max(cy - ring + 1, ey0), min(cy + ring - 1, ey1)
+        cells = []
+        for y in {cy - ring, cy + ring}:
+            if ey0 <= y <= ey1:
+                cells.extend((x, y) for x in range(x_lo, x_hi + 1))
+        for x in {cx - ring, cx + ring}:
+            if ex0 <= x <= ex1 and ring > 0:
+                cells.extend((x, y) for y in range(y_lo, y_hi + 1))
+        return cells
+
+    def _grow_extent(self, cell: Cell) -> None:
+        """Widen the occupied cell range; it is never shrunk, which only costs empty ring scans."""
+        x, y = cell
+        if self._extent is None:
+            self._extent = (x, y, x, y)
+        else:
+            x0, y0, x1, y1 = self._extent
+            self._extent = (min(x0, x), min(y0, y), max(x1, x), max(y1, y))
+
+    def _max_ring(self, cx: int, cy: int, max_distance_m: Optional[float]) -> int:
+        """Outermost ring worth visiting: the distance cap, or the farthest occupied cell."""
+        if max_distance_m is not None:
+            return int(math.ceil(max_distance_m / self.cell_m)) + 1
+        if self._extent is None:
+            return 0
+        x0, y0, x1, y1 = self._extent
+        return max(abs(x0 - cx), abs(x1 - cx), abs(y0 - cy), abs(y1 - cy))
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in metres between two points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
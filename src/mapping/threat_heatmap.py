@@ -0,0 +1,283 @@
+"""
+Threat Density Heatmap for SurviveTrack
+Kernel-density raster of infected positions, recomputed tile by tile and drawn as one image overlay.
+"""
+
+import base64
+import logging
+import math
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.mapping.marker_layers import make_overlay
+from src.mapping.tile_store import KARACHI_BBOX
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+METERS_PER_DEGREE = 111320.0
+
+# Colour ramp from faint blood red to hot yellow, indexed by saturation 0..255
+_RAMP_STOPS = [(0.0, (90, 0, 0, 0)), (0.35, (170, 0, 0, 150)), (0.7, (255, 80, 0, 200)), (1.0, (255, 230, 60, 230))]
+
+
+def _build_ramp():
+    positions = np.linspace(0.0, 1.0, 256)
+    stops = np.array([s for s, _ in _RAMP_STOPS])
+    colors = np.array([c for _, c in _RAMP_STOPS], dtype=np.float64)
+    return np.stack([np.interp(positions, stops, colors[:, i]) for i in range(4)], axis=1).astype(np.uint8)
+
+
+class ThreatHeatmap:
+    """
+    Gaussian kernel-density grid over a bounding box.
+
+    Threat positions are binned into per-cell counts that are updated incrementally;
+    the grid is split into square blocks and only blocks within kernel reach of added
+    or removed threats are re-convolved and recoloured.
+    """
+
+    def __init__(self, bbox: Sequence[float] = KARACHI_BBOX, cell_m: float = 50.0,
+                 bandwidth_m: float = 150.0, block: int = 64, saturation: float = 3.0):
+        self.bbox = tuple(bbox)
+        self.cell_m = cell_m
+        self.sigma = bandwidth_m / cell_m
+        self.reach = int(math.ceil(3 * self.sigma))
+        self.block = block
+        # Density at which the ramp saturates, in multiples of one kernel's peak
+        self.saturation = saturation
+        self.logger = logging.getLogger(__name__)
+
+        west, south, east, north = self.bbox
+        self._deg_x = cell_m / (METERS_PER_DEGREE * math.cos(math.radians((south + north) / 2)))
+        self._deg_y = cell_m / METERS_PER_DEGREE
+        self.width = int(math.ceil((east - west) / self._deg_x))
+        self.height = int(math.ceil((north - south) / self._deg_y))
+        self.blocks_x = -(-self.width // block)
+        self.blocks_y = -(-self.height // block)
+
+        offsets = np.arange(-self.reach, self.reach + 1)
+        self._kernel = np.exp(-offsets ** 2 / (2 * self.sigma ** 2)).astype(np.float32)
+        self.counts = np.zeros((self.height, self.width), dtype=np.float32)
+        self.density = np.zeros((self.height, self.width), dtype=np.float32)
+        self.levels = np.zeros((self.height, self.width), dtype=np.uint8)
+        self._ramp = _build_ramp()
+        self._keys = np.empty(0, dtype=np.int64)
+        # Distinct position keys, sorted, with how many threats stand on each and its grid cell
+        self._unique_keys = np.empty(0, dtype=np.int64)
+        self._unique_counts = np.empty(0, dtype=np.int64)
+        self._unique_cells = np.empty((0, 2), dtype=np.int64)
+        self._lock = threading.Lock()
+        self._png: Optional[bytes] = None
+        self._data_url: Optional[str] = None
+        self.version = 0
+        self.last_dirty_blocks = 0
+        self.last_dirty = np.zeros((self.blocks_y, self.blocks_x), dtype=bool)
+
+    @property
+    def point_count(self) -> int:
+        return len(self._keys)
+
+    def update(self, positions) -> int:
+        """Replace threat positions, an (N, 2) array of lat/lon; returns the number of recomputed blocks."""
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        start = time.perf_counter()
+        with self._lock:
+            keys = _position_keys(positions)
+            if np.array_equal(keys, self._keys):
+                self.last_dirty_blocks = 0
+                return 0
+            # Diff as multisets: several threats may stand on the same position
+            unique_keys, first, counts = np.unique(keys, return_index=True, return_counts=True)
+            unique_cells = self._to_cells(positions[first])
+            # Both key sets are sorted, so a sort and a neighbour compare merge them faster than union1d's hashing
+            merged = np.sort(np.concatenate([unique_keys, self._unique_keys]))
+            merged = merged[np.concatenate([[True], merged[1:] != merged[:-1]])]
+            new_slots = np.searchsorted(merged, unique_keys)
+            old_slots = np.searchsorted(merged, self._unique_keys)
+            delta = np.zeros(len(merged), dtype=np.int64)
+            delta[new_slots] += counts
+            delta[old_slots] -= self._unique_counts
+            merged_cells = np.empty((len(merged), 2), dtype=np.int64)
+            merged_cells[old_slots] = self._unique_cells
+            merged_cells[new_slots] = unique_cells
+            moved = delta != 0
+            changed = merged_cells[moved]
+            self._bin(changed, delta[moved].astype(np.float32))
+            self._keys = keys
+            self._unique_keys, self._unique_counts, self._unique_cells = unique_keys, counts, unique_cells
+            if len(changed) == 0:
+                self.last_dirty_blocks = 0
+                return 0
+
+            dirty = self._footprint_blocks(changed)
+            self._recompute(dirty)
+            self._png = self._data_url = None
+            self.version += 1
+            self.last_dirty = dirty
+            self.last_dirty_blocks = int(dirty.sum())
+
+        self.logger.debug(
+            f"Heatmap updated: {self.last_dirty_blocks}/{dirty.size} blocks over "
+            f"{len(keys)} threats in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        return self.last_dirty_blocks
+
+    def bounds(self) -> List[List[float]]:
+        """Leaflet [[south, west], [north, east]] bounds of the raster."""
+        west, south, east, north = self.bbox
+        return [[north - self.height * self._deg_y, west], [north, west + self.width * self._deg_x]]
+
+    def png(self) -> bytes:
+        """The coloured raster as PNG bytes, encoded once per version."""
+        with self._lock:
+            if self._png is None:
+                self._png = _encode_palette_png(self.levels, self._ramp)
+            return self._png
+
+    def data_url(self) -> str:
+        """The coloured raster as a PNG data URL, encoded once per version."""
+        png = self.png()
+        with self._lock:
+            if self._data_url is None or self._png is not png:
+                self._data_url = "data:image/png;base64," + base64.b64encode(png).decode("ascii")
+            return self._data_url
+
+    def _to_cells(self, positions) -> "np.ndarray":
+        """Integer (x, y) grid cells of lat/lon positions, y growing southwards."""
+        west, _, _, north = self.bbox
+        x = np.floor((positions[:, 1] - west) / self._deg_x)
+        y = np.floor((north - positions[:, 0]) / self._deg_y)
+        return np.stack([x, y], axis=1).astype(np.int64)
+
+    def _bin(self, cells, weights) -> None:
+        """Add each cell's weight to its count, for every in-grid cell."""
+        inside = (cells[:, 0] >= 0) & (cells[:, 0] < self.width) & (cells[:, 1] >= 0) & (cells[:, 1] < self.height)
+        weights = np.broadcast_to(np.asarray(weights, dtype=np.float32), len(cells))[inside]
+        cells = cells[inside]
+        np.add.at(self.counts, (cells[:, 1], cells[:, 0]), weights)
+
+    def _footprint_blocks(self, cells) -> "np.ndarray":
+        """Boolean (blocks_y, blocks_x) mask of blocks within kernel reach of the cells."""
+        low = np.maximum((cells - self.reach) // self.block, 0)
+        high = np.minimum((cells + self.reach) // self.block, [self.blocks_x - 1, self.blocks_y - 1])
+        keep = (low[:, 0] <= high[:, 0]) & (low[:, 1] <= high[:, 1])
+        low, high = low[keep], high[keep] + 1
+        # Paint every footprint rectangle at once: +1/-1 at its corners, then a 2D prefix sum
+        marks = np.zeros((self.blocks_y + 1, self.blocks_x + 1), dtype=np.int64)
+        np.add.at(marks, (low[:, 1], low[:, 0]), 1)
+        np.add.at(marks, (low[:, 1], high[:, 0]), -1)
+        np.add.at(marks, (high[:, 1], low[:, 0]), -1)
+        np.add.at(marks, (high[:, 1], high[:, 0]), 1)
+        return marks.cumsum(0).cumsum(1)[:-1, :-1] > 0
+
+    def _recompute(self, dirty) -> None:
+        """Re-convolve counts over the dirty blocks and recolour them."""
+        rows, cols = np.nonzero(dirty)
+        y0, y1 = rows.min() * self.block, min((rows.max() + 1) * self.block, self.height)
+        x0, x1 = cols.min() * self.block, min((cols.max() + 1) * self.block, self.width)
+        window = _convolve(self.counts, self._kernel, y0, y1, x0, x1)
+        levels = self._levels(window)
+
+        for by, bx in zip(rows, cols):
+            ys = slice(by * self.block - y0, min((by + 1) * self.block, self.height) - y0)
+            xs = slice(bx * self.block - x0, min((bx + 1) * self.block, self.width) - x0)
+            self.density[y0:y1, x0:x1][ys, xs] = window[ys, xs]
+            self.levels[y0:y1, x0:x1][ys, xs] = levels[ys, xs]
+
+    def _levels(self, density) -> "np.ndarray":
+        """Ramp index 0..255 for density values."""
+        return ((1.0 - np.exp(-density / self.saturation)) * 255).astype(np.uint8)
+
+
+def _position_keys(positions) -> "np.ndarray":
+    """Integer identity of each position at micro-degree precision."""
+    fixed = np.round(positions * 1e6).astype(np.int64)
+    return fixed[:, 0] * 1_000_000_000 + fixed[:, 1]
+
+
+def _convolve(counts, kernel, y0: int, y1: int, x0: int, x1: int) -> "np.ndarray":
+    """Separable convolution of counts with a 1D kernel, evaluated over rows y0:y1 and columns x0:x1."""
+    reach = len(kernel) // 2
+    height, width = counts.shape
+    padded = np.zeros((y1 - y0 + 2 * reach, x1 - x0 + 2 * reach), dtype=np.float32)
+    sy0, sy1 = max(y0 - reach, 0), min(y1 + reach, height)
+    sx0, sx1 = max(x0 - reach, 0), min(x1 + reach, width)
+    padded[sy0 - (y0 - reach):sy1 - (y0 - reach), sx0 - (x0 - reach):sx1 - (x0 - reach)] = counts[sy0:sy1, sx0:sx1]
+
+    rows = np.zeros((padded.shape[0], x1 - x0), dtype=np.float32)
+    for i, weight in enumerate(kernel):
+        rows += weight * padded[:, i:i + x1 - x0]
+    result = np.zeros((y1 - y0, x1 - x0), dtype=np.float32)
+    for i, weight in enumerate(kernel):
+        result += weight * rows[i:i + y1 - y0]
+    return result
+
+
+def _encode_palette_png(levels, ramp) -> bytes:
+    """Encode an (H, W) uint8 index array as a palette PNG with per-entry alpha."""
+    height, width = levels.shape
+    raw = np.zeros((height, width + 1), dtype=np.uint8)
+    raw[:, 1:] = levels
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"PLTE", ramp[:, :3].tobytes()) + chunk(b"tRNS", ramp[:, 3].tobytes())
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+_heatmaps: Dict[str, ThreatHeatmap] = {}
+_heatmaps_lock = threading.Lock()
+
+
+def get_heatmap(name: str, config) -> ThreatHeatmap:
+    """Shared heatmap for a named threat layer, kept across renders so updates stay incremental."""
+    with _heatmaps_lock:
+        heatmap = _heatmaps.get(name)
+        if heatmap is None:
+            heatmap = ThreatHeatmap(cell_m=config.MAP_HEATMAP_CELL_M, bandwidth_m=config.MAP_HEATMAP_BANDWIDTH_M)
+            _heatmaps[name] = heatmap
+        return heatmap
+
+
+def density_layer(name: str, config, positions=None) -> Dict[str, List[Dict[str, Any]]]:
+    """The named shared heatmap as a scene layer, first moved to positions when they are given."""
+    heatmap = get_heatmap(name, config)
+    if positions is not None:
+        heatmap.update(positions)
+    overlay = make_overlay(
+        heatmap.data_url(), heatmap.bounds(), opacity=0.75,
+        feature_id=f"{name}/heatmap"
+    )
+    return {"heatmap": [overlay]}
+
+
+def apply_threat_heatmap(name: str, scene: Dict[str, List[Dict[str, Any]]], config,
+                         density: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Draw a scene's threats as density as well as, or instead of, markers.
+
+    density is a layer of every known threat, such as the whole outbreak; it is laid under
+    the scene's own zombie markers, which stay as close-up pins. Without it, the markers
+    are replaced by a density overlay of themselves when there are too many to draw.
+    """
+    if density:
+        return {**scene, **density}
+    zombies = scene.get("zombie", [])
+    if not NUMPY_AVAILABLE or len(zombies) <= config.MAP_HEATMAP_THRESHOLD:
+        return scene
+
+    positions = [(f["geometry"]["coordinates"][1], f["geometry"]["coordinates"][0]) for f in zombies]
+    scene = {kind: features for kind, features in scene.items() if kind != "zombie"}
+    scene.update(density_layer(name, config, positions))
+    return scene
@@ -0,0 +1,106 @@
+"""
+Local Tile Server for SurviveTrack
+Serves basemap tiles and Leaflet's scripts from the Gradio app itself, so maps load without any CDN.
+"""
+
+import logging
+from typing import Dict, List
+
+from src.mapping.tile_store import MBTilesStore, asset_path
+
+try:
+    import folium
+    FOLIUM_AVAILABLE = True
+except ImportError:
+    FOLIUM_AVAILABLE = False
+
+try:
+    from starlette.requests import Request
+    from starlette.responses import Response
+    from starlette.routing import BaseRoute, Mount, Route
+    from starlette.staticfiles import StaticFiles
+    STARLETTE_AVAILABLE = True
+except ImportError:
+    STARLETTE_AVAILABLE = False
+
+DEFAULT_TILES = "CartoDB dark_matter"
+TILE_ATTRIBUTION = "&copy; OpenStreetMap contributors &copy; CARTO"
+MAP_ASSETS_ROUTE = "/map-assets"
+
+# Scripts and stylesheets every folium map pulls in, as (name, url) pairs
+MAP_ASSETS = (
+    {"default_js": folium.Map.default_js, "default_css": folium.Map.default_css} if FOLIUM_AVAILABLE else {}
+)
+
+# What tile_routes has mounted on the app in this process; maps only point at what is served
+_serving = {"tiles": False, "assets": False}
+
+
+def map_asset_urls() -> List[str]:
+    """CDN URLs of the map scripts and stylesheets to mirror for offline use."""
+    return [url for assets in MAP_ASSETS.values() for _, url in assets]
+
+
+def _tile_endpoint(store: MBTilesStore):
+    logger = logging.getLogger(__name__)
+
+    def tile(request: "Request") -> "Response":
+        z, x, y = (request.path_params[key] for key in ("z", "x", "y"))
+        try:
+            data = store.get_tile(z, x, y)
+        except Exception as e:
+            logger.error(f"Tile read failed for {z}/{x}/{y}: {e}")
+            return Response(status_code=500)
+        if data is None:
+            return Response(status_code=404)
+        return Response(data, media_type="image/png", headers={"Cache-Control": "public, max-age=604800"})
+
+    return tile
+
+
+def tile_routes(config) -> List["BaseRoute"]:
+    """
+    Routes serving the offline basemap and map assets, for the app that hosts the interface.
+
+    Call before building the interface: maps switch to the served tiles and assets only once
+    their routes exist, and fall back to the CDN for anything not seeded yet.
+    """
+    logger = logging.getLogger(__name__)
+    routes: List["BaseRoute"] = []
+    if not config.TILE_SERVER_ENABLED:
+        return routes
+    if not STARLETTE_AVAILABLE:
+        logger.warning("⚠️ starlette not installed; maps load tiles and scripts from the CDN. Run: pip install starlette")
+        return routes
+
+    if config.TILE_STORE_PATH.exists():
+        store = MBTilesStore(config.TILE_STORE_PATH, readonly=True)
+        routes.append(Route("/tiles/{z:int}/{x:int}/{y:int}.png", _tile_endpoint(store), methods=["GET"]))
+        _serving["tiles"] = True
+        logger.info(f"🗺️ Serving offline tiles from {config.TILE_STORE_PATH}")
+    else:
+        logger.warning(f"⚠️ Tile store {config.TILE_STORE_PATH} not found. Run: python main.py seed-tiles")
+
+    urls = map_asset_urls()
+    if urls and all((config.MAP_ASSETS_PATH / asset_path(url)).exists() for url in urls):
+        routes.append(Mount(MAP_ASSETS_ROUTE, app=StaticFiles(directory=config.MAP_ASSETS_PATH)))
+        _serving["assets"] = True
+        logger.info(f"🗺️ Serving map scripts from {config.MAP_ASSETS_PATH}")
+    else:
+        logger.warning(f"⚠️ Map scripts not found in {config.MAP_ASSETS_PATH}; loading them from the CDN")
+    return routes
+
+
+def basemap_options(config=None) -> Dict[str, str]:
+    """folium.Map tile arguments: the app's tile route when it is being served, else the CDN."""
+    if config is not None and _serving["tiles"]:
+        return {"tiles": config.TILE_PUBLIC_URL, "attr": TILE_ATTRIBUTION}
+    return {"tiles": DEFAULT_TILES}
+
+
+def use_served_assets(map_obj) -> None:
+    """Point a folium map's scripts and stylesheets at the app's asset route when it is being served."""
+    if not _serving["assets"]:
+        return
+    for attribute, assets in MAP_ASSETS.items():
+        setattr(map_obj, attribute, [(name, f"{MAP_ASSETS_ROUTE}/{asset_path(url)}") for name, url in assets])
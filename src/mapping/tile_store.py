@@ -0,0 +1,233 @@
+"""
+Offline Tile Store for SurviveTrack
+MBTiles (SQLite) basemap cache, seeded ahead of time for the Karachi bounding box.
+"""
+
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urljoin, urlsplit
+
+try:
+    import requests
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+    requests = None
+
+# West, south, east, north - covers every zone, SOS ring and aid signal we place
+KARACHI_BBOX = (66.85, 24.75, 67.20, 25.00)
+
+# url(...) references in a stylesheet
+CSS_URL = re.compile(r"url\(\s*['\"]?([^'\")]+?)['\"]?\s*\)")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE IF NOT EXISTS tiles (
+        zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB,
+        PRIMARY KEY (zoom_level, tile_column, tile_row)
+    ) WITHOUT ROWID;
+"""
+
+
+class MBTilesStore:
+    """
+    Read/write access to an MBTiles file.
+
+    Tiles are addressed with XYZ coordinates as used by Leaflet; rows are flipped to
+    the TMS scheme MBTiles stores them in. Each thread gets its own connection.
+    """
+
+    def __init__(self, path, readonly: bool = False):
+        self.path = Path(path)
+        self.readonly = readonly
+        self.logger = logging.getLogger(__name__)
+        self._local = threading.local()
+
+        if not readonly:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.readonly:
+            return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def exists(self) -> bool:
+        """Whether the store file has been created."""
+        return self.path.exists()
+
+    def get_tile(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """Tile image bytes for XYZ coordinates, or None if not seeded."""
+        row = self.conn.execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+            (z, x, (1 << z) - 1 - y)
+        ).fetchone()
+        return row[0] if row else None
+
+    def has_tiles(self, z: int) -> set:
+        """XYZ (x, y) pairs already stored at a zoom level."""
+        rows = self.conn.execute("SELECT tile_column, tile_row FROM tiles WHERE zoom_level=?", (z,))
+        return {(x, (1 << z) - 1 - row) for x, row in rows}
+
+    def put_tiles(self, tiles: Sequence[Tuple[int, int, int, bytes]]) -> None:
+        """Store a batch of (z, x, y, data) tiles in one transaction."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data) VALUES (?, ?, ?, ?)",
+                [(z, x, (1 << z) - 1 - y, sqlite3.Binary(data)) for z, x, y, data in tiles]
+            )
+
+    def set_metadata(self, **values) -> None:
+        """Write MBTiles metadata entries."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+                [(name, str(value)) for name, value in values.items()]
+            )
+
+    def tile_count(self) -> int:
+        """Number of stored tiles."""
+        return self.conn.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+
+
+def lonlat_to_tile(lon: float, lat: float, z: int) -> Tuple[int, int]:
+    """XYZ tile containing a point at a zoom level."""
+    n = 1 << z
+    lat_rad = math.radians(max(-85.0511, min(85.0511, lat)))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_in_bbox(bbox: Sequence[float], zooms: Sequence[int]) -> Iterator[Tuple[int, int, int]]:
+    """All XYZ tiles covering a (west, south, east, north) box at the given zooms."""
+    west, south, east, north = bbox
+    for z in zooms:
+        x0, y0 = lonlat_to_tile(west, north, z)
+        x1, y1 = lonlat_to_tile(east, south, z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+
+def seed_tiles(store: MBTilesStore, upstream_url: str, bbox: Sequence[float] = KARACHI_BBOX,
+               min_zoom: int = 11, max_zoom: int = 18, workers: int = 4, batch_size: int = 256) -> int:
+    """Download every missing tile in a bounding box from upstream into the store."""
+    if not REQUESTS_AVAILABLE:
+        raise ImportError("requests not installed. Run: pip install requests")
+
+    logger = logging.getLogger(__name__)
+    zooms = range(min_zoom, max_zoom + 1)
+    existing = {z: store.has_tiles(z) for z in zooms}
+    missing = [(z, x, y) for z, x, y in tiles_in_bbox(bbox, zooms) if (x, y) not in existing[z]]
+    logger.info(f"🗺️ Seeding {len(missing)} tiles for zoom {min_zoom}-{max_zoom}")
+
+    session = requests.Session()
+    session.headers["User-Agent"] = "SurviveTrack tile seeder"
+
+    def fetch(tile):
+        z, x, y = tile
+        for attempt in range(3):
+            try:
+                response = session.get(upstream_url.format(z=z, x=x, y=y), timeout=15)
+                if response.status_code == 200:
+                    return z, x, y, response.content
+                if response.status_code == 404:
+                    return None
+            except requests.RequestException:
+                pass
+            time.sleep(2 ** attempt)
+        logger.warning(f"⚠️ Failed to fetch tile {z}/{x}/{y}")
+        return None
+
+    stored = 0
+    batch: List[Tuple[int, int, int, bytes]] = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for tile in pool.map(fetch, missing):
+            if tile is None:
+                continue
+            batch.append(tile)
+            if len(batch) >= batch_size:
+                store.put_tiles(batch)
+                stored += len(batch)
+                batch = []
+                logger.info(f"📦 {stored}/{len(missing)} tiles stored")
+    if batch:
+        store.put_tiles(batch)
+        stored += len(batch)
+
+    store.set_metadata(
+        name="SurviveTrack Karachi basemap",
+        format="png",
+        bounds=",".join(str(v) for v in bbox),
+        minzoom=min_zoom,
+        maxzoom=max_zoom,
+    )
+    logger.info(f"✅ Tile seeding complete: {stored} new tiles, {store.tile_count()} total")
+    return stored
+
+
+def asset_path(url: str) -> str:
+    """Where a CDN file is mirrored under the assets directory: its host, then its URL path."""
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+def seed_map_assets(directory, urls: Sequence[str]) -> int:
+    """
+    Mirror map scripts and stylesheets, and the fonts and images the stylesheets load, into a directory.
+
+    Files keep their CDN layout, so the relative url(...) references inside each stylesheet
+    still resolve once the directory is served. Files already mirrored are not fetched again.
+    """
+    if not REQUESTS_AVAILABLE:
+        raise ImportError("requests not installed. Run: pip install requests")
+
+    logger = logging.getLogger(__name__)
+    directory = Path(directory)
+    session = requests.Session()
+    session.headers["User-Agent"] = "SurviveTrack tile seeder"
+
+    pending, seen, stored = list(urls), set(urls), 0
+    while pending:
+        url = pending.pop()
+        target = directory / asset_path(url)
+        if not target.exists():
+            try:
+                response = session.get(url, timeout=30)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                logger.warning(f"⚠️ Failed to fetch map asset {url}: {e}")
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(response.content)
+            stored += 1
+        if target.suffix == ".css":
+            for ref in CSS_URL.findall(target.read_text(encoding="utf-8", errors="replace")):
+                if ref.startswith(("data:", "#")) or urlsplit(ref).netloc:
+                    continue
+                linked = urljoin(url, ref.split("?", 1)[0].split("#", 1)[0])
+                if linked not in seen:
+                    seen.add(linked)
+                    pending.append(linked)
+
+    logger.info(f"✅ Map assets mirrored: {stored} new files in {directory}")
+    return stored
@@ -0,0 +1,182 @@
+"""
+SOS Triage for SurviveTrack
+Active SOS signals in an indexed binary heap ordered by urgency, with aging that needs no re-keying.
+"""
+
+import heapq
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.mapping.dispatch import AGE_DOUBLING_MIN, PRIORITY_WEIGHT
+
+
+def triage_key(priority: str, survivors: int, at: float) -> float:
+    """
+    Heap key of a signal received at epoch seconds at.
+
+    Urgency is priority weight x survivors x 2 ** (minutes waiting / AGE_DOUBLING_MIN),
+    as in dispatch. Its log2 is log2(weight x survivors) + (now - at) / doubling time;
+    the now term is shared by every signal, so dropping it leaves a key that never changes
+    while old calls still overtake newer, higher-priority ones.
+    """
+    weight = PRIORITY_WEIGHT.get(priority, PRIORITY_WEIGHT["MEDIUM"])
+    return math.log2(weight * max(survivors, 1)) - at / (AGE_DOUBLING_MIN * 60)
+
+
+class TriageQueue:
+    """
+    Max-heap of signal ids by triage key, with each id's heap slot tracked.
+
+    The slot map makes update and cancel O(log n) sift operations instead of scans.
+    top(k) walks the heap from the root with a small frontier heap in O(k log k) and is
+    cached until the next change, so repeated reads cost nothing.
+    """
+
+    def __init__(self):
+        self._keys: List[float] = []
+        self._ids: List[int] = []
+        self._slots: Dict[int, int] = {}
+        self._records: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self.version = 0
+        self._top: Tuple[int, List[Dict[str, Any]]] = (-1, [])
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, signal_id: int) -> bool:
+        return signal_id in self._slots
+
+    def push(self, record: Dict[str, Any]) -> None:
+        """Add a signal log record, or re-key it when its id is already queued."""
+        key = triage_key(record["priority"], record["survivors"], record["at"])
+        with self._lock:
+            signal_id = record["id"]
+            self._records[signal_id] = record
+            slot = self._slots.get(signal_id)
+            if slot is None:
+                self._keys.append(key)
+                self._ids.append(signal_id)
+                slot = len(self._ids) - 1
+                self._slots[signal_id] = slot
+                self._sift_up(slot)
+            else:
+                self._rekey(slot, key)
+            self.version += 1
+
+    def update(self, signal_id: int, **fields) -> bool:
+        """Change a queued signal's fields, such as priority or survivors; returns whether it is queued."""
+        with self._lock:
+            record = self._records.get(signal_id)
+            if record is None:
+                return False
+            self.push(dict(record, **fields))
+            return True
+
+    def cancel(self, signal_id: int) -> bool:
+        """Drop a signal; returns whether it was queued."""
+        with self._lock:
+            slot = self._slots.pop(signal_id, None)
+            if slot is None:
+                return False
+            del self._records[signal_id]
+            last = len(self._ids) - 1
+            if slot != last:
+                self._keys[slot], self._ids[slot] = self._keys[last], self._ids[last]
+                self._slots[self._ids[slot]] = slot
+            self._keys.pop()
+            self._ids.pop()
+            if slot < len(self._ids):
+                self._sift_down(slot)
+                self._sift_up(slot)
+            self.version += 1
+            return True
+
+    def pop(self, k: int = 1) -> List[Dict[str, Any]]:
+        """Remove and return the k most urgent signals' records, most urgent first."""
+        with self._lock:
+            records = []
+            while self._ids and len(records) < k:
+                signal_id = self._ids[0]
+                records.append(self._records[signal_id])
+                self.cancel(signal_id)
+            return records
+
+    def top(self, k: int) -> List[Dict[str, Any]]:
+        """The k most urgent signals' records, most urgent first, without removing them."""
+        with self._lock:
+            version, cached = self._top
+            if version == self.version and (len(cached) >= k or len(cached) == len(self._ids)):
+                return cached[:k]
+            keys, ids = self._keys, self._ids
+            order: List[Dict[str, Any]] = []
+            frontier = [(-keys[0], 0)] if ids else []
+            while frontier and len(order) < k:
+                _, slot = heapq.heappop(frontier)
+                order.append(self._records[ids[slot]])
+                for child in (2 * slot + 1, 2 * slot + 2):
+                    if child < len(ids):
+                        heapq.heappush(frontier, (-keys[child], child))
+            self._top = (self.version, order)
+            return order
+
+    def rebuild(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Replace the queue with records in one O(n) heapify."""
+        with self._lock:
+            self._records = {record["id"]: record for record in records}
+            entries = [
+                (-triage_key(record["priority"], record["survivors"], record["at"]), signal_id)
+                for signal_id, record in self._records.items()
+            ]
+            heapq.heapify(entries)
+            self._keys = [-key for key, _ in entries]
+            self._ids = [signal_id for _, signal_id in entries]
+            self._slots = {signal_id: slot for slot, signal_id in enumerate(self._ids)}
+            self.version += 1
+
+    @staticmethod
+    def score(record: Dict[str, Any], now: Optional[float] = None) -> float:
+        """Urgency of a signal right now, the number dispatch plans with."""
+        now = time.time() if now is None else now
+        return 2.0 ** (triage_key(record["priority"], record["survivors"], record["at"]) + now / (AGE_DOUBLING_MIN * 60))
+
+    def _rekey(self, slot: int, key: float) -> None:
+        old = self._keys[slot]
+        self._keys[slot] = key
+        if key > old:
+            self._sift_up(slot)
+        elif key < old:
+            self._sift_down(slot)
+
+    def _sift_up(self, slot: int) -> None:
+        keys, ids, slots = self._keys, self._ids, self._slots
+        key, signal_id = keys[slot], ids[slot]
+        while slot > 0:
+            parent = (slot - 1) >> 1
+            if keys[parent] >= key:
+                break
+            keys[slot], ids[slot] = keys[parent], ids[parent]
+            slots[ids[slot]] = slot
+            slot = parent
+        keys[slot], ids[slot] = key, signal_id
+        slots[signal_id] = slot
+
+    def _sift_down(self, slot: int) -> None:
+        keys, ids, slots = self._keys, self._ids, self._slots
+        size = len(ids)
+        key, signal_id = keys[slot], ids[slot]
+        while True:
+            child = 2 * slot + 1
+            if child >= size:
+                break
+            if child + 1 < size and keys[child + 1] > keys[child]:
+                child += 1
+            if keys[child] <= key:
+                break
+            keys[slot], ids[slot] = keys[child], ids[child]
+            slots[ids[slot]] = slot
+            slot = child
+        keys[slot], ids[slot] = key, signal_id
+        slots[signal_id] = slot
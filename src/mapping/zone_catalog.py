@@ -0,0 +1,241 @@
+"""
+Zone Catalog for SurviveTrack
+Columnar in-memory zone table: NumPy coordinate and enum columns, interned labels, slotted Zone values.
+"""
+
+import sys
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.utils import geo
+
+DANGER_LEVELS = ("low", "medium", "high")
+UINT8_LABELS = 256
+
+
+@dataclass
+class Zone:
+    """Zone data structure with all tactical information."""
+    __slots__ = (
+        "name", "coords", "resources", "alert", "danger", "description",
+        "history", "threats", "tactical_notes", "resource_density"
+    )
+    name: str
+    coords: List[float]
+    resources: List[str]
+    alert: str
+    danger: str
+    description: str
+    history: str
+    threats: str
+    tactical_notes: str
+    resource_density: str
+
+
+ZONE_FIELDS = Zone.__slots__
+
+
+class _Labels:
+    """Interned string table mapping labels to small integer codes, at most limit of them."""
+
+    def __init__(self, initial: Sequence[str] = (), limit: Optional[int] = None):
+        self.values: List[str] = []
+        self.limit = limit
+        self._codes: Dict[str, int] = {}
+        for value in initial:
+            self.code(value)
+
+    def code(self, value: str) -> int:
+        """Code for a label, adding it to the table if it is new."""
+        code = self._codes.get(value)
+        if code is None:
+            if self.limit is not None and len(self.values) >= self.limit:
+                raise ValueError(f"Label table full: cannot add {value!r} beyond {self.limit} distinct labels")
+            code = self._codes[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+
+    def find(self, value: str) -> Optional[int]:
+        """Code for a label already in the table, or None."""
+        return self._codes.get(value)
+
+
+class ZoneCatalog(Mapping):
+    """
+    Zones stored column by column instead of one object per zone.
+
+    Coordinates are float64 arrays and danger and resource density are uint8 codes, so
+    bulk queries run vectorized. Each distinct resource list is stored once and rows hold
+    its number. Indexing by key builds a Zone value on demand; removals swap the last row in.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._lock = threading.RLock()
+        self._rows: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._lat = np.empty(capacity, dtype=np.float64)
+        self._lon = np.empty(capacity, dtype=np.float64)
+        self._danger = np.empty(capacity, dtype=np.uint8)
+        self._density = np.empty(capacity, dtype=np.uint8)
+        self._resource_set = np.empty(capacity, dtype=np.uint32)
+        # Codes are stored in uint8 columns, so each table holds at most 256 labels
+        self._danger_labels = _Labels(DANGER_LEVELS, limit=UINT8_LABELS)
+        self._density_labels = _Labels(("", *DANGER_LEVELS), limit=UINT8_LABELS)
+        self._resource_labels = _Labels()
+        # Distinct resource lists as tuples of label codes; rows point at one by number
+        self._resource_sets: List[Tuple[int, ...]] = []
+        self._resource_set_codes: Dict[Tuple[int, ...], int] = {}
+        self._text: Dict[str, List[str]] = {
+            name: [] for name in ("name", "alert", "description", "history", "threats", "tactical_notes")
+        }
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._keys))
+
+    def __contains__(self, zone_key: object) -> bool:
+        return zone_key in self._rows
+
+    def __getitem__(self, zone_key: str) -> Zone:
+        with self._lock:
+            return self._zone(self._rows[zone_key])
+
+    def put(self, zone_key: str, zone: Zone) -> None:
+        """Insert or overwrite one zone; raises ValueError if a label table is full."""
+        with self._lock:
+            codes = self._encode(zone)
+            row = self._rows.get(zone_key)
+            if row is None:
+                row = len(self._keys)
+                self._reserve(row + 1)
+                self._rows[zone_key] = row
+                self._keys.append(zone_key)
+                for column in self._text.values():
+                    column.append("")
+            self._write(row, zone, codes)
+
+    def load(self, zones: Iterable[Tuple[str, Zone]]) -> None:
+        """Insert or overwrite many (zone_key, zone) pairs."""
+        with self._lock:
+            for zone_key, zone in zones:
+                self.put(zone_key, zone)
+
+    def remove(self, zone_key: str) -> bool:
+        """Drop a zone, moving the last row into its slot."""
+        with self._lock:
+            row = self._rows.pop(zone_key, None)
+            if row is None:
+                return False
+            last = len(self._keys) - 1
+            if row != last:
+                moved = self._keys[last]
+                self._keys[row] = moved
+                self._rows[moved] = row
+                for array in self._arrays():
+                    array[row] = array[last]
+                for column in self._text.values():
+                    column[row] = column[last]
+            self._keys.pop()
+            for column in self._text.values():
+                column.pop()
+            return True
+
+    def keys_where(self, danger: Optional[str] = None, resource_density: Optional[str] = None,
+                   resource: Optional[str] = None) -> List[str]:
+        """Keys of zones matching every given filter."""
+        with self._lock:
+            return [self._keys[row] for row in self._select(danger, resource_density, resource)]
+
+    def danger_counts(self) -> Dict[str, int]:
+        """Number of zones per danger level."""
+        with self._lock:
+            counts = np.bincount(self._danger[:len(self._keys)], minlength=len(self._danger_labels.values))
+            return {level: int(count) for level, count in zip(self._danger_labels.values, counts)}
+
+    def centroid(self, danger: Optional[str] = None, resource_density: Optional[str] = None,
+                 resource: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        """Geographic centroid (lat, lon) of the zones matching every given filter."""
+        with self._lock:
+            rows = self._select(danger, resource_density, resource)
+            if len(rows) == 0:
+                return None
+            return geo.centroid(self._lat[rows], self._lon[rows])
+
+    def coordinates(self) -> np.ndarray:
+        """(N, 2) lat/lon array of every zone, in row order."""
+        with self._lock:
+            n = len(self._keys)
+            return np.stack([self._lat[:n], self._lon[:n]], axis=1)
+
+    def nbytes(self) -> int:
+        """Bytes held by the numeric columns."""
+        return sum(array.nbytes for array in self._arrays())
+
+    def _select(self, danger: Optional[str], resource_density: Optional[str], resource: Optional[str]) -> np.ndarray:
+        """Row numbers matching every given filter; a label no zone has matches nothing."""
+        n = len(self._keys)
+        mask = np.ones(n, dtype=bool)
+        if danger is not None:
+            mask &= self._danger[:n] == self._find(self._danger_labels, danger)
+        if resource_density is not None:
+            mask &= self._density[:n] == self._find(self._density_labels, resource_density)
+        if resource is not None:
+            code = self._resource_labels.find(resource)
+            matching = [i for i, codes in enumerate(self._resource_sets) if code in codes]
+            mask &= np.isin(self._resource_set[:n], matching)
+        return np.nonzero(mask)[0]
+
+    @staticmethod
+    def _find(labels: _Labels, value: str) -> int:
+        """Code of a known label, or -1, which no stored code equals."""
+        code = labels.find(value)
+        return -1 if code is None else code
+
+    def _arrays(self) -> Tuple[np.ndarray, ...]:
+        return self._lat, self._lon, self._danger, self._density, self._resource_set
+
+    def _reserve(self, size: int) -> None:
+        """Grow the numeric columns geometrically to hold size rows."""
+        capacity = len(self._lat)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        for name in ("_lat", "_lon", "_danger", "_density", "_resource_set"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _encode(self, zone: Zone) -> Tuple[int, int, int]:
+        """(danger, resource density, resource list) codes for a zone, interning new labels."""
+        danger = self._danger_labels.code(zone.danger)
+        density = self._density_labels.code(zone.resource_density)
+        codes = tuple(self._resource_labels.code(resource) for resource in zone.resources)
+        set_code = self._resource_set_codes.get(codes)
+        if set_code is None:
+            set_code = self._resource_set_codes[codes] = len(self._resource_sets)
+            self._resource_sets.append(codes)
+        return danger, density, set_code
+
+    def _write(self, row: int, zone: Zone, codes: Tuple[int, int, int]) -> None:
+        self._lat[row], self._lon[row] = zone.coords
+        self._danger[row], self._density[row], self._resource_set[row] = codes
+        for name, column in self._text.items():
+            column[row] = sys.intern(getattr(zone, name))
+
+    def _zone(self, row: int) -> Zone:
+        text = {name: column[row] for name, column in self._text.items()}
+        return Zone(
+            coords=[float(self._lat[row]), float(self._lon[row])],
+            resources=[self._resource_labels.values[code] for code in self._resource_sets[self._resource_set[row]]],
+            danger=self._danger_labels.values[self._danger[row]],
+            resource_density=self._density_labels.values[self._density[row]],
+            **text
+        )
@@ -4,35 +4,69 @@ Manages zone data, resource information, and tactical intelligence.
 """
 
 import logging
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+import threading
+import time
+from dataclasses import replace
+from typing import Callable, Dict, List, Any, Mapping, Optional, Tuple
 
-@dataclass
-class Zone:
-    """Zone data structure with all tactical information."""
-    name: str
-    coords: List[float]
-    resources: List[str]
-    alert: str
-    danger: str
-    description: str
-    history: str
-    threats: str
-    tactical_notes: str
-    resource_density: str
+from src.mapping.dispatch import Dispatcher, Team, teams_at_bases
+from src.mapping.evacuation import SafeZoneField
+from src.mapping.inventory import ResourceInventory
+from src.mapping.route_planner import CostRaster, RoutePlanner
+from src.mapping.spatial_index import GridIndex
+from src.mapping.zone_catalog import ZONE_FIELDS, Zone, ZoneCatalog
+from src.mapping.zone_store import ZoneStore
+from src.utils.config import Config
 
 class ZoneManager:
-    """Manages all zone data and resource information for SurviveTrack."""
+    """
+    Manages all zone data and resource information for SurviveTrack.
     
-    def __init__(self):
+    Zones live in the SQLite zone store and are loaded on first use. Edits made through
+    this manager or by any other writer to the store are picked up by refresh(), which
+    updates the cache and spatial indexes, bumps the data version and notifies subscribers.
+    Stock written to the store, such as an import, is picked up the same way.
+    """
+    
+    def __init__(self, config: Optional[Config] = None):
+        config = config or Config()
+        self.config = config
         self.logger = logging.getLogger(__name__)
-        self._initialize_zones()
-        self._initialize_resource_markers()
-        self.logger.info("🗺️ Zone Manager initialized with 3 tactical zones")
+        self.store = ZoneStore(config.ZONE_STORE_PATH)
+        self.version = 0
+        self._version_lock = threading.Lock()
+        self._lock = threading.RLock()
+        self.catalog = ZoneCatalog()
+        self._inventory: Optional[ResourceInventory] = None
+        self._route_planner: Optional[RoutePlanner] = None
+        self._safe_zone_field: Optional[SafeZoneField] = None
+        self._dispatcher: Optional[Dispatcher] = None
+        self._all_loaded = False
+        self._resource_markers: Optional[Dict[str, Dict[str, str]]] = None
+        self._zone_index: Optional[GridIndex] = None
+        self._indexed = False
+        self.resource_index = GridIndex()
+        self._zone_resource_keys: Dict[str, set] = {}
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self._stop_watching = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        
+        if self.store.is_empty():
+            self._initialize_zones()
+        if not self.resource_markers:
+            self._initialize_resource_markers()
+            self._resource_markers = None
+        self.revision = self.store.revision()
+        self.stock_revision = self.store.stock_revision()
+        # Build the spatial indexes and the safe zone field off the startup path; queries wait if they arrive first
+        threading.Thread(target=self._precompute, name="zone-indexer", daemon=True).start()
+        if config.ZONE_RELOAD_INTERVAL > 0:
+            self.start_watcher(config.ZONE_RELOAD_INTERVAL)
+        self.logger.info(f"🗺️ Zone Manager initialized from {config.ZONE_STORE_PATH}")
     
     def _initialize_zones(self) -> None:
-        """Initialize zone data - THIS IS YOUR ORIGINAL ZONE_DATA FROM main.py"""
-        self.zones = {
+        """Seed an empty store with the default zones - THIS IS YOUR ORIGINAL ZONE_DATA FROM main.py"""
+        zones = {
             "Zone A": Zone(
                 name="📍 Zone A – Boat Basin",
                 coords=[24.8182, 67.0256],
@@ -70,10 +104,11 @@ class ZoneManager:
                 resource_density="low"
             )
         }
+        self.store.put_zones(_zone_row(zone_key, zone) for zone_key, zone in zones.items())
     
     def _initialize_resource_markers(self) -> None:
-        """Initialize resource marker definitions - YOUR ORIGINAL RESOURCE_MARKERS"""
-        self.resource_markers = {
+        """Seed resource marker definitions - YOUR ORIGINAL RESOURCE_MARKERS"""
+        self.store.put_resource_markers({
             "water": {"emoji": "💧", "color": "#4A90E2", "name": "Water Source"},
             "food": {"emoji": "🍞", "color": "#8B4513", "name": "Food Cache"},
             "shelter": {"emoji": "🏠", "color": "#228B22", "name": "Safe Shelter"},
@@ -86,15 +121,284 @@ class ZoneManager:
             "radio": {"emoji": "📻", "color": "#9370DB", "name": "Communication"},
             "battery": {"emoji": "🔋", "color": "#00CED1", "name": "Power Source"},
             "tools": {"emoji": "🔧", "color": "#B8860B", "name": "Tools & Parts"}
-        }
+        })
+    
+    @property
+    def resource_markers(self) -> Dict[str, Dict[str, str]]:
+        """Resource marker definitions, read from the store on first use."""
+        if self._resource_markers is None:
+            self._resource_markers = self.store.get_resource_markers()
+        return self._resource_markers
+    
+    @property
+    def inventory(self) -> ResourceInventory:
+        """Resource stock per zone: stored stock where reported, else estimated from each zone's listed resources."""
+        with self._lock:
+            if self._inventory is None:
+                self._inventory = self._build_inventory()
+            return self._inventory
+    
+    def _build_inventory(self) -> ResourceInventory:
+        inventory = ResourceInventory(self.resource_markers)
+        inventory.load_zones(self.get_all_zones().items())
+        inventory.set_quantities(self.store.get_stock())
+        return inventory
+    
+    @property
+    def route_planner(self) -> RoutePlanner:
+        """Danger-weighted route planner over a cost raster painted from every zone, built on first use."""
+        with self._lock:
+            if self._route_planner is None:
+                raster = CostRaster(
+                    cell_m=self.config.ROUTE_CELL_M,
+                    threat_weight=self.config.ROUTE_THREAT_WEIGHT,
+                    bandwidth_m=self.config.MAP_HEATMAP_BANDWIDTH_M
+                )
+                raster.set_zones(self._zone_dangers())
+                self._route_planner = RoutePlanner(raster)
+            return self._route_planner
+    
+    @property
+    def dispatcher(self) -> Dispatcher:
+        """Rescue dispatch planner sharing the route planner's cost raster, built on first use."""
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = Dispatcher(self.route_planner.raster, exact_limit=self.config.DISPATCH_EXACT_LIMIT)
+            return self._dispatcher
+    
+    def rescue_teams(self) -> List[Team]:
+        """Rescue teams stationed at every zone that is not high danger."""
+        bases = [(key, lat, lon) for key, lat, lon, danger, _ in self.store.zone_positions() if danger != "high"]
+        return teams_at_bases(sorted(bases), self.config.DISPATCH_TEAMS_PER_BASE)
+    
+    @property
+    def safe_zone_field(self) -> SafeZoneField:
+        """Nearest low-danger zone for every cell of the city grid, rebuilt whenever zones change."""
+        with self._lock:
+            if self._safe_zone_field is None:
+                field = SafeZoneField(cell_m=self.config.EVAC_FIELD_CELL_M)
+                field.rebuild(self._safe_zones())
+                self._safe_zone_field = field
+            return self._safe_zone_field
+    
+    def nearest_safe_zone(self, lat: float, lon: float) -> Optional[Tuple[str, Zone, float, float]]:
+        """(zone_key, zone, distance_m, bearing_deg) of the low-danger zone nearest a position."""
+        found = self.safe_zone_field.lookup(lat, lon)
+        if found is None:
+            return None
+        zone_key, distance, bearing = found
+        zone = self.get_zone(zone_key)
+        return (zone_key, zone, distance, bearing) if zone else None
+    
+    @property
+    def zones(self) -> Mapping[str, Zone]:
+        """Read-only view of every zone."""
+        return self.get_all_zones()
+    
+    @property
+    def zone_index(self) -> GridIndex:
+        """Spatial index over zone coordinates, built from the store on first use."""
+        self._ensure_indexed()
+        return self._zone_index
     
     def get_zone(self, zone_key: str) -> Optional[Zone]:
         """Get zone data by key."""
-        return self.zones.get(zone_key)
+        with self._lock:
+            if zone_key in self.catalog:
+                return self.catalog[zone_key]
+            if self._all_loaded:
+                return None
+            row = self.store.get_zone(zone_key)
+            if row is None:
+                return None
+            zone = _zone_from_row(row)
+            self.catalog.put(zone_key, zone)
+            return zone
+    
+    def get_all_zones(self) -> Mapping[str, Zone]:
+        """Get a read-only view of all zone data, backed by the columnar catalog."""
+        with self._lock:
+            if not self._all_loaded:
+                self.catalog.load((row["zone_key"], _zone_from_row(row)) for row in self.store.get_zones())
+                self._all_loaded = True
+            return self.catalog
+    
+    def add_zone(self, zone_key: str, zone: Zone) -> None:
+        """Add or replace a zone and bump the data version."""
+        self.store.put_zones([_zone_row(zone_key, zone)])
+        self.refresh()
+    
+    def update_zone(self, zone_key: str, **fields: Any) -> Optional[Zone]:
+        """Update fields of an existing zone and bump the data version."""
+        zone = self.get_zone(zone_key)
+        if zone is None:
+            return None
+        updated = replace(zone, **fields)
+        self.store.put_zones([_zone_row(zone_key, updated)])
+        self.refresh()
+        return updated
+    
+    def remove_zone(self, zone_key: str) -> bool:
+        """Delete a zone and bump the data version."""
+        removed = self.store.delete_zone(zone_key)
+        if removed:
+            self.refresh()
+        return removed
+    
+    def subscribe(self, listener: Callable[[List[str]], None]) -> None:
+        """Call listener with the changed zone keys after every refresh that finds changes."""
+        self._listeners.append(listener)
+    
+    def refresh(self) -> List[str]:
+        """Apply zone and stock changes written to the store since the last refresh; returns the changed zone keys."""
+        with self._lock:
+            revision, changed = self.store.changes_since(self.revision)
+            stock_revision, restocked = self.store.stock_changes_since(self.stock_revision)
+            if not changed and not restocked:
+                return []
+            self.revision, self.stock_revision = revision, stock_revision
+            rows = {row["zone_key"]: row for row in self.store.get_zones(changed)}
+            for zone_key in changed:
+                row = rows.get(zone_key)
+                if row is None:
+                    self.catalog.remove(zone_key)
+                    if self._inventory is not None:
+                        self._inventory.remove_zone(zone_key)
+                    if self._indexed:
+                        self._unindex_zone(zone_key)
+                    continue
+                zone = _zone_from_row(row)
+                self.catalog.put(zone_key, zone)
+                if self._inventory is not None:
+                    self._inventory.add_zone(zone_key, zone)
+                if self._indexed:
+                    self._index_zone(zone_key, zone.coords, zone.danger, zone.resources)
+            if self._inventory is not None:
+                if restocked:
+                    # Deleted stock falls back to the estimate, so start over from the store
+                    self._inventory = self._build_inventory()
+                elif changed:
+                    # New zones are seeded with estimates; stock already stored for them replaces those
+                    self._inventory.set_quantities(self.store.get_stock(rows))
+            if changed and self._route_planner is not None:
+                self._route_planner.raster.set_zones(self._zone_dangers())
+            self._bump_version()
+        
+        if restocked:
+            self.logger.info(f"📦 Reloaded stock of {len(restocked)} zone(s) from the zone store")
+        if not changed:
+            return []
+        # Readers keep the old field until the new one is swapped in
+        if self._safe_zone_field is not None:
+            self._safe_zone_field.rebuild(self._safe_zones())
+        self.logger.info(f"🔄 Reloaded {len(changed)} zone(s) from the zone store")
+        for listener in list(self._listeners):
+            try:
+                listener(changed)
+            except Exception as e:
+                self.logger.error(f"Zone change listener failed: {e}")
+        return changed
+    
+    def start_watcher(self, interval: float = 2.0) -> None:
+        """Poll the store for changes from other writers in a background thread."""
+        if self._watcher is not None:
+            return
+        
+        def watch():
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    self.logger.error(f"Zone store poll failed: {e}")
+        
+        self._watcher = threading.Thread(target=watch, name="zone-store-watcher", daemon=True)
+        self._watcher.start()
     
-    def get_all_zones(self) -> Dict[str, Zone]:
-        """Get all zone data."""
-        return self.zones.copy()
+    def stop_watcher(self) -> None:
+        """Stop polling the store."""
+        self._stop_watching.set()
+    
+    def _zone_dangers(self) -> List[Tuple[float, float, str]]:
+        """(lat, lon, danger) of every stored zone, for painting the route cost raster."""
+        return [(lat, lon, danger) for _, lat, lon, danger, _ in self.store.zone_positions()]
+    
+    def _safe_zones(self) -> List[Tuple[str, float, float]]:
+        """(zone_key, lat, lon) of every low-danger zone, the seeds of the safe zone field."""
+        return [(key, lat, lon) for key, lat, lon, danger, _ in self.store.zone_positions() if danger == "low"]
+    
+    def _precompute(self) -> None:
+        """Startup work that queries would otherwise wait on."""
+        self._ensure_indexed()
+        self.safe_zone_field
+    
+    def _ensure_indexed(self) -> None:
+        """Build the spatial indexes from zone positions, without loading the zones' text fields."""
+        if self._indexed:
+            return
+        with self._lock:
+            if self._indexed:
+                return
+            start = time.perf_counter()
+            positions = self.store.zone_positions()
+            self._zone_index = GridIndex()
+            self._zone_index.load((zone_key, lat, lon, danger) for zone_key, lat, lon, danger, _ in positions)
+            caches = []
+            for zone_key, lat, lon, _, resources in positions:
+                keys = self._zone_resource_keys[zone_key] = set()
+                for resource in resources:
+                    key = f"{zone_key}/{resource}"
+                    keys.add(key)
+                    caches.append((key, lat, lon, {"resource": resource, "zone": zone_key}))
+            self.resource_index.load(caches)
+            self._indexed = True
+        self.logger.info(
+            f"📍 Indexed {len(positions)} zones and {len(caches)} resources in {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+    
+    def _index_zone(self, zone_key: str, coords: List[float], danger: str, resources: List[str]) -> None:
+        """Place a zone and the resources it lists in the spatial indexes."""
+        lat, lon = coords
+        self._zone_index.insert(zone_key, lat, lon, danger)
+        for key in self._zone_resource_keys.pop(zone_key, set()):
+            self.resource_index.remove(key)
+        keys = set()
+        for resource in resources:
+            key = f"{zone_key}/{resource}"
+            self.resource_index.insert(key, lat, lon, {"resource": resource, "zone": zone_key})
+            keys.add(key)
+        self._zone_resource_keys[zone_key] = keys
+    
+    def _unindex_zone(self, zone_key: str) -> None:
+        """Drop a deleted zone and its resources from the spatial indexes."""
+        self._zone_index.remove(zone_key)
+        for key in self._zone_resource_keys.pop(zone_key, set()):
+            self.resource_index.remove(key)
+    
+    def zones_within(self, lat: float, lon: float, radius_m: float) -> List[Tuple[str, Zone, float]]:
+        """(zone_key, zone, distance_m) of zones within radius_m, nearest first."""
+        return [(key, self.get_zone(key), d) for key, d in self.zone_index.within_radius(lat, lon, radius_m)]
+    
+    def zones_by_danger(self, danger: str) -> List[str]:
+        """Keys of every zone at a danger level."""
+        return self.get_all_zones().keys_where(danger=danger)
+    
+    def zone_centroid(self, danger: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        """Centroid of all zones, or of those at one danger level."""
+        return self.get_all_zones().centroid(danger=danger)
+    
+    def nearest_resources(self, lat: float, lon: float, k: int = 1,
+                          resource: Optional[str] = None) -> List[Tuple[str, Dict[str, Any], float]]:
+        """(cache_id, info, distance_m) of the k nearest resource caches, optionally of one resource."""
+        predicate = None if resource is None else (lambda key, info: info["resource"] == resource)
+        self._ensure_indexed()
+        hits = self.resource_index.nearest(lat, lon, k, predicate=predicate)
+        return [(key, self.resource_index.get(key)[2], d) for key, d in hits]
+    
+    def _bump_version(self) -> int:
+        """Increment the zone data version so cached renders are invalidated."""
+        with self._version_lock:
+            self.version += 1
+            return self.version
     
     def get_resource_marker(self, resource_type: str):
         """Get resource marker information."""
@@ -103,17 +407,10 @@ class ZoneManager:
     def validate_zone_data(self) -> bool:
         """Validate zone data integrity."""
         try:
-            for zone_key, zone in self.zones.items():
-                if not all([zone.name, zone.coords, zone.alert, zone.danger]):
-                    self.logger.error(f"Missing required fields in {zone_key}")
-                    return False
-                
-                if len(zone.coords) != 2:
-                    self.logger.error(f"Invalid coordinates in {zone_key}")
-                    return False
-                
-                if zone.danger not in ["low", "medium", "high"]:
-                    self.logger.error(f"Invalid danger level in {zone_key}: {zone.danger}")
+            for zone_key, zone in self.get_all_zones().items():
+                error = validate_zone(zone_key, zone)
+                if error:
+                    self.logger.error(error)
                     return False
             
             self.logger.info("✅ Zone data validation passed")
@@ -121,4 +418,27 @@ class ZoneManager:
             
         except Exception as e:
             self.logger.error(f"Zone data validation failed: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+def validate_zone(zone_key: str, zone: Zone) -> Optional[str]:
+    """Why a zone is invalid, or None when it passes the zone data rules."""
+    if not all([zone.name, zone.coords, zone.alert, zone.danger]):
+        return f"Missing required fields in {zone_key}"
+    if len(zone.coords) != 2:
+        return f"Invalid coordinates in {zone_key}"
+    if zone.danger not in ["low", "medium", "high"]:
+        return f"Invalid danger level in {zone_key}: {zone.danger}"
+    return None
+
+
+def _zone_row(zone_key: str, zone: Zone) -> Dict[str, Any]:
+    """Zone store row for a zone."""
+    row = {name: getattr(zone, name) for name in ZONE_FIELDS}
+    row["zone_key"] = zone_key
+    return row
+
+
+def _zone_from_row(row: Dict[str, Any]) -> Zone:
+    """Zone from a zone store row."""
+    return Zone(**{name: row[name] for name in ZONE_FIELDS})
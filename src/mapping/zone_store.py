@@ -0,0 +1,254 @@
+"""
+Zone Store for SurviveTrack
+SQLite persistence for zones and resource markers, with a change log for hot reload.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS zones (
+        zone_key TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        lat REAL NOT NULL,
+        lon REAL NOT NULL,
+        resources TEXT NOT NULL,
+        alert TEXT NOT NULL,
+        danger TEXT NOT NULL,
+        description TEXT NOT NULL DEFAULT '',
+        history TEXT NOT NULL DEFAULT '',
+        threats TEXT NOT NULL DEFAULT '',
+        tactical_notes TEXT NOT NULL DEFAULT '',
+        resource_density TEXT NOT NULL DEFAULT ''
+    );
+    CREATE TABLE IF NOT EXISTS resource_markers (
+        resource_type TEXT PRIMARY KEY, emoji TEXT NOT NULL, color TEXT NOT NULL, name TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS resource_stock (
+        zone_key TEXT NOT NULL, resource_type TEXT NOT NULL, quantity REAL NOT NULL,
+        PRIMARY KEY (zone_key, resource_type)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS sightings (
+        id INTEGER PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL,
+        kind TEXT NOT NULL DEFAULT 'zombie', count INTEGER NOT NULL DEFAULT 1, seen_at TEXT
+    );
+    -- Latest change revision per zone; one row per zone keeps the log bounded
+    CREATE TABLE IF NOT EXISTS zone_changes (zone_key TEXT PRIMARY KEY, rev INTEGER NOT NULL);
+    CREATE INDEX IF NOT EXISTS zone_changes_rev ON zone_changes (rev);
+    CREATE TRIGGER IF NOT EXISTS zones_insert AFTER INSERT ON zones BEGIN
+        INSERT INTO zone_changes VALUES (NEW.zone_key, (SELECT COALESCE(MAX(rev), 0) + 1 FROM zone_changes))
+            ON CONFLICT(zone_key) DO UPDATE SET rev = excluded.rev;
+    END;
+    CREATE TRIGGER IF NOT EXISTS zones_update AFTER UPDATE ON zones BEGIN
+        INSERT INTO zone_changes VALUES (NEW.zone_key, (SELECT COALESCE(MAX(rev), 0) + 1 FROM zone_changes))
+            ON CONFLICT(zone_key) DO UPDATE SET rev = excluded.rev;
+    END;
+    CREATE TRIGGER IF NOT EXISTS zones_delete AFTER DELETE ON zones BEGIN
+        INSERT INTO zone_changes VALUES (OLD.zone_key, (SELECT COALESCE(MAX(rev), 0) + 1 FROM zone_changes))
+            ON CONFLICT(zone_key) DO UPDATE SET rev = excluded.rev;
+    END;
+    -- Same log for stock levels, keyed by the zone whose stock changed
+    CREATE TABLE IF NOT EXISTS stock_changes (zone_key TEXT PRIMARY KEY, rev INTEGER NOT NULL);
+    CREATE INDEX IF NOT EXISTS stock_changes_rev ON stock_changes (rev);
+    CREATE TRIGGER IF NOT EXISTS stock_insert AFTER INSERT ON resource_stock BEGIN
+        INSERT INTO stock_changes VALUES (NEW.zone_key, (SELECT COALESCE(MAX(rev), 0) + 1 FROM stock_changes))
+            ON CONFLICT(zone_key) DO UPDATE SET rev = excluded.rev;
+    END;
+    CREATE TRIGGER IF NOT EXISTS stock_update AFTER UPDATE ON resource_stock BEGIN
+        INSERT INTO stock_changes VALUES (NEW.zone_key, (SELECT COALESCE(MAX(rev), 0) + 1 FROM stock_changes))
+            ON CONFLICT(zone_key) DO UPDATE SET rev = excluded.rev;
+    END;
+    CREATE TRIGGER IF NOT EXISTS stock_delete AFTER DELETE ON resource_stock BEGIN
+        INSERT INTO stock_changes VALUES (OLD.zone_key, (SELECT COALESCE(MAX(rev), 0) + 1 FROM stock_changes))
+            ON CONFLICT(zone_key) DO UPDATE SET rev = excluded.rev;
+    END;
+"""
+
+ZONE_COLUMNS = (
+    "zone_key", "name", "lat", "lon", "resources", "alert", "danger",
+    "description", "history", "threats", "tactical_notes", "resource_density"
+)
+
+
+class ZoneStore:
+    """
+    Zones and resource markers in a WAL-mode SQLite file.
+
+    Every write to the zones table records the zone key in a change log with a rising
+    revision, so other processes and threads can pick up edits with changes_since().
+    Stock writes are logged the same way and read back with stock_changes_since().
+    Each thread gets its own connection.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.logger = logging.getLogger(__name__)
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn.executescript(SCHEMA)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def is_empty(self) -> bool:
+        """Whether no zones have been stored yet."""
+        return self.conn.execute("SELECT 1 FROM zones LIMIT 1").fetchone() is None
+
+    def zone_count(self) -> int:
+        """Number of stored zones."""
+        return self.conn.execute("SELECT COUNT(*) FROM zones").fetchone()[0]
+
+    def revision(self) -> int:
+        """Latest change revision."""
+        return self.conn.execute("SELECT COALESCE(MAX(rev), 0) FROM zone_changes").fetchone()[0]
+
+    def get_zone(self, zone_key: str) -> Optional[Dict[str, Any]]:
+        """Full row of one zone, or None."""
+        row = self.conn.execute(
+            f"SELECT {', '.join(ZONE_COLUMNS)} FROM zones WHERE zone_key=?", (zone_key,)
+        ).fetchone()
+        return _zone_row(row) if row else None
+
+    def get_zones(self, zone_keys: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Full rows of the given zones, or of every zone."""
+        query = f"SELECT {', '.join(ZONE_COLUMNS)} FROM zones"
+        if zone_keys is None:
+            return [_zone_row(row) for row in self.conn.execute(query + " ORDER BY zone_key")]
+        keys = list(zone_keys)
+        rows = []
+        # Stay under SQLite's bound parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows.extend(self.conn.execute(f"{query} WHERE zone_key IN ({', '.join('?' * len(chunk))})", chunk))
+        return [_zone_row(row) for row in rows]
+
+    def zone_positions(self) -> List[Tuple[str, float, float, str, List[str]]]:
+        """(zone_key, lat, lon, danger, resources) of every zone, without the long text fields."""
+        rows = self.conn.execute("SELECT zone_key, lat, lon, danger, resources FROM zones")
+        parsed: Dict[str, List[str]] = {}  # Most zones share a handful of resource lists
+        positions = []
+        for key, lat, lon, danger, resources in rows:
+            if resources not in parsed:
+                parsed[resources] = json.loads(resources)
+            positions.append((key, lat, lon, danger, parsed[resources]))
+        return positions
+
+    def put_zones(self, zones: Iterable[Dict[str, Any]]) -> None:
+        """Insert or replace zones, each a dict with coords and the Zone fields, in one transaction."""
+        rows = []
+        for zone in zones:
+            lat, lon = zone["coords"]
+            values = dict(zone, lat=lat, lon=lon, resources=json.dumps(list(zone["resources"]), ensure_ascii=False))
+            rows.append(tuple(values.get(column, "") for column in ZONE_COLUMNS))
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO zones ({', '.join(ZONE_COLUMNS)}) VALUES ({', '.join('?' * len(ZONE_COLUMNS))}) "
+                f"ON CONFLICT(zone_key) DO UPDATE SET "
+                + ", ".join(f"{column}=excluded.{column}" for column in ZONE_COLUMNS[1:]),
+                rows
+            )
+
+    def delete_zone(self, zone_key: str) -> bool:
+        """Delete a zone; returns whether it existed."""
+        with self.conn:
+            return self.conn.execute("DELETE FROM zones WHERE zone_key=?", (zone_key,)).rowcount > 0
+
+    def changes_since(self, revision: int) -> Tuple[int, List[str]]:
+        """(latest revision, keys of zones written or deleted after revision)."""
+        rows = self.conn.execute(
+            "SELECT zone_key, rev FROM zone_changes WHERE rev > ? ORDER BY rev", (revision,)
+        ).fetchall()
+        if not rows:
+            return revision, []
+        return rows[-1][1], [key for key, _ in rows]
+
+    def put_stock(self, stock: Iterable[Tuple[str, str, float]]) -> None:
+        """Insert or replace (zone_key, resource_type, quantity) stock levels in one transaction."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO resource_stock (zone_key, resource_type, quantity) VALUES (?, ?, ?)", stock
+            )
+
+    def get_stock(self, zone_keys: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, str, float]]:
+        """Stored (zone_key, resource_type, quantity) of the given zones, or of every zone."""
+        query = "SELECT zone_key, resource_type, quantity FROM resource_stock"
+        if zone_keys is None:
+            return iter(self.conn.execute(query))
+        keys = list(zone_keys)
+        rows = []
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows.extend(self.conn.execute(f"{query} WHERE zone_key IN ({', '.join('?' * len(chunk))})", chunk))
+        return iter(rows)
+
+    def stock_revision(self) -> int:
+        """Latest stock change revision."""
+        return self.conn.execute("SELECT COALESCE(MAX(rev), 0) FROM stock_changes").fetchone()[0]
+
+    def stock_changes_since(self, revision: int) -> Tuple[int, List[str]]:
+        """(latest stock revision, keys of zones whose stock was written or deleted after revision)."""
+        rows = self.conn.execute(
+            "SELECT zone_key, rev FROM stock_changes WHERE rev > ? ORDER BY rev", (revision,)
+        ).fetchall()
+        if not rows:
+            return revision, []
+        return rows[-1][1], [key for key, _ in rows]
+
+    def put_sightings(self, sightings: Iterable[Tuple[float, float, str, int, Optional[str]]]) -> None:
+        """Append (lat, lon, kind, count, seen_at) threat sightings in one transaction."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO sightings (lat, lon, kind, count, seen_at) VALUES (?, ?, ?, ?, ?)", sightings
+            )
+
+    def iter_sightings(self, kind: Optional[str] = None) -> Iterator[Tuple[float, float, str, int, Optional[str]]]:
+        """Stored (lat, lon, kind, count, seen_at) sightings, streamed from the cursor."""
+        query = "SELECT lat, lon, kind, count, seen_at FROM sightings"
+        if kind is None:
+            return iter(self.conn.execute(query))
+        return iter(self.conn.execute(query + " WHERE kind=?", (kind,)))
+
+    def sightings_since(self, after_id: int, limit: int) -> List[Tuple[int, float, float, str, int, Optional[str]]]:
+        """The newest limit (id, lat, lon, kind, count, seen_at) sightings stored after after_id, oldest first."""
+        rows = self.conn.execute(
+            "SELECT id, lat, lon, kind, count, seen_at FROM sightings WHERE id > ? ORDER BY id DESC LIMIT ?",
+            (after_id, limit)
+        ).fetchall()
+        return rows[::-1]
+
+    def sighting_count(self) -> int:
+        """Number of stored sightings."""
+        return self.conn.execute("SELECT COUNT(*) FROM sightings").fetchone()[0]
+
+    def get_resource_markers(self) -> Dict[str, Dict[str, str]]:
+        """Resource marker definitions by resource type."""
+        rows = self.conn.execute("SELECT resource_type, emoji, color, name FROM resource_markers")
+        return {kind: {"emoji": emoji, "color": color, "name": name} for kind, emoji, color, name in rows}
+
+    def put_resource_markers(self, markers: Dict[str, Dict[str, str]]) -> None:
+        """Insert or replace resource marker definitions."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO resource_markers (resource_type, emoji, color, name) VALUES (?, ?, ?, ?)",
+                [(kind, m["emoji"], m["color"], m["name"]) for kind, m in markers.items()]
+            )
+
+
+def _zone_row(row) -> Dict[str, Any]:
+    """Zone dict from a row in ZONE_COLUMNS order."""
+    values = dict(zip(ZONE_COLUMNS, row))
+    values["coords"] = [values.pop("lat"), values.pop("lon")]
+    values["resources"] = json.loads(values["resources"])
+    return values
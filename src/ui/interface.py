@@ -4,167 +4,286 @@ Creates the main Gradio interface with post-apocalyptic styling.
 UPDATED: Now includes Request Aid and Locate Aid functionality!
 """
 
+import asyncio
 import logging
 import time
-import math
-import random
-from typing import List, Dict, Any
+from typing import Hashable, List, Dict, Any, Optional
+
+import numpy as np
 
 # Import your existing modules
 from .styling import get_custom_css
+from src.mapping.cluster_index import WORLD_BBOX, ClusterIndexCache, build_cluster_index
+from src.mapping.live_feed import merge_batches, start_live_feed
 from src.mapping.map_generator import MapGenerator
+from src.mapping.map_sync import MapSyncSession, diff_push_js, make_view
+from src.mapping.marker_layers import FOLIUM_AVAILABLE, build_scene_map, make_area, make_pin, make_point, make_route
+from src.mapping.outbreak import ALERT_RADIUS_M, current_outbreak, start_outbreak
+from src.mapping.sos_ingest import start_sos_ingestor
+from src.mapping.threat_heatmap import apply_threat_heatmap
+from src.mapping.tile_server import basemap_options
 from src.mapping.zone_manager import ZoneManager
 from src.ai_assistant.aria_ai import ARIAIntelligence
+from src.utils import geo
 from src.utils.config import Config
 
+# Demo survivor position used for SOS broadcasts and as the start of planned routes
+SURVIVOR_LOCATION = (24.87366765011169, 67.073671736837)
+ROUTE_WORDS = ("route", "path", "way to", "get to", "navigate")
+SAFE_ZONE_COLOR = "#7CFC00"
+TEAM_COLORS = ["#00BFFF", "#FFD700", "#FF69B4", "#7B68EE", "#00FA9A", "#FF8C00"]
+# Shortest gap between chat updates while ARIA's reply streams in
+STREAM_UPDATE_S = 0.05
+# Camera of the aid map, which its clusters are computed for
+AID_CENTER = (24.8607, 67.0011)
+AID_ZOOM = 11
+# How far around an SOS caller dangerous zones are called out, and how many supply caches are listed
+SOS_HAZARD_RADIUS_M = 5000
+SOS_SUPPLY_COUNT = 3
+
+def describe_safe_zone(safe_zone: Dict[str, Any]) -> str:
+    """One-line distance and heading to a safe zone, e.g. "Zone B - 2.4 km NE (48°)"."""
+    return (
+        f"{safe_zone['name']} - {safe_zone['distance_m'] / 1000:.1f} km "
+        f"{geo.compass(safe_zone['bearing'])} ({safe_zone['bearing']:.0f}°)"
+    )
+
+def infected_near(coords) -> Optional[int]:
+    """Simulated infected within ALERT_RADIUS_M of a position, or None when the outbreak is not running."""
+    outbreak = current_outbreak()
+    return outbreak.count_near(coords[0], coords[1], ALERT_RADIUS_M) if outbreak is not None else None
+
 # NEW: SOS Map Generation Functions
-def generate_sos_map(lat: float, lon: float, location_name: str) -> str:
+def sos_scene(lat: float, lon: float, location_name: str, config: Optional[Config] = None,
+              safe_zone: Optional[Dict[str, Any]] = None, density: Optional[Dict[str, List[Dict]]] = None
+              ) -> Dict[str, List[Dict]]:
+    """
+    Features of the SOS map for user's location, with the heading to the nearest safe zone when given
+    and the density layer of the whole outbreak under the nearest infected when the simulation runs.
+    """
+    config = config or Config()
+    # Main SOS beacon with your original styling
+    beacon = make_point(
+        lat, lon,
+        f"🆘 SOS<br><span class='st-sub-sos'>{location_name}</span>",
+        popup=f"<b>🚨 SOS SIGNAL</b><br><b>{location_name}</b><br>Time: {time.strftime('%H:%M:%S')}<br>Priority: CRITICAL",
+        feature_id="sos/beacon"
+    )
+    
+    # Emergency radius
+    area = make_area(lat, lon, 1000, "#FF0000", fill_opacity=0.1, feature_id="sos/area")
+    
+    # Add zombies around the perimeter, or the simulated infected closing in when the outbreak runs
+    outbreak = current_outbreak()
+    if outbreak is not None:
+        nearby = outbreak.around(lat, lon, 1000, 12)
+        distances = geo.haversine(lat, lon, [row[1] for row in nearby], [row[2] for row in nearby]).tolist()
+        zombie_points = [
+            make_point(
+                zombie_lat, zombie_lon, "🧟",
+                popup=f"Zombie threat - {distance:.0f}m from SOS signal{' (hunting)' if hunting else ''}",
+                variant="sos",
+                feature_id=f"sos/zombie/{agent}"
+            )
+            for (agent, zombie_lat, zombie_lon, hunting), distance in zip(nearby, distances)
+        ]
+    else:
+        zombie_lats, zombie_lons = geo.ring(lat, lon, 12, 1000, bearing_jitter=15)
+        zombie_points = [
+            make_point(
+                zombie_lat, zombie_lon, "🧟",
+                popup=f"Zombie threat - {1000}m from SOS signal",
+                variant="sos",
+                feature_id=f"sos/zombie/{i}"
+            )
+            for i, (zombie_lat, zombie_lon) in enumerate(zip(zombie_lats[0].tolist(), zombie_lons[0].tolist()))
+        ]
+    
+    scene = {"area": [area], "sos": [beacon], "zombie": zombie_points}
+    if safe_zone:
+        safe_lat, safe_lon = safe_zone['coords']
+        scene["route"] = [make_route(
+            [[lat, lon], [safe_lat, safe_lon]], SAFE_ZONE_COLOR, weight=3, dash="4 8",
+            tooltip=f"🏳️ {describe_safe_zone(safe_zone)}", feature_id="sos/safe-zone/heading"
+        )]
+        scene["zone"] = [make_pin(
+            safe_lat, safe_lon, "green", "flag",
+            popup=f"<b>🏳️ Nearest Safe Zone</b><br>{describe_safe_zone(safe_zone)}", feature_id="sos/safe-zone"
+        )]
+    return apply_threat_heatmap("sos", scene, config, density)
+
+def generate_sos_map(lat: float, lon: float, location_name: str, config: Optional[Config] = None,
+                     safe_zone: Optional[Dict[str, Any]] = None,
+                     density: Optional[Dict[str, List[Dict]]] = None) -> str:
     """Generate SOS map for user's location"""
+    if not FOLIUM_AVAILABLE:
+        return get_fallback_map_html("SOS Map not available - install folium")
+    
     try:
-        import folium
-        
-        m = folium.Map(location=[lat, lon], zoom_start=15, tiles="CartoDB dark_matter")
-        
-        # Main SOS beacon with your original styling
-        folium.Marker(
-            [lat, lon],
-            icon=folium.DivIcon(html=f"""
-            <div style="
-                background: radial-gradient(circle, #ff0000 0%, #cc0000 50%, #990000 100%);
-                color: white;
-                padding: 12px 16px;
-                font-weight: bold;
-                font-size: 12px;
-                border-radius: 50%;
-                text-align: center;
-                animation: sos-pulse 1.5s infinite;
-                box-shadow: 0 0 30px #ff0000, 0 0 60px rgba(255,0,0,0.6);
-                border: 3px solid rgba(255,255,255,0.4);
-                z-index: 1000;
-            ">
-            🆘 SOS<br><span style='font-size:10px;'>{location_name}</span>
-            </div>
-            <style>
-            @keyframes sos-pulse {{
-                0%, 100% {{ transform: scale(1); opacity: 1; }}
-                50% {{ transform: scale(1.2); opacity: 0.8; }}
-            }}
-            </style>
-            """),
-            popup=f"<b>🚨 SOS SIGNAL</b><br><b>{location_name}</b><br>Time: {time.strftime('%H:%M:%S')}<br>Priority: CRITICAL"
-        ).add_to(m)
-        
-        # Emergency radius
-        folium.Circle(
-            location=[lat, lon],
-            radius=1000,
-            color="#FF0000",
-            fill=True,
-            fill_opacity=0.1,
-            weight=2
-        ).add_to(m)
-        
-        # Add zombies around the perimeter
-        zombie_count = 12
-        for i in range(zombie_count):
-            angle = (i * 360 / zombie_count) + random.uniform(-15, 15)
-            angle_rad = math.radians(angle)
-            
-            zombie_lat = lat + (1000 / 111000) * math.cos(angle_rad)
-            zombie_lon = lon + (1000 / (111000 * math.cos(math.radians(lat)))) * math.sin(angle_rad)
-            
-            folium.Marker(
-                [zombie_lat, zombie_lon],
-                icon=folium.DivIcon(html='<div style="font-size: 18px; text-shadow: 2px 2px 4px black; color: #FF0000;">🧟</div>'),
-                popup=f"Zombie threat - {1000}m from SOS signal"
-            ).add_to(m)
-        
+        config = config or Config()
+        m = build_scene_map(
+            sos_scene(lat, lon, location_name, config, safe_zone, density), [lat, lon], 15,
+            config.MAP_MARKER_MODE, basemap_options(config)
+        )
         return m._repr_html_()
         
-    except ImportError:
-        return get_fallback_map_html("SOS Map not available - install folium")
     except Exception as e:
         logging.error(f"Failed to generate SOS map: {e}")
         return get_fallback_map_html("SOS map generation failed")
 
-def generate_aid_map(sos_zones: List[Dict]) -> str:
-    """Generate map showing all SOS zones"""
-    try:
-        import folium
+def aid_scene(sos_zones: List[Dict], config: Optional[Config] = None,
+              team_routes: Optional[List[Dict]] = None, cluster_indexes: Optional[ClusterIndexCache] = None,
+              version: Optional[Hashable] = None, zoom: int = AID_ZOOM,
+              density: Optional[Dict[str, List[Dict]]] = None) -> Dict[str, List[Dict]]:
+    """
+    Features of the map showing all SOS zones or incidents, with rescue team bases and routes when dispatched.
+    Past MAP_CLUSTER_THRESHOLD signals, beacons are clustered for the zoom the map opens at; the index is kept
+    in cluster_indexes while the incidents' version stays the same. density is the whole outbreak's layer.
+    """
+    config = config or Config()
+    color_map = {"CRITICAL": "#FF0000", "HIGH": "#FF6600", "MEDIUM": "#FFAA00"}
+    
+    # SOS markers
+    beacons = []
+    for index, zone in enumerate(sos_zones):
+        lat, lon = zone['coords']
+        priority = zone['priority']
+        popup = f"<b>🚨 {zone['name']}</b><br>Priority: {priority}<br>Survivors: {zone['survivors']}<br>Time: {zone['time']}"
+        signal_count = len(zone.get('signal_ids', ()))
+        if signal_count > 1:
+            popup += f"<br>📡 Signals: {signal_count} within {zone['spread_m']:.0f} m"
+        badge = f"×{signal_count}" if signal_count > 1 else ""
+        if zone.get('safe_zone'):
+            popup += f"<br>🏳️ Safe zone: {describe_safe_zone(zone['safe_zone'])}"
+        if zone.get('dispatch'):
+            dispatch = zone['dispatch']
+            popup += f"<br>🚑 #{dispatch['order']} {dispatch['team']} - ETA {dispatch['eta_min']:.0f} min"
+        beacon = make_point(
+            lat, lon,
+            f"🆘{badge}<br><span class='st-sub-aid'>{priority}</span>",
+            popup=popup,
+            variant=priority.lower() if color_map.get(priority) else "critical",
+            feature_id=f"aid/{index}"
+        )
+        beacon["properties"].update({"survivors": zone['survivors'], "signal": index})
+        beacons.append(beacon)
+    
+    # Too many signals to send raw: aggregate into clusters at the map's zoom, over every signal so panning
+    # never reveals an empty map
+    beacon_points = beacons
+    cluster_points = []
+    if len(beacons) > config.MAP_CLUSTER_THRESHOLD:
+        build = lambda: build_cluster_index({"sos": beacons}, config.MAP_CLUSTER_RADIUS, sum_properties=("survivors",))
+        if cluster_indexes is not None and version is not None:
+            index = cluster_indexes.get("aid", version, build)
+        else:
+            index = build()
+        layers = index.get_layers(WORLD_BBOX, zoom)
+        # A cached index holds the beacons it was built from; popups carry this scan's safe zones and dispatch
+        beacon_points = [beacons[beacon["properties"]["signal"]] for beacon in layers.get("sos", [])]
+        cluster_points = layers.get("cluster", [])
+    
+    radius_areas = []
+    hordes = {"CRITICAL": [], "HIGH": []}
+    
+    for beacon in beacon_points:
+        signal = beacon["properties"]["signal"]
+        zone = sos_zones[signal]
+        lat, lon = zone['coords']
+        priority = zone['priority']
         
-        m = folium.Map(location=[24.8607, 67.0011], zoom_start=11, tiles="CartoDB dark_matter")
+        # Color based on priority
+        color = color_map.get(priority, "#FF0000")
         
-        for zone in sos_zones:
-            lat, lon = zone['coords']
-            priority = zone['priority']
-            survivors = zone['survivors']
-            
-            # Color based on priority
-            color_map = {"CRITICAL": "#FF0000", "HIGH": "#FF6600", "MEDIUM": "#FFAA00"}
-            color = color_map.get(priority, "#FF0000")
-            
-            # SOS marker
-            folium.Marker(
-                [lat, lon],
-                icon=folium.DivIcon(html=f"""
-                <div style="
-                    background: radial-gradient(circle, {color} 0%, {color}80 50%, {color}60 100%);
-                    color: white;
-                    padding: 8px 12px;
-                    font-weight: bold;
-                    font-size: 10px;
-                    border-radius: 50%;
-                    text-align: center;
-                    animation: aid-pulse 2s infinite;
-                    box-shadow: 0 0 20px {color};
-                    border: 2px solid rgba(255,255,255,0.3);
-                ">
-                🆘<br><span style='font-size:8px;'>{priority}</span>
-                </div>
-                <style>
-                @keyframes aid-pulse {{
-                    0%, 100% {{ transform: scale(1); opacity: 1; }}
-                    50% {{ transform: scale(1.1); opacity: 0.8; }}
-                }}
-                </style>
-                """),
-                popup=f"<b>🚨 {zone['name']}</b><br>Priority: {priority}<br>Survivors: {survivors}<br>Time: {zone['time']}"
-            ).add_to(m)
-            
-            # Priority radius
-            radius_map = {"CRITICAL": 800, "HIGH": 600, "MEDIUM": 400}
-            radius = radius_map.get(priority, 500)
-            
-            folium.Circle(
-                location=[lat, lon],
-                radius=radius,
-                color=color,
-                fill=True,
-                fill_opacity=0.2,
-                weight=2
-            ).add_to(m)
-            
-            # Add zombies for high priority areas
-            if priority in ["HIGH", "CRITICAL"]:
-                zombie_count = 8 if priority == "CRITICAL" else 5
-                
-                for i in range(zombie_count):
-                    angle = (i * 360 / zombie_count) + random.uniform(-30, 30)
-                    distance = random.uniform(0.001, 0.003)
-                    
-                    zombie_lat = lat + distance * math.cos(math.radians(angle))
-                    zombie_lon = lon + distance * math.sin(math.radians(angle))
-                    
-                    folium.Marker(
-                        [zombie_lat, zombie_lon],
-                        icon=folium.DivIcon(html=f'<div style="font-size: 16px; text-shadow: 1px 1px 2px black; color: {color};">🧟</div>'),
-                        popup=f"Zombie near {zone['name']} ({priority} priority)"
-                    ).add_to(m)
+        # Priority radius
+        radius_map = {"CRITICAL": 800, "HIGH": 600, "MEDIUM": 400}
+        # An incident's area also covers every signal in it
+        radius = max(radius_map.get(priority, 500), zone.get('spread_m', 0) + 200)
         
-        return m._repr_html_()
+        radius_areas.append(make_area(lat, lon, radius, color, feature_id=f"aid/{signal}/area"))
         
-    except ImportError:
+        # Add zombies for high priority areas
+        if priority in hordes:
+            hordes[priority].append(signal)
+    
+    # One ring call per priority; seeded per signal so a horde stays put when other signals change
+    zombie_points = []
+    outbreak = current_outbreak()
+    for priority, signals in hordes.items():
+        if not signals:
+            continue
+        zombie_count = 8 if priority == "CRITICAL" else 5
+        if outbreak is not None:
+            # The simulated infected nearest each signal stand in for its horde
+            for signal in signals:
+                name = sos_zones[signal]['name']
+                zombie_points.extend(
+                    make_point(
+                        zombie_lat, zombie_lon, "🧟",
+                        popup=f"Zombie near {name} ({priority} priority)",
+                        variant=priority.lower(),
+                        feature_id=f"aid/{signal}/zombie/{agent}"
+                    )
+                    for agent, zombie_lat, zombie_lon, _ in outbreak.around(
+                        *sos_zones[signal]['coords'], radius_map[priority], zombie_count
+                    )
+                )
+            continue
+        centers = np.array([sos_zones[signal]['coords'] for signal in signals], dtype=np.float64)
+        ring_lats, ring_lons = geo.ring(
+            centers[:, 0], centers[:, 1], zombie_count, 0, bearing_jitter=30, radius_range=(111, 334),
+            seeds=geo.position_seeds(centers[:, 0], centers[:, 1])
+        )
+        for signal, lats, lons in zip(signals, ring_lats.tolist(), ring_lons.tolist()):
+            name = sos_zones[signal]['name']
+            zombie_points.extend(
+                make_point(
+                    zombie_lat, zombie_lon, "🧟",
+                    popup=f"Zombie near {name} ({priority} priority)",
+                    variant=priority.lower(),
+                    feature_id=f"aid/{signal}/zombie/{i}"
+                )
+                for i, (zombie_lat, zombie_lon) in enumerate(zip(lats, lons))
+            )
+    
+    scene = {"area": radius_areas, "sos": beacon_points, "zombie": zombie_points, "cluster": cluster_points}
+    if team_routes:
+        scene["route"], scene["zone"], bases = [], [], set()
+        for i, team_route in enumerate(team_routes):
+            team, signal = team_route['team'], team_route['signal']
+            color = TEAM_COLORS[i % len(TEAM_COLORS)]
+            eta = sos_zones[signal].get('dispatch', {}).get('eta_min', 0.0)
+            scene["route"].append(make_route(
+                team_route['path'], color, weight=4, dash="8 6",
+                popup=f"<b>🚑 {team.name}</b><br>→ {sos_zones[signal]['name']}<br>ETA {eta:.0f} min",
+                tooltip=f"🚑 {team.name} - ETA {eta:.0f} min",
+                feature_id=f"aid/team/{team.team_id}/route"
+            ))
+            if team.base_key not in bases:
+                bases.add(team.base_key)
+                scene["zone"].append(make_pin(
+                    team.lat, team.lon, "darkblue", "plus", tooltip=f"🚑 Rescue base - {team.base_key}",
+                    feature_id=f"aid/base/{team.base_key}"
+                ))
+    return apply_threat_heatmap("aid", scene, config, density)
+
+def generate_aid_map(sos_zones: List[Dict], config: Optional[Config] = None,
+                     team_routes: Optional[List[Dict]] = None, cluster_indexes: Optional[ClusterIndexCache] = None,
+                     version: Optional[Hashable] = None, density: Optional[Dict[str, List[Dict]]] = None) -> str:
+    """Generate map showing all SOS zones"""
+    if not FOLIUM_AVAILABLE:
         return get_fallback_map_html("Aid map not available - install folium")
+    
+    try:
+        config = config or Config()
+        m = build_scene_map(
+            aid_scene(sos_zones, config, team_routes, cluster_indexes, version, density=density),
+            list(AID_CENTER), AID_ZOOM,
+            config.MAP_MARKER_MODE,
+            basemap_options(config)
+        )
+        return m._repr_html_()
+        
     except Exception as e:
         logging.error(f"Failed to generate aid map: {e}")
         return get_fallback_map_html("Aid map generation failed")
@@ -211,13 +330,20 @@ def create_survivetrack_interface():
     
     # Initialize systems
     config = Config()
-    zone_manager = ZoneManager()
-    map_generator = MapGenerator(config)
-    aria_ai = ARIAIntelligence(config)
+    zone_manager = ZoneManager(config)
+    sos_ingestor = start_sos_ingestor(config)
+    start_outbreak(config, zone_manager, sos_ingestor)
+    live_feed = start_live_feed(config, zone_manager, sos_ingestor) if config.MAP_LIVE_UPDATES else None
+    map_generator = MapGenerator(config, zone_manager)
+    aria_ai = ARIAIntelligence(config, zone_manager)
     
     # Get custom CSS
     custom_css = get_custom_css()
     
+    # Live map starts on the welcome overview; later views arrive as diffs
+    initial_session = MapSyncSession()
+    initial_session.update(map_generator.overview_scene(show_welcome=True), map_generator.overview_view())
+    
     with gr.Blocks(
         css=custom_css,
         title="SurviveTrack - The Last of Us: Karachi",
@@ -295,16 +421,125 @@ def create_survivetrack_interface():
                 
                 # Interactive map with your original system
                 map_output = gr.HTML(
-                    value=map_generator.generate_overview_map(show_welcome=True)
+                    value=map_generator.generate_live_map(initial_session) if config.MAP_LIVE_UPDATES
+                    else map_generator.generate_overview_map(show_welcome=True),
+                    elem_id="survivetrack-map"
                 )
+                
+                # Hidden channel carrying map diffs to the browser, and what this session's map shows
+                map_diff = gr.JSON(visible=False)
+                map_session = gr.State(initial_session)
+                
+                # Second hidden channel for diffs pushed by the live feed
+                live_diff = gr.JSON(visible=False)
         
-        def respond(message, history):
+        def show_map(session, scene, view, render):
+            """Push a scene to the live map as a diff, or re-render the full map HTML"""
+            if not config.MAP_LIVE_UPDATES:
+                return render(), None, session
+            return gr.update(), session.update(scene, view), session
+        
+        def show_overview(session):
+            """Show the tactical overview of all zones"""
+            return show_map(
+                session, map_generator.overview_scene(), map_generator.overview_view(),
+                map_generator.generate_overview_map
+            )
+        
+        def show_zone(session, zone_key, zone):
+            """Fly to a zone's detailed map with cinematic effects"""
+            return show_map(
+                session, map_generator.zone_scene(zone_key, zone), map_generator.zone_view(zone, cinematic=True),
+                lambda: map_generator.generate_zone_map(zone_key, {zone_key: zone}, cinematic=True)
+            )
+        
+        def show_route(session, zone_key, zone, route):
+            """Show a planned route from the survivor to a zone"""
+            return show_map(
+                session, map_generator.route_scene(zone_key, zone, route, SURVIVOR_LOCATION),
+                map_generator.route_view(route),
+                lambda: map_generator.generate_route_map(zone_key, zone, route, SURVIVOR_LOCATION)
+            )
+        
+        async def stream_reply(history, label, compose, deltas, shown):
+            """Show the map at once, then fill ARIA's part of the reply in as its words arrive"""
+            history.append((label, compose("📡 ...")))
+            yield history, *shown
+            session = shown[-1]
+            text, updated = "", time.perf_counter()
+            async for delta in deltas:
+                text += delta
+                if time.perf_counter() - updated >= STREAM_UPDATE_S:
+                    updated = time.perf_counter()
+                    history[-1] = (label, compose(text + " ▌"))
+                    yield history, gr.update(), gr.update(), session
+            history[-1] = (label, compose(text.strip()))
+            yield history, gr.update(), gr.update(), session
+        
+        async def plan_route(message, history, session, zone_key, zone):
+            """Plan the least dangerous route from the survivor to a zone and draw it"""
+            planner = zone_manager.route_planner
+            
+            def plan():
+                # Moving the threats re-derives costs under the raster lock, so it runs off the event loop too
+                planner.raster.update_threats(map_generator.threat_positions())
+                return planner.plan(SURVIVOR_LOCATION, zone.coords)
+            
+            route = await asyncio.to_thread(plan)
+            if route is None:
+                reply = f"🧭 **NO SAFE ROUTE** to {zone.name}. Every approach is cut off or off the tactical grid."
+                history.append((message, reply))
+                yield history, *show_overview(session)
+                return
+            
+            walk_minutes = route.distance_m / 1000 / 5 * 60
+            route_summary = (
+                f"{route.distance_m / 1000:.1f} km on foot (~{walk_minutes:.0f} min), "
+                f"danger exposure {route.risk:.0%} above open ground"
+            )
+            ai_response = aria_ai.stream_response(
+                f"User is travelling to {zone_key} along a planned route. Give movement advice for the route.",
+                {
+                    'name': zone.name,
+                    'danger': zone.danger,
+                    'resources': zone.resources,
+                    'alert': zone.alert,
+                    'description': zone.description,
+                    'route': route_summary
+                }
+            )
+            
+            compose = lambda ai_text: f"""🧭 **SAFE ROUTE TO {zone.name}**
+
+📏 **Distance:** {route.distance_m / 1000:.1f} km (~{walk_minutes:.0f} min on foot)
+☣️ **Danger Exposure:** {route.risk:.0%} above open ground
+📍 **Waypoints:** {len(route.path)}
+⏱️ **Planned In:** {route.ms:.0f} ms
+
+🤖 **ARIA Route Analysis:**
+{ai_text}"""
+            
+            async for update in stream_reply(history, message, compose, ai_response, show_route(session, zone_key, zone, route)):
+                yield update
+        
+        async def respond(message, history, session):
             """Handle chat responses with AI and map integration"""
             if not message:
-                return history, map_generator.generate_overview_map()
+                yield history, *show_overview(session)
+                return
             
             message_lower = message.lower()
             
+            # Route requests - danger-weighted pathfinding to a zone
+            if any(word in message_lower for word in ROUTE_WORDS):
+                for zone_key in ["Zone A", "Zone B", "Zone C"]:
+                    if zone_key.lower() in message_lower or zone_key.replace(" ", "").lower() in message_lower:
+                        zone = zone_manager.get_zone(zone_key)
+                        if zone:
+                            async for update in plan_route(message, history, session, zone_key, zone):
+                                yield update
+                            return
+            
             # Check for zone requests - YOUR ORIGINAL ZONE SYSTEM
             for zone_key in ["Zone A", "Zone B", "Zone C"]:
                 if zone_key.lower() in message_lower or zone_key.replace(" ", "").lower() in message_lower:
@@ -316,15 +551,17 @@ def create_survivetrack_interface():
                             'danger': zone.danger,
                             'resources': zone.resources,
                             'alert': zone.alert,
-                            'description': zone.description
+                            'description': zone.description,
+                            'stock': zone_manager.inventory.zone_stock(zone_key),
+                            'infected': infected_near(zone.coords)
                         }
                         
-                        ai_response = aria_ai.get_response(
+                        ai_response = aria_ai.stream_response(
                             f"User is asking about {zone_key}. Provide tactical intel and survival advice.",
                             zone_dict
                         )
                         
-                        reply = f"""🎯 **{zone.name}**
+                        compose = lambda ai_text: f"""🎯 **{zone.name}**
 
 📦 **Resources Available:**
 {chr(10).join('   • ' + r for r in zone.resources)}
@@ -332,149 +569,304 @@ def create_survivetrack_interface():
 🚨 **Current Status:** {zone.alert}
 
 🤖 **ARIA Analysis:**
-{ai_response}
+{ai_text}
 
 📡 Zooming to location..."""
                         
-                        history.append((message, reply))
-                        # Generate zone map with cinematic effects
-                        zone_map = map_generator.generate_zone_map(zone_key, {zone_key: zone}, cinematic=True)
-                        return history, zone_map
+                        # Show zone map with cinematic effects
+                        async for update in stream_reply(history, message, compose, ai_response, show_zone(session, zone_key, zone)):
+                            yield update
+                        return
             
             # Resource scan
             if "resource" in message_lower:
-                ai_analysis = aria_ai.get_response("All resource locations are now visible across Karachi. Provide tactical analysis of resource distribution.")
+                inventory = zone_manager.inventory
+                summary = inventory.summary_lines()
+                ai_analysis = aria_ai.stream_response(
+                    "All resource locations are now visible across Karachi. Provide tactical analysis of resource distribution. "
+                    "Current city-wide stock: " + "; ".join(summary)
+                )
                 
-                reply = f"""📦 **RESOURCE LOCATOR SCAN COMPLETE**
+                compose = lambda ai_text: f"""📦 **RESOURCE LOCATOR SCAN COMPLETE**
 
 🌍 **Scan Radius:** Full Karachi Zone
-📍 **Zones Scanned:** 3 Active
+📍 **Zones Scanned:** {len(inventory)} Active
 ⏰ **Scan Time:** Live
 
 📦 **Resource Summary:**
-   • Zone A (Boat Basin): HIGH density - Water, Food, Shelter
-   • Zone B (Lyari): MEDIUM density - Medicine, Equipment  
-   • Zone C (Railway): LOW density - Weapons, Military Supplies
+{chr(10).join('   • ' + line for line in summary)}
 
 🤖 **ARIA Resource Analysis:**
-{ai_analysis}"""
+{ai_text}"""
                 
-                history.append((message, reply))
-                return history, map_generator.generate_overview_map(show_welcome=False)
+                async for update in stream_reply(history, message, compose, ai_analysis, show_overview(session)):
+                    yield update
+                return
             
             # General AI response
-            ai_response = aria_ai.get_response(message)
-            reply = f"🤖 **ARIA Response:**\n\n{ai_response}"
-            
-            history.append((message, reply))
-            return history, map_generator.generate_overview_map(show_welcome=False)
+            compose = lambda ai_text: f"🤖 **ARIA Response:**\n\n{ai_text}"
+            async for update in stream_reply(history, message, compose, aria_ai.stream_response(message), show_overview(session)):
+                yield update
         
-        def quick_zone_select(zone_key, history):
+        async def quick_zone_select(zone_key, history, session):
             """Handle quick zone selection buttons"""
             zone = zone_manager.get_zone(zone_key)
             if not zone:
-                return history, map_generator.generate_overview_map()
+                yield history, *show_overview(session)
+                return
             
             zone_dict = {
                 'name': zone.name,
                 'danger': zone.danger,
                 'resources': zone.resources,
                 'alert': zone.alert,
-                'description': zone.description
+                'description': zone.description,
+                'stock': zone_manager.inventory.zone_stock(zone_key),
+                'infected': infected_near(zone.coords)
             }
             
-            ai_insight = aria_ai.get_response(f"Provide a quick tactical brief for {zone_key} access.", zone_dict)
+            ai_insight = aria_ai.stream_response(f"Provide a quick tactical brief for {zone_key} access.", zone_dict)
             
-            reply = f"""⚡ **Quick Access: {zone.name}**
+            compose = lambda ai_text: f"""⚡ **Quick Access: {zone.name}**
 
 📦 Resources: {', '.join(zone.resources)}
 🚨 Status: {zone.alert}
 
-🤖 **ARIA Brief:** {ai_insight}
+🤖 **ARIA Brief:** {ai_text}
 
 🎯 Initiating tactical zoom..."""
             
-            history.append((f"[Quick Select {zone_key}]", reply))
-            zone_map = map_generator.generate_zone_map(zone_key, {zone_key: zone}, cinematic=True)
-            return history, zone_map
+            async for update in stream_reply(
+                history, f"[Quick Select {zone_key}]", compose, ai_insight, show_zone(session, zone_key, zone)
+            ):
+                yield update
         
         # NEW: SOS Functions
-        def request_aid(history):
+        async def request_aid(history, session):
             """Handle SOS request - YOUR ORIGINAL SOS SYSTEM"""
             # Use specific coordinates for consistent demo
-            live_lat = 24.87366765011169
-            live_lon = 67.073671736837
+            live_lat, live_lon = SURVIVOR_LOCATION
+            signal_id = sos_ingestor.submit(
+                live_lat, live_lon, "CRITICAL", 1, "Survivor in distress. Need immediate assistance.", "YOUR LOCATION"
+            )
+            
+            # Nearest low-danger zone, read from the precomputed field
+            safe_zone = None
+            safe_zone_line = "🏳️ **Nearest Safe Zone:** none known - shelter in place"
+            found = zone_manager.nearest_safe_zone(live_lat, live_lon)
+            if found:
+                zone_key, zone, distance, bearing = found
+                safe_zone = {'name': zone.name, 'coords': zone.coords, 'distance_m': distance, 'bearing': bearing}
+                safe_zone_line = f"🏳️ **Nearest Safe Zone:** {describe_safe_zone(safe_zone)}"
+            
+            # Closest supplies and the dangerous ground around the caller, from the spatial indexes
+            supplies = [
+                f"{info['resource']} at {zone_manager.get_zone(info['zone']).name} ({distance / 1000:.1f} km)"
+                for _, info, distance in zone_manager.nearest_resources(live_lat, live_lon, k=SOS_SUPPLY_COUNT)
+            ]
+            hazards = [
+                f"{zone.name} ({distance / 1000:.1f} km)"
+                for _, zone, distance in zone_manager.zones_within(live_lat, live_lon, SOS_HAZARD_RADIUS_M)
+                if zone.danger == "high"
+            ]
+            supplies_line = f"🎒 **Nearest Supplies:** {'; '.join(supplies) or 'none known'}"
+            hazards_line = (
+                f"☣️ **High-Danger Zones within {SOS_HAZARD_RADIUS_M / 1000:.0f} km:** {'; '.join(hazards) or 'none'}"
+            )
+            
+            # Signals already queued ahead of this one, from the triage heap
+            waiting = '; '.join(
+                f"{signal['name']} ({signal['priority']}, {signal['survivors']} survivors)"
+                for signal in sos_ingestor.top(3)
+            )
             
             # Get AI assessment
-            sos_assessment = aria_ai.get_response(f"A survivor is requesting emergency aid at coordinates {live_lat:.4f}, {live_lon:.4f}. Provide emergency response guidance and survival tips.")
+            sos_assessment = aria_ai.stream_response(
+                f"A survivor is requesting emergency aid at coordinates {live_lat:.4f}, {live_lon:.4f}. "
+                + (f"The nearest safe zone is {describe_safe_zone(safe_zone)}. " if safe_zone else "")
+                + (f"The nearest supplies are {'; '.join(supplies)}. " if supplies else "")
+                + (f"High-danger zones nearby to avoid: {'; '.join(hazards)}. " if hazards else "")
+                + (f"Other survivors already waiting for rescue, most urgent first: {waiting}. " if waiting else "")
+                + "Provide emergency response guidance and survival tips."
+            )
             
-            reply = f"""🚨 **SOS SIGNAL TRANSMITTED**
+            compose = lambda ai_text: f"""🚨 **SOS SIGNAL TRANSMITTED**
 
 📍 **Your Location:** {live_lat:.4f}, {live_lon:.4f}
 ⏰ **Time:** {time.strftime('%H:%M:%S')}
 📡 **Signal Strength:** EXCELLENT
-🆘 **Aid Request:** ACTIVE
+🆘 **Aid Request:** ACTIVE (signal #{signal_id})
+{safe_zone_line}
+{supplies_line}
+{hazards_line}
 
 💬 **Message:** 'Survivor in distress. Need immediate assistance.'
 🎯 **Priority:** CRITICAL
 
 🤖 **ARIA Emergency Protocol:**
-{sos_assessment}
+{ai_text}
 
 ⚠️ **Warning:** Stay hidden. Help is on the way."""
             
-            history.append(("[SOS REQUEST]", reply))
-            sos_map = generate_sos_map(live_lat, live_lon, "YOUR LOCATION")
-            return history, sos_map
+            density = map_generator.threat_density()
+            shown = show_map(
+                session, sos_scene(live_lat, live_lon, "YOUR LOCATION", config, safe_zone, density),
+                make_view((live_lat, live_lon), 15, fly=True),
+                lambda: generate_sos_map(live_lat, live_lon, "YOUR LOCATION", config, safe_zone, density)
+            )
+            async for update in stream_reply(history, "[SOS REQUEST]", compose, sos_assessment, shown):
+                yield update
         
-        def locate_aid(history):
+        async def locate_aid(history, session):
             """Handle aid location - YOUR ORIGINAL AID SYSTEM"""
-            # Generate random SOS zones across Karachi
-            sos_zones = []
-            for i in range(5):
-                lat = 24.8607 + random.uniform(-0.1, 0.1)
-                lon = 67.0011 + random.uniform(-0.1, 0.1)
-                sos_zones.append({
-                    'coords': [lat, lon],
-                    'name': f"Distress Signal #{i+1}",
-                    'time': f"{random.randint(0, 23):02d}:{random.randint(0, 59):02d}",
-                    'priority': random.choice(['CRITICAL', 'HIGH', 'MEDIUM']),
-                    'survivors': random.randint(1, 8)
-                })
+            # Live signals from the SOS log, clustered into incidents, oldest first; the version is read
+            # first so a cached cluster index is never filed under a newer one than it was built from
+            version = sos_ingestor.index.incidents.version
+            sos_zones = sos_ingestor.incidents()
+            if not sos_zones:
+                history.append(("[AID LOCATOR]", f"""🔍 **AID LOCATION SCAN COMPLETE**
+
+📡 **Active SOS Signals:** 0
+⏰ **Scan Time:** {time.strftime('%H:%M:%S')}
+
+✅ No survivors are calling for help right now."""))
+                density = map_generator.threat_density()
+                yield history, *show_map(
+                    session, aid_scene([], config, density=density), make_view(AID_CENTER, AID_ZOOM),
+                    lambda: generate_aid_map([], config, density=density)
+                )
+                return
+            signal_lats = np.array([[zone['coords'][0] for zone in sos_zones]])
+            signal_lons = np.array([[zone['coords'][1] for zone in sos_zones]])
+            
+            # Nearest safe zone of every signal in one vectorized lookup
+            field = zone_manager.safe_zone_field
+            indices, distances, bearings = field.lookup_many(signal_lats[0], signal_lons[0])
+            for sos_zone, index, distance, bearing in zip(sos_zones, indices.tolist(), distances.tolist(), bearings.tolist()):
+                zone = zone_manager.get_zone(field.zone_key(index)) if index >= 0 else None
+                if zone:
+                    sos_zone['safe_zone'] = {'name': zone.name, 'coords': zone.coords, 'distance_m': distance, 'bearing': bearing}
+            
+            # Assign rescue teams; each team's first run is drawn along its travel route
+            teams = zone_manager.rescue_teams()
+            team_names = {team.team_id: team.name for team in teams}
+            dispatcher = zone_manager.dispatcher
+            plan = await asyncio.to_thread(dispatcher.plan, sos_zones, teams)
+            team_routes = []
+            for order, assignment in enumerate(plan.assignments, 1):
+                sos_zone = sos_zones[assignment.signal]
+                sos_zone['dispatch'] = {'order': order, 'team': team_names[assignment.team_id], 'eta_min': assignment.eta_min}
+                if assignment.wave == 0:
+                    team = next(team for team in teams if team.team_id == assignment.team_id)
+                    team_routes.append({'team': team, 'signal': assignment.signal, 'path': dispatcher.path(team, sos_zone)})
+            dispatch_lines = [
+                f"{zone['dispatch']['order']}. {zone['dispatch']['team']} → {zone['name']} "
+                f"({zone['priority']}, {zone['survivors']} survivors) - ETA {zone['dispatch']['eta_min']:.0f} min"
+                for zone in sorted((z for z in sos_zones if 'dispatch' in z), key=lambda z: z['dispatch']['order'])
+            ]
+            
+            # Most urgent signals straight from the triage heap, each with its incident's safe zone
+            incident_of = {signal_id: zone for zone in sos_zones for signal_id in zone['signal_ids']}
+            priority_signals = [
+                dict(signal, safe_zone=incident_of.get(signal['signal_id'], {}).get('safe_zone'))
+                for signal in sos_ingestor.top(3)
+            ]
+            triage_lines = [
+                f"{zone['name']} ({zone['priority']}, {zone['survivors']} survivors, waiting {zone['age_min']:.0f} min)"
+                for zone in priority_signals
+            ]
+            signal_count = len(incident_of)
             
             # Get AI recommendation
-            aid_analysis = aria_ai.get_response(f"Multiple SOS signals detected across Karachi. {len(sos_zones)} active distress calls with varying priority levels. Provide tactical recommendation for aid response prioritization.")
+            aid_analysis = aria_ai.stream_response(
+                f"Multiple SOS signals detected across Karachi. {signal_count} active distress calls in {len(sos_zones)} incident areas "
+                f"with varying priority levels. "
+                f"Most urgent by triage: {'; '.join(triage_lines)}. "
+                f"Rescue teams have been dispatched in this order: {'; '.join(dispatch_lines[:10]) or 'no team can reach them'}. "
+                f"Provide tactical recommendation for the aid response."
+            )
             
             reply = f"""🔍 **AID LOCATION SCAN COMPLETE**
 
-📡 **Active SOS Signals:** {len(sos_zones)}
-🌍 **Scan Radius:** 20km
+📡 **Active SOS Signals:** {signal_count} in {len(sos_zones)} incident(s)
+🌍 **Scan Area:** Karachi
 ⏰ **Scan Time:** {time.strftime('%H:%M:%S')}
 
 🚨 **Priority Signals:**"""
             
-            for i, zone in enumerate(sos_zones[:3]):
+            for zone in priority_signals:
                 reply += f"\n   • {zone['name']} - {zone['priority']} - {zone['survivors']} survivors"
+                if zone.get('safe_zone'):
+                    reply += f" - 🏳️ {describe_safe_zone(zone['safe_zone'])}"
             
-            reply += f"\n\n🤖 **ARIA Tactical Recommendation:**\n{aid_analysis}"
+            reply += f"\n\n🚑 **Dispatch Plan:** {len(teams)} team(s) across {len(sos_zones)} incident(s)"
+            for line in dispatch_lines[:5]:
+                reply += f"\n   {line}"
+            if plan.unreachable:
+                reply += f"\n   ⚠️ {len(plan.unreachable)} incident(s) cut off from every base"
             
-            history.append(("[AID LOCATOR]", reply))
-            aid_map = generate_aid_map(sos_zones)
-            return history, aid_map
+            compose = lambda ai_text: f"{reply}\n\n🤖 **ARIA Tactical Recommendation:**\n{ai_text}"
+            density = map_generator.threat_density()
+            shown = show_map(
+                session,
+                aid_scene(sos_zones, config, team_routes, map_generator.cluster_indexes, version, density=density),
+                make_view(AID_CENTER, AID_ZOOM),
+                lambda: generate_aid_map(sos_zones, config, team_routes, map_generator.cluster_indexes, version,
+                                         density=density)
+            )
+            async for update in stream_reply(history, "[AID LOCATOR]", compose, aid_analysis, shown):
+                yield update
+        
+        async def live_updates(session):
+            """Stream live feed batches into this session's map for as long as the page is open"""
+            if live_feed is None:
+                return
+            seq, features = live_feed.snapshot()
+            yield session.sync_live(features)
+            while True:
+                batches = await live_feed.wait(seq, timeout=30)
+                if batches is None:
+                    # Fell behind the feed's history: resend the whole live layer
+                    seq, features = live_feed.snapshot()
+                    yield session.sync_live(features)
+                elif batches:
+                    seq = batches[-1]["seq"]
+                    yield session.patch_live(*merge_batches(batches))
+        
+        def zone_button(zone_key):
+            """Quick access handler of one zone button"""
+            async def select(history, session):
+                async for update in quick_zone_select(zone_key, history, session):
+                    yield update
+            return select
         
-        # Event handlers
-        msg.submit(respond, [msg, chatbot], [chatbot, map_output])
-        send_btn.click(respond, [msg, chatbot], [chatbot, map_output])
+        async def scan_resources(history, session):
+            """Handle the resource scan button"""
+            async for update in respond("resources", history, session):
+                yield update
         
-        zone_a_btn.click(lambda h: quick_zone_select("Zone A", h), [chatbot], [chatbot, map_output])
-        zone_b_btn.click(lambda h: quick_zone_select("Zone B", h), [chatbot], [chatbot, map_output])
-        zone_c_btn.click(lambda h: quick_zone_select("Zone C", h), [chatbot], [chatbot, map_output])
+        # Event handlers - handlers stream ARIA's reply in after showing the map, so every map update
+        # is forwarded into the live map as soon as it is yielded. They await ARIA instead of holding
+        # a worker and are not queued one at a time; ARIA_MAX_CONCURRENCY caps the API calls in flight.
+        map_outputs = [chatbot, map_output, map_diff, map_session]
+        push_diff = diff_push_js("survivetrack-map")
+        msg.submit(respond, [msg, chatbot, map_session], map_outputs, concurrency_limit=None)
+        send_btn.click(respond, [msg, chatbot, map_session], map_outputs, concurrency_limit=None)
         
-        resource_btn.click(lambda h: respond("resources", h), [chatbot], [chatbot, map_output])
+        zone_a_btn.click(zone_button("Zone A"), [chatbot, map_session], map_outputs, concurrency_limit=None)
+        zone_b_btn.click(zone_button("Zone B"), [chatbot, map_session], map_outputs, concurrency_limit=None)
+        zone_c_btn.click(zone_button("Zone C"), [chatbot, map_session], map_outputs, concurrency_limit=None)
+        
+        resource_btn.click(scan_resources, [chatbot, map_session], map_outputs, concurrency_limit=None)
         
         # NEW: SOS button handlers
-        request_aid_btn.click(request_aid, [chatbot], [chatbot, map_output])
-        locate_aid_btn.click(locate_aid, [chatbot], [chatbot, map_output])
+        request_aid_btn.click(request_aid, [chatbot, map_session], map_outputs, concurrency_limit=None)
+        locate_aid_btn.click(locate_aid, [chatbot, map_session], map_outputs, concurrency_limit=None)
+        map_diff.change(None, [map_diff], None, js=push_diff)
+        
+        # Live feed pushes arrive without any click and are forwarded the same way
+        demo.load(live_updates, [map_session], [live_diff], show_progress="hidden", concurrency_limit=None)
+        live_diff.change(None, [live_diff], None, js=push_diff)
         
         # Clear message box
         msg.submit(lambda: "", outputs=[msg])
@@ -21,11 +21,56 @@ class Config:
         self.AI_MODEL: str = os.getenv("AI_MODEL", "claude-3-haiku-20240307")
         self.AI_MAX_TOKENS: int = int(os.getenv("AI_MAX_TOKENS", "250"))
         self.AI_TEMPERATURE: float = float(os.getenv("AI_TEMPERATURE", "0.7"))
+        self.ANTHROPIC_BASE_URL: Optional[str] = os.getenv("ANTHROPIC_BASE_URL") or None
+        self.ARIA_MAX_CONCURRENCY: int = int(os.getenv("ARIA_MAX_CONCURRENCY", "16"))
+        self.ARIA_TIMEOUT_S: float = float(os.getenv("ARIA_TIMEOUT_S", "30"))
+        self.ARIA_CACHE_SIZE: int = int(os.getenv("ARIA_CACHE_SIZE", "256"))
+        self.MAP_CACHE_SIZE: int = int(os.getenv("MAP_CACHE_SIZE", "64"))
+        self.MAP_MARKER_MODE: str = os.getenv("MAP_MARKER_MODE", "geojson").lower()
+        self.MAP_CLUSTER_THRESHOLD: int = int(os.getenv("MAP_CLUSTER_THRESHOLD", "200"))
+        self.MAP_CLUSTER_RADIUS: int = int(os.getenv("MAP_CLUSTER_RADIUS", "60"))
+        self.MAP_HEATMAP_THRESHOLD: int = int(os.getenv("MAP_HEATMAP_THRESHOLD", "300"))
+        self.MAP_HEATMAP_CELL_M: float = float(os.getenv("MAP_HEATMAP_CELL_M", "50"))
+        self.MAP_HEATMAP_BANDWIDTH_M: float = float(os.getenv("MAP_HEATMAP_BANDWIDTH_M", "150"))
+        self.MAP_HEATMAP_REFRESH_S: float = float(os.getenv("MAP_HEATMAP_REFRESH_S", "5"))
+        self.MAP_LIVE_UPDATES: bool = os.getenv("MAP_LIVE_UPDATES", "true").lower() == "true"
+        self.MAP_VIEWPORT: tuple = tuple(int(v) for v in os.getenv("MAP_VIEWPORT", "1024x768").lower().split("x"))
         
         self.BASE_DIR = Path(__file__).parent.parent.parent
         self.DATA_DIR = self.BASE_DIR / "data"
         self.LOGS_DIR = self.BASE_DIR / "logs"
         
+        self.TILE_SERVER_ENABLED: bool = os.getenv("TILE_SERVER_ENABLED", "false").lower() == "true"
+        self.TILE_PUBLIC_URL: str = os.getenv("TILE_PUBLIC_URL", "/tiles/{z}/{x}/{y}.png")
+        self.TILE_STORE_PATH: Path = self.BASE_DIR / os.getenv("TILE_STORE_PATH", "data/karachi_dark_matter.mbtiles")
+        self.MAP_ASSETS_PATH: Path = self.BASE_DIR / os.getenv("MAP_ASSETS_PATH", "data/map_assets")
+        self.TILE_UPSTREAM_URL: str = os.getenv("TILE_UPSTREAM_URL", "https://a.basemaps.cartocdn.com/dark_all/{z}/{x}/{y}.png")
+        self.TILE_MIN_ZOOM: int = int(os.getenv("TILE_MIN_ZOOM", "11"))
+        self.TILE_MAX_ZOOM: int = int(os.getenv("TILE_MAX_ZOOM", "18"))
+        
+        self.ARIA_CACHE_PATH: Path = self.DATA_DIR / os.getenv("ARIA_CACHE_FILE", "aria_cache.db")
+        self.ZONE_STORE_PATH: Path = self.DATA_DIR / os.getenv("ZONE_STORE_FILE", "zones.db")
+        self.ZONE_RELOAD_INTERVAL: float = float(os.getenv("ZONE_RELOAD_INTERVAL", "2.0"))
+        self.ROUTE_CELL_M: float = float(os.getenv("ROUTE_CELL_M", "35"))
+        self.ROUTE_THREAT_WEIGHT: float = float(os.getenv("ROUTE_THREAT_WEIGHT", "4.0"))
+        self.EVAC_FIELD_CELL_M: float = float(os.getenv("EVAC_FIELD_CELL_M", "50"))
+        self.DISPATCH_TEAMS_PER_BASE: int = int(os.getenv("DISPATCH_TEAMS_PER_BASE", "3"))
+        self.DISPATCH_EXACT_LIMIT: int = int(os.getenv("DISPATCH_EXACT_LIMIT", "100000"))
+        self.SOS_LOG_PATH: Path = self.DATA_DIR / os.getenv("SOS_LOG_FILE", "sos_log.ndjson")
+        self.SOS_INGEST_HOST: str = os.getenv("SOS_INGEST_HOST", "127.0.0.1")
+        self.SOS_INGEST_PORT: int = int(os.getenv("SOS_INGEST_PORT", "8766"))
+        self.SOS_BATCH_SIZE: int = int(os.getenv("SOS_BATCH_SIZE", "1000"))
+        self.SOS_SIGNAL_TTL_MIN: float = float(os.getenv("SOS_SIGNAL_TTL_MIN", "360"))
+        self.INCIDENT_RADIUS_M: float = float(os.getenv("INCIDENT_RADIUS_M", "300"))
+        self.INCIDENT_MIN_SIGNALS: int = int(os.getenv("INCIDENT_MIN_SIGNALS", "2"))
+        self.LIVE_PUSH_WINDOW_MS: int = int(os.getenv("LIVE_PUSH_WINDOW_MS", "250"))
+        self.LIVE_THREAT_LIMIT: int = int(os.getenv("LIVE_THREAT_LIMIT", "200"))
+        self.OUTBREAK_AGENTS: int = int(os.getenv("OUTBREAK_AGENTS", "100000"))
+        self.OUTBREAK_TICK_S: float = float(os.getenv("OUTBREAK_TICK_S", "1.0"))
+        self.OUTBREAK_SEED: Optional[int] = int(os.getenv("OUTBREAK_SEED")) if os.getenv("OUTBREAK_SEED") else None
+        self.OUTBREAK_CELL_M: float = float(os.getenv("OUTBREAK_CELL_M", "100"))
+        self.OUTBREAK_CELL_CAP: int = int(os.getenv("OUTBREAK_CELL_CAP", "50"))
+        
         self.DATA_DIR.mkdir(exist_ok=True)
         self.LOGS_DIR.mkdir(exist_ok=True)
     
@@ -0,0 +1,153 @@
+"""
+Geodesic Utilities for SurviveTrack
+Vectorized NumPy kernels for offsets, distances and ring placement over many points at once.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+COMPASS_POINTS = ("N", "NE", "E", "SE", "S", "SW", "W", "NW")
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def destination(lat, lon, bearing_deg, distance_m) -> Tuple[np.ndarray, np.ndarray]:
+    """Great-circle destination from start points given bearings (degrees) and distances (metres); broadcasts."""
+    lat1 = np.radians(lat)
+    lon1 = np.radians(lon)
+    bearing = np.radians(bearing_deg)
+    angular = np.asarray(distance_m, dtype=np.float64) / EARTH_RADIUS_M
+
+    sin_lat1, cos_lat1 = np.sin(lat1), np.cos(lat1)
+    sin_ang, cos_ang = np.sin(angular), np.cos(angular)
+    sin_lat2 = sin_lat1 * cos_ang + cos_lat1 * sin_ang * np.cos(bearing)
+    lat2 = np.arcsin(np.clip(sin_lat2, -1.0, 1.0))
+    lon2 = lon1 + np.arctan2(np.sin(bearing) * sin_ang * cos_lat1, cos_ang - sin_lat1 * sin_lat2)
+    return np.degrees(lat2), (np.degrees(lon2) + 540.0) % 360.0 - 180.0
+
+
+def offset(lat, lon, north_m, east_m) -> Tuple[np.ndarray, np.ndarray]:
+    """Move points by north/east displacements in metres; broadcasts."""
+    north_m = np.asarray(north_m, dtype=np.float64)
+    east_m = np.asarray(east_m, dtype=np.float64)
+    return destination(lat, lon, np.degrees(np.arctan2(east_m, north_m)), np.hypot(north_m, east_m))
+
+
+def haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in metres between paired points; broadcasts."""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bearing(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Initial great-circle bearing in degrees clockwise from north between paired points; broadcasts."""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    d_lambda = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    y = np.sin(d_lambda) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(d_lambda)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+def compass(bearing_deg: float) -> str:
+    """Eight-point compass direction of a bearing, such as "NE"."""
+    return COMPASS_POINTS[int((bearing_deg % 360.0 + 22.5) // 45.0) % 8]
+
+
+def distance_matrix(lats_a, lons_a, lats_b, lons_b) -> np.ndarray:
+    """(N, M) matrix of great-circle distances in metres between two point sets."""
+    # Chord lengths from one matrix product of unit vectors; no trig per pair, error well under a metre
+    dots = _unit_vectors(lats_a, lons_a) @ _unit_vectors(lats_b, lons_b).T
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip((1.0 - dots) / 2, 0.0, 1.0)))
+
+
+def _unit_vectors(lats, lons) -> np.ndarray:
+    """(N, 3) Cartesian unit vectors of lat/lon points."""
+    phi = np.radians(np.asarray(lats, dtype=np.float64))
+    lam = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_phi = np.cos(phi)
+    return np.stack([cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)], axis=-1)
+
+
+def centroid(lats, lons) -> Tuple[float, float]:
+    """Geographic centroid (lat, lon) of points, as the normalized mean of their unit vectors."""
+    x, y, z = _unit_vectors(lats, lons).reshape(-1, 3).mean(axis=0)
+    return float(np.degrees(np.arctan2(z, np.hypot(x, y)))), float(np.degrees(np.arctan2(y, x)))
+
+
+def within_radius(lat: float, lon: float, radius_m: float, lats, lons) -> np.ndarray:
+    """Indices of points within radius_m of (lat, lon)."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    # Cheap degree box first, exact distance only for candidates inside it
+    d_lat = np.degrees(radius_m / EARTH_RADIUS_M)
+    d_lon = d_lat / max(np.cos(np.radians(lat)), 1e-6)
+    candidates = np.nonzero((np.abs(lats - lat) <= d_lat) & (np.abs(lons - lon) <= d_lon))[0]
+    return candidates[haversine(lat, lon, lats[candidates], lons[candidates]) <= radius_m]
+
+
+def stable_uniform(seeds, count: int) -> np.ndarray:
+    """(N, count) uniforms in [0, 1) derived from integer seeds with splitmix64; same seeds give the same draws."""
+    seeds = np.asarray(seeds, dtype=np.int64).astype(np.uint64)
+    z = seeds[:, None] + (np.arange(1, count + 1, dtype=np.uint64) * _GOLDEN)[None, :]
+    z = (z ^ (z >> np.uint64(30))) * _MIX_1
+    z = (z ^ (z >> np.uint64(27))) * _MIX_2
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def position_seeds(lats, lons) -> np.ndarray:
+    """Integer seeds identifying positions at micro-degree precision."""
+    lat_i = np.round(np.asarray(lats, dtype=np.float64) * 1e6).astype(np.int64)
+    lon_i = np.round(np.asarray(lons, dtype=np.float64) * 1e6).astype(np.int64)
+    return lat_i * 1_000_000_000 + lon_i
+
+
+def _draws(n: int, count: int, seeds, rng: Optional[np.random.Generator]) -> np.ndarray:
+    """(n, count) uniforms from seeds when given, otherwise from rng."""
+    if seeds is not None:
+        return stable_uniform(seeds, count)
+    return (rng or np.random.default_rng()).random((n, count))
+
+
+def ring(lats, lons, count: int, radius_m: float, bearing_jitter: float = 0.0,
+         radius_range: Optional[Tuple[float, float]] = None, seeds=None,
+         rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Points evenly spaced around each of N centers, as (N, count) lat and lon arrays.
+
+    bearing_jitter randomizes each bearing by up to +/- that many degrees and radius_range
+    replaces the fixed radius with a uniform draw; seeds make the draws repeatable per center.
+    """
+    lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+    lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+    n = len(lats)
+    bearings = np.broadcast_to(np.arange(count) * (360.0 / count), (n, count))
+    distances = np.full((n, count), float(radius_m))
+
+    if bearing_jitter:
+        bearings = bearings + (_draws(n, count, seeds, rng) * 2 - 1) * bearing_jitter
+    if radius_range is not None:
+        low, high = radius_range
+        jitter_seeds = None if seeds is None else np.asarray(seeds, dtype=np.int64) ^ 0x5DEECE66D
+        distances = low + _draws(n, count, jitter_seeds, rng) * (high - low)
+
+    return destination(lats[:, None], lons[:, None], bearings, distances)
+
+
+def scatter(lats, lons, count: int, min_m: float, max_m: float, seeds=None,
+            rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Random points at uniform bearings and distances around each of N centers, as (N, count) arrays."""
+    lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+    lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+    n = len(lats)
+    bearings = _draws(n, count, seeds, rng) * 360.0
+    distance_seeds = None if seeds is None else np.asarray(seeds, dtype=np.int64) ^ 0x5DEECE66D
+    distances = min_m + _draws(n, count, distance_seeds, rng) * (max_m - min_m)
+    return destination(lats[:, None], lons[:, None], bearings, distances)
@@ -0,0 +1,148 @@
+"""
+Fake Messages API for SurviveTrack tests
+Local HTTP server answering Anthropic Messages API calls, plain and streamed, and recording what it was sent.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Set
+
+REPLY_WORDS = [f"word{i} " for i in range(8)]
+
+
+class FakeMessagesAPI:
+    """
+    Messages API endpoint on a free local port, for pointing ARIA at with ANTHROPIC_BASE_URL.
+
+    Every request body is kept in requests, and the most calls ever in flight at once in peak.
+    Each call waits delay_s before answering, so concurrent calls overlap. Prompt caching is
+    simulated: a prefix ending at a cache_control mark and at least min_cached_tokens long is
+    written on first sight and read after that, and markers keeps each request's mark count.
+    """
+
+    def __init__(self, delay_s: float = 0.0, min_cached_tokens: int = 0):
+        self.delay_s = delay_s
+        self.min_cached_tokens = min_cached_tokens
+        self.requests: List[Dict[str, Any]] = []
+        self.markers: List[int] = []
+        self._cached_prefixes: Set[str] = set()
+        self.peak = 0
+        self._inflight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeMessagesAPI":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def usage(self, body: Dict[str, Any]) -> Dict[str, int]:
+        """Token usage reported for a request, about one token per four characters of prompt."""
+        system = body.get("system") or []
+        blocks = list(system) if isinstance(system, list) else [{"type": "text", "text": system}]
+        for message in body["messages"]:
+            content = message["content"]
+            blocks.extend(content if isinstance(content, list) else [{"type": "text", "text": content}])
+        prefix, tokens, read, cached = "", 0, 0, 0
+        marks = 0
+        for block in blocks:
+            prefix += block["text"]
+            tokens += len(block["text"]) // 4
+            if not block.get("cache_control"):
+                continue
+            marks += 1
+            if tokens < self.min_cached_tokens:
+                continue
+            with self._lock:
+                if prefix in self._cached_prefixes:
+                    read = tokens
+                self._cached_prefixes.add(prefix)
+            cached = tokens
+        with self._lock:
+            self.markers.append(marks)
+        return {
+            "input_tokens": tokens - cached, "cache_read_input_tokens": read,
+            "cache_creation_input_tokens": cached - read, "output_tokens": len(REPLY_WORDS),
+        }
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers["content-length"])))
+                with api._lock:
+                    api.requests.append(body)
+                    api._inflight += 1
+                    api.peak = max(api.peak, api._inflight)
+                try:
+                    usage = api.usage(body)
+                    time.sleep(api.delay_s)
+                    if body.get("stream"):
+                        self._stream(body, usage)
+                    else:
+                        self._reply(body, usage)
+                finally:
+                    with api._lock:
+                        api._inflight -= 1
+
+            def _reply(self, body: Dict[str, Any], usage: Dict[str, int]) -> None:
+                payload = json.dumps({
+                    "id": "msg_fake", "type": "message", "role": "assistant", "model": body["model"],
+                    "content": [{"type": "text", "text": "".join(REPLY_WORDS)}],
+                    "stop_reason": "end_turn", "stop_sequence": None, "usage": usage,
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body: Dict[str, Any], usage: Dict[str, int]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self._event("message_start", {"type": "message_start", "message": {
+                    "id": "msg_fake", "type": "message", "role": "assistant", "model": body["model"],
+                    "content": [], "stop_reason": None, "stop_sequence": None, "usage": usage,
+                }})
+                self._event("content_block_start", {
+                    "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}
+                })
+                for word in REPLY_WORDS:
+                    self._event("content_block_delta", {
+                        "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": word}
+                    })
+                self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+                self._event("message_delta", {
+                    "type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                    "usage": {"output_tokens": len(REPLY_WORDS)},
+                })
+                self._event("message_stop", {"type": "message_stop"})
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def _event(self, event: str, data: Dict[str, Any]) -> None:
+                chunk = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(chunk):x}\r\n".encode("latin-1") + chunk + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
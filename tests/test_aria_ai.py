@@ -0,0 +1,120 @@
+import asyncio
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from src.ai_assistant.aria_ai import ANTHROPIC_AVAILABLE, ARIAIntelligence
+from src.utils.config import Config
+from tests.fake_messages_api import REPLY_WORDS, FakeMessagesAPI
+
+
+def make_aria(api: FakeMessagesAPI, max_concurrency: int = 16) -> ARIAIntelligence:
+    config = Config()
+    config.ANTHROPIC_API_KEY = "test-key"
+    config.ANTHROPIC_BASE_URL = api.url
+    config.ARIA_CACHE_SIZE = 0
+    config.ARIA_MAX_CONCURRENCY = max_concurrency
+    return ARIAIntelligence(config)
+
+
+ZONE_CONTEXT = {
+    "name": "Zone A", "danger": "low", "resources": ["water", "food"], "alert": "Safe zone",
+    "description": "Former luxury district", "infected": 12,
+}
+
+
+async def collect(aria: ARIAIntelligence, message: str, zone_context=None) -> str:
+    return "".join([delta async for delta in aria.stream_response(message, zone_context)])
+
+
+async def collect_each(aria: ARIAIntelligence, message: str, zone_contexts) -> list:
+    # One event loop for all calls, as in the interface, so the client's pooled connections stay usable
+    return [await collect(aria, message, zone_context) for zone_context in zone_contexts]
+
+
+@unittest.skipUnless(ANTHROPIC_AVAILABLE, "anthropic SDK not installed")
+class ARIAClientTest(unittest.TestCase):
+    def test_get_response_sends_temperature_in_body(self):
+        with FakeMessagesAPI() as api:
+            aria = make_aria(api)
+            reply = aria.get_response("Status report")
+        self.assertEqual(reply, "".join(REPLY_WORDS).strip())
+        self.assertEqual(api.requests[0]["temperature"], aria.config.AI_TEMPERATURE)
+
+    def test_stream_response_yields_deltas(self):
+        with FakeMessagesAPI() as api:
+            aria = make_aria(api)
+            reply = asyncio.run(collect(aria, "Status report"))
+        self.assertEqual(reply, "".join(REPLY_WORDS))
+        self.assertTrue(api.requests[0]["stream"])
+        self.assertEqual(api.requests[0]["temperature"], aria.config.AI_TEMPERATURE)
+        self.assertEqual(aria.latency_stats()["api_requests"], 1)
+
+    def test_stream_response_caps_calls_in_flight(self):
+        async def burst(aria: ARIAIntelligence):
+            return await asyncio.gather(*(collect(aria, f"Question {i}") for i in range(6)))
+
+        with FakeMessagesAPI(delay_s=0.2) as api:
+            aria = make_aria(api, max_concurrency=2)
+            replies = asyncio.run(burst(aria))
+        self.assertEqual(replies, ["".join(REPLY_WORDS)] * 6)
+        self.assertEqual(len(api.requests), 6)
+        self.assertEqual(api.peak, 2)
+
+    def test_stream_response_caches_off_the_event_loop(self):
+        cache_threads = []
+
+        def on_thread(method):
+            def call(*args):
+                cache_threads.append(threading.current_thread())
+                return method(*args)
+            return call
+
+        with FakeMessagesAPI() as api, tempfile.TemporaryDirectory() as directory:
+            aria = make_aria(api)
+            aria.config.ARIA_CACHE_SIZE = 8
+            aria.config.ARIA_CACHE_PATH = Path(directory) / "aria_cache.db"
+            aria = ARIAIntelligence(aria.config)
+            aria.cache.get = on_thread(aria.cache.get)
+            aria.cache.put = on_thread(aria.cache.put)
+            replies = asyncio.run(collect_each(aria, "Status report", [None, None]))
+        self.assertEqual(replies, ["".join(REPLY_WORDS), "".join(REPLY_WORDS).strip()])
+        self.assertEqual(len(api.requests), 1)
+        # Lookup, store, lookup: none of the SQLite work ran on the event loop's thread
+        self.assertEqual(len(cache_threads), 3)
+        self.assertNotIn(threading.main_thread(), cache_threads)
+
+
+@unittest.skipUnless(ANTHROPIC_AVAILABLE, "anthropic SDK not installed")
+class ARIAPromptCacheTest(unittest.TestCase):
+    def test_persona_and_zone_context_are_cache_points(self):
+        with FakeMessagesAPI() as api:
+            aria = make_aria(api)
+            contexts = [dict(ZONE_CONTEXT, infected=infected) for infected in (12, 15)]
+            asyncio.run(collect_each(aria, "Brief me", contexts))
+        self.assertEqual(api.markers, [2, 2])
+        system = api.requests[0]["system"]
+        content = api.requests[0]["messages"][0]["content"]
+        self.assertEqual(system[0]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(content[0]["cache_control"], {"type": "ephemeral"})
+        self.assertNotIn("cache_control", content[-1])
+        # The live infected count goes after the cache points, so both calls share the marked prefix
+        self.assertEqual(api.requests[0]["messages"][0]["content"][0], api.requests[1]["messages"][0]["content"][0])
+        stats = aria.prompt_cache_stats()
+        self.assertEqual(stats["cached_calls"], 1)
+        self.assertGreater(stats["cache_read_tokens"], 0)
+
+    def test_default_persona_is_too_short_to_cache(self):
+        with FakeMessagesAPI(min_cached_tokens=2048) as api:
+            aria = make_aria(api)
+            asyncio.run(collect_each(aria, "Brief me", [ZONE_CONTEXT] * 2))
+        self.assertEqual(api.markers, [2, 2])
+        stats = aria.prompt_cache_stats()
+        self.assertFalse(stats["active"])
+        self.assertEqual(stats["cache_read_tokens"], 0)
+        self.assertEqual(stats["cache_write_tokens"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()